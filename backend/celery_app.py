@@ -7,3 +7,10 @@ celery_app = Celery(
     backend=os.getenv("CELERY_RESULT_BACKEND"),
     include=["tasks"],
 )
+
+# Mesmas rotas usadas pelo worker: a API publica direto na fila de correções
+celery_app.conf.task_routes = {
+    "correct_essay": {"queue": "correcoes"},
+    "gerar_feedback": {"queue": "correcoes"},
+    "despachar_lotes": {"queue": "manutencao"},
+}
@@ -1,9 +1,41 @@
-from shared.models import SessionLocal
+import os
+import threading
 
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 
-def get_db():
-    db = SessionLocal()
-    try:
+from shared.models import FabricaSessoes, obter_database_url, opcoes_pool
+
+
+def _url_assincrona(url: str) -> str:
+    """Troca o driver da DATABASE_URL (psycopg2) pelo asyncpg."""
+    esquema, resto = url.split("://", 1)
+    return f"postgresql+asyncpg://{resto}" if esquema.startswith("postgres") else url
+
+
+_engine_async = None
+_trava_engine = threading.Lock()
+
+
+def obter_engine_async():
+    """Engine assíncrono da API, criado na primeira sessão (não na importação)."""
+    global _engine_async
+    if _engine_async is None:
+        with _trava_engine:
+            if _engine_async is None:
+                _engine_async = create_async_engine(
+                    os.getenv("DATABASE_URL_ASYNC") or _url_assincrona(obter_database_url()),
+                    **opcoes_pool(),
+                )
+    return _engine_async
+
+
+# expire_on_commit=False: os handlers leem os atributos depois do commit sem
+# disparar novas consultas (lazy load não é permitido em sessões assíncronas).
+AsyncSessionLocal = FabricaSessoes(
+    async_sessionmaker(autoflush=False, expire_on_commit=False), obter_engine_async
+)
+
+
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
@@ -0,0 +1,53 @@
+"""
+Exporta as correções concluídas direto do banco, sem passar pela API.
+
+Mesma consulta e formatos do endpoint GET /api/v1/redacoes/exportacao (ver
+shared/exportacao.py): as linhas são lidas por cursor do lado do servidor e
+gravadas bloco a bloco, com memória constante. Uso (no container da API):
+
+    python exportar.py --tema "Tema da prova" --formato parquet --saida notas.parquet
+    python exportar.py --formato ndjson > notas.ndjson
+"""
+import argparse
+import sys
+import time
+from datetime import datetime
+
+from shared.exportacao import consulta_exportacao, criar_exportador, formatos_disponiveis
+from shared.models import SessionLocal
+
+
+def exportar(saida, formato: str, tema=None, criado_desde=None, criado_ate=None) -> int:
+    """Grava a exportação em `saida` (arquivo binário) e devolve o número de linhas."""
+    exportador = criar_exportador(formato)
+    total = 0
+    saida.write(exportador.inicio())
+    db = SessionLocal()
+    try:
+        resultado = db.execute(consulta_exportacao(tema, criado_desde, criado_ate))
+        for bloco in resultado.partitions():
+            saida.write(exportador.bloco(bloco))
+            total += len(bloco)
+    finally:
+        db.close()
+    saida.write(exportador.fim())
+    return total
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exporta as correções concluídas (CSV, NDJSON ou Parquet).")
+    parser.add_argument("--formato", choices=formatos_disponiveis(), default="csv")
+    parser.add_argument("--tema")
+    parser.add_argument("--criado-desde", type=datetime.fromisoformat)
+    parser.add_argument("--criado-ate", type=datetime.fromisoformat)
+    parser.add_argument("--saida", help="Arquivo de destino (padrão: saída padrão).")
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    saida = open(args.saida, "wb") if args.saida else sys.stdout.buffer
+    try:
+        total = exportar(saida, args.formato, args.tema, args.criado_desde, args.criado_ate)
+    finally:
+        if args.saida:
+            saida.close()
+    print(f"{total} correções exportadas em {time.perf_counter() - inicio:.1f}s.", file=sys.stderr)
@@ -1,10 +1,47 @@
-from fastapi import FastAPI, Depends, HTTPException
+import base64
+import json
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
+from pydantic import ValidationError
+from sqlalchemy import text, insert, select, update, func, or_, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 from shared import models, schemas
-from database import get_db
+from shared.conteudo import hash_redacao, chave_trava
+from shared.eventos import assinar_eventos, proximo_evento
+from shared.disjuntor import obter_disjuntor
+from shared.resultados import descomprimir_detalhes
+from shared.exportacao import (
+    FORMATOS,
+    consulta_exportacao,
+    criar_exportador,
+    formatos_disponiveis,
+)
+from database import get_db, AsyncSessionLocal
 from celery_app import celery_app
+from metricas import MiddlewareMetricas, REDACOES_SUBMETIDAS, app_metricas
+
+# Limites do endpoint de lote
+LOTE_MAX_ITENS = int(os.getenv("LOTE_MAX_ITENS", "20000"))
+LOTE_TAMANHO_INSERT = int(os.getenv("LOTE_TAMANHO_INSERT", "1000"))
+
+# Tamanho das páginas da listagem
+LISTAGEM_LIMITE_PADRAO = 50
+LISTAGEM_LIMITE_MAX = 500
+
+# Um pedido de feedback sem resposta nesse prazo (tarefa perdida ou com erro) é reenviado
+FEEDBACK_REENVIO_SEGUNDOS = int(os.getenv("FEEDBACK_REENVIO_SEGUNDOS", "300"))
+
+# Entrega de status por push (SSE / long-poll)
+SSE_INTERVALO_KEEPALIVE = 15
+LONG_POLL_TIMEOUT_MAX = 60
 
 app = FastAPI(title="API de Correção de Redação ENEM", version="1.0.0")
 
@@ -24,45 +61,610 @@ app.add_middleware(
     allow_methods=["*"],  # Permite todos os métodos (GET, POST, etc.)
     allow_headers=["*"],  # Permite todos os cabeçalhos
 )
+app.add_middleware(MiddlewareMetricas)
+
+# Métricas no formato do Prometheus
+app.mount("/metrics", app_metricas)
+
+
+async def _enviar_tarefa(*args, **kwargs):
+    """Publica no broker fora do event loop (o cliente do Celery é bloqueante)."""
+    return await run_in_threadpool(celery_app.send_task, *args, **kwargs)
 
 
 @app.get("/", summary="Endpoint raiz da API")
-def read_root():
+async def read_root():
     return {"message": "API de Correção de Redações do ENEM no ar!"}
 
 
+@app.get(
+    "/api/v1/sistema/disjuntor",
+    response_model=schemas.EstadoDisjuntor,
+    summary="Estado do disjuntor da cota do LLM",
+)
+async def obter_estado_disjuntor():
+    """ABERTO (fila pausada), RECUPERANDO (vazão em rampa) ou FECHADO, com os contadores."""
+    return await run_in_threadpool(obter_disjuntor().estado)
+
+
 @app.post(
     "/api/v1/redacoes/",
     response_model=schemas.RedacaoStatus,
     status_code=202,
     summary="Submeter uma redação para correção",
 )
-def criar_correcao(redacao: schemas.RedacaoCreate, db: Session = Depends(get_db)):
+async def criar_correcao(redacao: schemas.RedacaoCreate, db: AsyncSession = Depends(get_db)):
+    hash_conteudo = hash_redacao(redacao.tema, redacao.texto_redacao)
+
+    # Serializa submissões idênticas simultâneas: só a primeira dispara a correção,
+    # as demais se acoplam a ela enquanto estiver PENDENTE ou PROCESSANDO.
+    await db.execute(
+        text("SELECT pg_advisory_xact_lock(:chave)"),
+        {"chave": chave_trava(hash_conteudo)},
+    )
+    principal = (
+        await db.execute(
+            select(models.Redacao.id, models.Redacao.status)
+            .where(
+                models.Redacao.hash_conteudo == hash_conteudo,
+                models.Redacao.redacao_principal_id.is_(None),
+                models.Redacao.status.in_(models.STATUS_EM_ANDAMENTO),
+            )
+            .order_by(models.Redacao.id)
+            .limit(1)
+        )
+    ).first()
+
+    # Interativas vão direto para a fila; as de lote esperam o despacho justo
+    # entre origens (worker/despacho.py)
+    interativa = redacao.prioridade == models.PRIORIDADE_INTERATIVA
+    despachar_agora = principal is None and interativa
+    promover_principal = None
+    if principal is not None and interativa:
+        # Acoplar a uma redação de lote que ainda espera o despacho deixaria a
+        # submissão interativa atrás do lote inteiro: a principal é promovida e
+        # vai agora para a fila interativa. A condição em despachado_em evita
+        # publicá-la duas vezes se o despacho de lote a pegou neste meio tempo.
+        promover_principal = (
+            await db.execute(
+                update(models.Redacao)
+                .where(
+                    models.Redacao.id == principal.id,
+                    models.Redacao.prioridade == models.PRIORIDADE_LOTE,
+                    models.Redacao.despachado_em.is_(None),
+                )
+                .values(prioridade=models.PRIORIDADE_INTERATIVA, despachado_em=func.now())
+                .returning(models.Redacao.id)
+                .execution_options(synchronize_session=False)
+            )
+        ).scalar()
     db_redacao = models.Redacao(
-        tema=redacao.tema, texto_redacao=redacao.texto_redacao, status="PENDENTE"
+        tema=redacao.tema,
+        texto_redacao=redacao.texto_redacao,
+        status=principal.status if principal else "PENDENTE",
+        hash_conteudo=hash_conteudo,
+        redacao_principal_id=principal.id if principal else None,
+        prioridade=redacao.prioridade,
+        origem=redacao.origem,
+        despachado_em=datetime.now(timezone.utc) if despachar_agora else None,
     )
     db.add(db_redacao)
-    db.commit()
-    db.refresh(db_redacao)
+    await db.commit()
 
-    celery_app.send_task("correct_essay", args=[db_redacao.id])
+    if despachar_agora:
+        await _enviar_tarefa("correct_essay", args=[db_redacao.id])
+    elif promover_principal is not None:
+        await _enviar_tarefa("correct_essay", args=[promover_principal])
+    REDACOES_SUBMETIDAS.labels("individual", "acoplada" if principal else "fila").inc()
 
     return {
         "id": db_redacao.id,
-        "status": "PENDENTE",
+        "status": db_redacao.status,
         "message": "Sua redação foi recebida e está na fila para correção.",
     }
 
 
+# Colunas da listagem: nunca carrega o texto, o resultado nem os detalhes
+COLUNAS_LISTAGEM = (
+    models.Redacao.id,
+    models.Redacao.status,
+    models.Redacao.tema,
+    models.Redacao.criado_em,
+    models.Redacao.nota_final,
+    models.Redacao.fonte_resultado,
+    models.Redacao.usou_supervisor,
+    models.Redacao.lote_id,
+    models.Redacao.redacao_principal_id,
+)
+
+
+def _codificar_cursor(criado_em: datetime, redacao_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{criado_em.isoformat()}|{redacao_id}".encode()).decode()
+
+
+def _decodificar_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        criado_em, redacao_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(criado_em), int(redacao_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Cursor inválido.")
+
+
+@app.get(
+    "/api/v1/redacoes/",
+    response_model=schemas.PaginaRedacoes,
+    summary="Listar redações (mais recentes primeiro), com filtros e paginação por cursor",
+)
+async def listar_redacoes(
+    status: Optional[str] = Query(None, regex="^(PENDENTE|PROCESSANDO|CONCLUIDO|ERRO)$"),
+    tema: Optional[str] = None,
+    criado_desde: Optional[datetime] = Query(None, description="Submetidas a partir deste instante."),
+    criado_ate: Optional[datetime] = Query(None, description="Submetidas antes deste instante."),
+    cursor: Optional[str] = Query(None, description="proximo_cursor da página anterior."),
+    limite: int = Query(LISTAGEM_LIMITE_PADRAO, ge=1, le=LISTAGEM_LIMITE_MAX),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Paginação por chave (criado_em, id) em vez de OFFSET: cada página é uma
+    busca no índice composto correspondente ao filtro (ix_redacoes_*_criado_em_id),
+    com custo constante em qualquer posição da listagem.
+    """
+    consulta = select(*COLUNAS_LISTAGEM)
+    if status:
+        consulta = consulta.where(models.Redacao.status == status)
+    if tema:
+        consulta = consulta.where(models.Redacao.tema == tema)
+    if criado_desde:
+        consulta = consulta.where(models.Redacao.criado_em >= criado_desde)
+    if criado_ate:
+        consulta = consulta.where(models.Redacao.criado_em < criado_ate)
+    if cursor:
+        consulta = consulta.where(
+            tuple_(models.Redacao.criado_em, models.Redacao.id) < tuple_(*_decodificar_cursor(cursor))
+        )
+
+    # Uma linha a mais indica se existe página seguinte
+    linhas = (
+        await db.execute(
+            consulta.order_by(models.Redacao.criado_em.desc(), models.Redacao.id.desc()).limit(limite + 1)
+        )
+    ).all()
+    proximo_cursor = None
+    if len(linhas) > limite:
+        linhas = linhas[:limite]
+        proximo_cursor = _codificar_cursor(linhas[-1].criado_em, linhas[-1].id)
+    return {"itens": [dict(linha._mapping) for linha in linhas], "proximo_cursor": proximo_cursor}
+
+
+@app.get(
+    "/api/v1/redacoes/exportacao",
+    summary="Exportar as correções concluídas (CSV, NDJSON ou Parquet) em streaming",
+)
+async def exportar_redacoes(
+    formato: str = Query("csv", regex="^(csv|ndjson|parquet)$"),
+    tema: Optional[str] = None,
+    criado_desde: Optional[datetime] = Query(None, description="Submetidas a partir deste instante."),
+    criado_ate: Optional[datetime] = Query(None, description="Submetidas antes deste instante."),
+):
+    """
+    Uma linha por correção concluída, com as notas das 5 competências em
+    colunas. As linhas saem do banco por cursor do lado do servidor e são
+    enviadas bloco a bloco, então exportações de qualquer tamanho usam memória
+    constante. Parquet exige o pyarrow (requirements-parquet.txt) instalado na API.
+    """
+    if formato not in formatos_disponiveis():
+        raise HTTPException(status_code=501, detail=f"Formato '{formato}' indisponível nesta instalação.")
+    consulta = consulta_exportacao(tema, criado_desde, criado_ate)
+    exportador = criar_exportador(formato)
+
+    async def _stream():
+        yield exportador.inicio()
+        async with AsyncSessionLocal() as db:
+            resultado = await db.stream(consulta)
+            async for bloco in resultado.partitions():
+                # Serialização (CPU) fora do event loop
+                yield await run_in_threadpool(exportador.bloco, bloco)
+        yield exportador.fim()
+
+    tipo, extensao = FORMATOS[formato]
+    return StreamingResponse(
+        _stream(),
+        media_type=tipo,
+        headers={"Content-Disposition": f'attachment; filename="redacoes.{extensao}"'},
+    )
+
+
+@app.post(
+    "/api/v1/textos-motivadores/",
+    response_model=schemas.TextoMotivadorStatus,
+    status_code=201,
+    summary="Cadastrar um texto motivador de um tema",
+)
+async def cadastrar_texto_motivador(
+    texto_motivador: schemas.TextoMotivadorCreate, db: AsyncSession = Depends(get_db)
+):
+    """Textos cadastrados são usados pela triagem para anular redações copiadas deles."""
+    db_texto = models.TextoMotivador(tema=texto_motivador.tema, texto=texto_motivador.texto)
+    db.add(db_texto)
+    await db.commit()
+    return db_texto
+
+
 @app.get(
     "/api/v1/redacoes/{redacao_id}",
     response_model=schemas.RedacaoResult,
     summary="Obter o status e resultado de uma correção",
 )
-def obter_status_correcao(redacao_id: int, db: Session = Depends(get_db)):
-    db_redacao = (
-        db.query(models.Redacao).filter(models.Redacao.id == redacao_id).first()
+async def obter_status_correcao(
+    redacao_id: int,
+    expand: Optional[str] = Query(
+        None,
+        regex="^detalhes$",
+        description="Use 'detalhes' para incluir as saídas completas de cada corretor.",
+    ),
+    db: AsyncSession = Depends(get_db),
+):
+    resultado = await _consultar_resultado(db, redacao_id, expandir=expand == "detalhes")
+    if resultado is None:
+        raise HTTPException(status_code=404, detail="Redação não encontrada")
+    return resultado
+
+
+# Colunas do resumo de uma correção (sem o texto nem os detalhes comprimidos)
+COLUNAS_RESUMO = (
+    models.Redacao.id,
+    models.Redacao.status,
+    models.Redacao.tema,
+    models.Redacao.resultado_json,
+    models.Redacao.nota_final,
+    models.Redacao.fonte_resultado,
+    models.Redacao.usou_supervisor,
+    models.Redacao.comentario_geral,
+    models.Redacao.redacao_principal_id,
+)
+
+
+async def _consultar_resultado(db: AsyncSession, redacao_id: int, expandir: bool = False):
+    """
+    Resumo da correção. Com `expandir`, inclui as saídas completas dos
+    corretores, descomprimidas (as acopladas usam as da redação principal).
+    """
+    linha = (
+        await db.execute(select(*COLUNAS_RESUMO).where(models.Redacao.id == redacao_id))
+    ).first()
+    if linha is None:
+        return None
+    resultado = dict(linha._mapping)
+    if expandir:
+        comprimido = await db.scalar(
+            select(models.Redacao.detalhes_comprimidos).where(
+                models.Redacao.id == (linha.redacao_principal_id or linha.id)
+            )
+        )
+        resultado["detalhes"] = descomprimir_detalhes(comprimido)
+    return resultado
+
+
+@app.get(
+    "/api/v1/redacoes/{redacao_id}/feedback",
+    response_model=schemas.FeedbackStatus,
+    summary="Obter o comentário geral da correção (gerado no primeiro pedido)",
+)
+async def obter_feedback(redacao_id: int, response: Response, db: AsyncSession = Depends(get_db)):
+    """
+    O comentário geral é gerado uma única vez, a partir do resultado
+    consolidado, quando é pedido pela primeira vez: responde 202 (GERANDO)
+    enquanto a tarefa gerar_feedback roda e 200 (PRONTO) com o comentário gravado.
+    """
+    linha = (
+        await db.execute(
+            select(
+                models.Redacao.id,
+                models.Redacao.status,
+                models.Redacao.comentario_geral,
+                models.Redacao.redacao_principal_id,
+            ).where(models.Redacao.id == redacao_id)
+        )
+    ).first()
+    if linha is None:
+        raise HTTPException(status_code=404, detail="Redação não encontrada")
+    if linha.comentario_geral is not None:
+        return {"id": linha.id, "status": "PRONTO", "comentario_geral": linha.comentario_geral}
+    if linha.status != "CONCLUIDO":
+        raise HTTPException(status_code=409, detail="A correção desta redação ainda não foi concluída.")
+
+    # Só o primeiro pedido (ou um pedido vencido) dispara a tarefa; acopladas
+    # usam o comentário da principal
+    principal_id = linha.redacao_principal_id or linha.id
+    solicitado = (
+        await db.execute(
+            update(models.Redacao)
+            .where(
+                models.Redacao.id == principal_id,
+                models.Redacao.comentario_geral.is_(None),
+                or_(
+                    models.Redacao.feedback_solicitado_em.is_(None),
+                    models.Redacao.feedback_solicitado_em
+                    < func.now() - timedelta(seconds=FEEDBACK_REENVIO_SEGUNDOS),
+                ),
+            )
+            .values(feedback_solicitado_em=func.now())
+            .returning(models.Redacao.id)
+            .execution_options(synchronize_session=False)
+        )
+    ).first()
+    await db.commit()
+    if solicitado:
+        await _enviar_tarefa("gerar_feedback", args=[principal_id])
+
+    response.status_code = 202
+    return {"id": linha.id, "status": "GERANDO", "comentario_geral": None}
+
+
+async def _ler_itens_lote(request: Request) -> List[schemas.RedacaoCreate]:
+    """Lê o corpo do lote como array JSON ou, se o content-type for NDJSON, linha a linha."""
+    itens: List[schemas.RedacaoCreate] = []
+
+    def _adicionar(bruto, posicao):
+        if len(itens) >= LOTE_MAX_ITENS:
+            raise HTTPException(
+                status_code=413, detail=f"O lote excede o limite de {LOTE_MAX_ITENS} redações."
+            )
+        try:
+            itens.append(schemas.RedacaoCreate.parse_obj(bruto))
+        except ValidationError as e:
+            raise HTTPException(
+                status_code=422, detail={"item": posicao, "erros": e.errors()}
+            )
+
+    try:
+        if "ndjson" in request.headers.get("content-type", ""):
+            # Processa o stream incrementalmente, sem montar o corpo inteiro em memória
+            pendente = b""
+            linha_atual = 0
+            async for bloco in request.stream():
+                pendente += bloco
+                *linhas, pendente = pendente.split(b"\n")
+                for linha in linhas:
+                    if linha.strip():
+                        _adicionar(json.loads(linha), linha_atual)
+                    linha_atual += 1
+            if pendente.strip():
+                _adicionar(json.loads(pendente), linha_atual)
+        else:
+            corpo = await request.json()
+            if not isinstance(corpo, list):
+                raise HTTPException(status_code=422, detail="O corpo deve ser um array JSON.")
+            for posicao, bruto in enumerate(corpo):
+                _adicionar(bruto, posicao)
+    except json.JSONDecodeError as e:
+        raise HTTPException(status_code=400, detail=f"JSON inválido: {e}")
+
+    if not itens:
+        raise HTTPException(status_code=422, detail="O lote está vazio.")
+    return itens
+
+
+async def _inserir_lote(db: AsyncSession, itens: List[schemas.RedacaoCreate]):
+    """
+    Insere o lote com INSERTs multi-linha (RETURNING) e devolve os ids que precisam
+    de correção. Submissões idênticas, dentro do lote ou já em andamento, são
+    acopladas à redação principal como no endpoint individual.
+    """
+    lote = models.Lote(total=len(itens))
+    db.add(lote)
+    await db.flush()
+
+    hashes = [hash_redacao(item.tema, item.texto_redacao) for item in itens]
+    distintos = sorted(set(hashes))
+
+    async def _principais_em_andamento(candidatos):
+        principais = {}
+        for inicio in range(0, len(candidatos), LOTE_TAMANHO_INSERT):
+            linhas = await db.execute(
+                select(models.Redacao.id, models.Redacao.hash_conteudo, models.Redacao.status)
+                .where(
+                    models.Redacao.hash_conteudo.in_(candidatos[inicio:inicio + LOTE_TAMANHO_INSERT]),
+                    models.Redacao.redacao_principal_id.is_(None),
+                    models.Redacao.status.in_(models.STATUS_EM_ANDAMENTO),
+                )
+                .order_by(models.Redacao.id.desc())
+            )
+            for id_, hash_, status in linhas:
+                principais[hash_] = (id_, status)
+        return principais
+
+    # Só trava (em ordem, para evitar deadlock) os hashes que já têm correção em
+    # andamento, e confirma o acoplamento sob a trava.
+    candidatos = await _principais_em_andamento(distintos)
+    if candidatos:
+        for hash_ in sorted(candidatos):
+            await db.execute(text("SELECT pg_advisory_xact_lock(:chave)"), {"chave": chave_trava(hash_)})
+        candidatos = await _principais_em_andamento(sorted(candidatos))
+
+    async def _inserir(linhas):
+        retornados = []
+        for inicio in range(0, len(linhas), LOTE_TAMANHO_INSERT):
+            resultado = await db.execute(
+                insert(models.Redacao)
+                .values(linhas[inicio:inicio + LOTE_TAMANHO_INSERT])
+                .returning(models.Redacao.id, models.Redacao.hash_conteudo)
+            )
+            retornados.extend(resultado.all())
+        return retornados
+
+    # 1) Uma redação principal por conteúdo ainda sem correção em andamento
+    novos, acopladas, vistos = [], [], set()
+    for item, hash_ in zip(itens, hashes):
+        linha = {
+            "tema": item.tema,
+            "texto_redacao": item.texto_redacao,
+            "hash_conteudo": hash_,
+            "lote_id": lote.id,
+            "prioridade": models.PRIORIDADE_LOTE,
+            "origem": item.origem,
+        }
+        if hash_ in candidatos or hash_ in vistos:
+            acopladas.append(linha)
+        else:
+            vistos.add(hash_)
+            novos.append({**linha, "status": "PENDENTE"})
+
+    principais = await _inserir(novos)
+    ids_para_corrigir = [id_ for id_, _ in principais]
+    for id_, hash_ in principais:
+        candidatos[hash_] = (id_, "PENDENTE")
+
+    # 2) Cópias acopladas à principal correspondente
+    for linha in acopladas:
+        principal_id, status = candidatos[linha["hash_conteudo"]]
+        linha.update(redacao_principal_id=principal_id, status=status)
+    await _inserir(acopladas)
+
+    await db.commit()
+    return lote.id, ids_para_corrigir
+
+
+@app.post(
+    "/api/v1/redacoes/lote",
+    response_model=schemas.LoteStatus,
+    status_code=202,
+    summary="Submeter um lote de redações (array JSON ou NDJSON)",
+)
+async def criar_lote(request: Request, db: AsyncSession = Depends(get_db)):
+    itens = await _ler_itens_lote(request)
+    lote_id, ids_para_corrigir = await _inserir_lote(db, itens)
+
+    # As correções do lote entram na fila aos poucos, revezando com as das
+    # demais origens (worker/despacho.py); o despacho é antecipado para o lote
+    # começar a andar sem esperar a próxima rodada do beat
+    if ids_para_corrigir:
+        await _enviar_tarefa("despachar_lotes")
+    REDACOES_SUBMETIDAS.labels("lote", "fila").inc(len(ids_para_corrigir))
+    REDACOES_SUBMETIDAS.labels("lote", "acoplada").inc(len(itens) - len(ids_para_corrigir))
+
+    return {
+        "lote_id": lote_id,
+        "total": len(itens),
+        "correcoes_disparadas": len(ids_para_corrigir),
+        "message": "O lote foi recebido; as correções entram na fila aos poucos, revezando com outras origens.",
+    }
+
+
+@app.get(
+    "/api/v1/redacoes/lote/{lote_id}",
+    response_model=schemas.LoteProgresso,
+    summary="Obter o progresso agregado de um lote",
+)
+async def obter_progresso_lote(lote_id: int, db: AsyncSession = Depends(get_db)):
+    lote = await db.get(models.Lote, lote_id)
+    if lote is None:
+        raise HTTPException(status_code=404, detail="Lote não encontrado")
+
+    por_status = dict(
+        (
+            await db.execute(
+                select(models.Redacao.status, func.count(models.Redacao.id))
+                .where(models.Redacao.lote_id == lote_id)
+                .group_by(models.Redacao.status)
+            )
+        ).all()
+    )
+    finalizadas = por_status.get("CONCLUIDO", 0) + por_status.get("ERRO", 0)
+    return {
+        "lote_id": lote.id,
+        "total": lote.total,
+        "por_status": por_status,
+        "finalizadas": finalizadas,
+        "percentual": round(100.0 * finalizadas / lote.total, 2) if lote.total else 0.0,
+    }
+
+
+async def _carregar_estado(redacao_id: int):
+    """Consulta leve (sem texto nem resultado) usada pelos endpoints de push."""
+    async with AsyncSessionLocal() as db:
+        return (
+            await db.execute(
+                select(
+                    models.Redacao.id,
+                    models.Redacao.status,
+                    models.Redacao.redacao_principal_id,
+                ).where(models.Redacao.id == redacao_id)
+            )
+        ).first()
+
+
+async def _carregar_redacao(redacao_id: int):
+    async with AsyncSessionLocal() as db:
+        return await _consultar_resultado(db, redacao_id)
+
+
+def _formatar_sse(tipo: str, dados: dict) -> str:
+    return f"event: {tipo}\ndata: {json.dumps(dados, ensure_ascii=False)}\n\n"
+
+
+@app.get(
+    "/api/v1/redacoes/{redacao_id}/eventos",
+    summary="Acompanhar a correção por Server-Sent Events",
+)
+async def acompanhar_correcao(redacao_id: int, request: Request):
+    estado = await _carregar_estado(redacao_id)
+    if estado is None:
+        raise HTTPException(status_code=404, detail="Redação não encontrada")
+    # Submissões acopladas recebem os eventos da correção principal
+    canal_id = estado.redacao_principal_id or estado.id
+
+    async def _stream():
+        async with assinar_eventos(canal_id) as fila:
+            # Lê o status só depois de assinar o canal, para não perder transições
+            atual = await _carregar_estado(redacao_id)
+            yield _formatar_sse("status", {"redacao_id": redacao_id, "status": atual.status})
+            if atual.status in models.STATUS_FINAIS:
+                return
+
+            while not await request.is_disconnected():
+                evento = await proximo_evento(fila, SSE_INTERVALO_KEEPALIVE)
+                if evento is None:
+                    yield ": keepalive\n\n"
+                    continue
+                evento["redacao_id"] = redacao_id
+                yield _formatar_sse(evento["tipo"], evento)
+                if evento["tipo"] == "status" and evento.get("status") in models.STATUS_FINAIS:
+                    return
+
+    return StreamingResponse(
+        _stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
-    if db_redacao is None:
+
+
+@app.get(
+    "/api/v1/redacoes/{redacao_id}/aguardar",
+    response_model=schemas.RedacaoResult,
+    summary="Aguardar (long-poll) a próxima mudança de status de uma correção",
+)
+async def aguardar_correcao(
+    redacao_id: int,
+    status_atual: Optional[str] = Query(
+        None, description="Status conhecido pelo cliente; responde assim que ele mudar."
+    ),
+    timeout: float = Query(30, gt=0, le=LONG_POLL_TIMEOUT_MAX),
+):
+    estado = await _carregar_estado(redacao_id)
+    if estado is None:
         raise HTTPException(status_code=404, detail="Redação não encontrada")
-    return db_redacao
+
+    async with assinar_eventos(estado.redacao_principal_id or estado.id) as fila:
+        atual = await _carregar_estado(redacao_id)
+        conhecido = status_atual or atual.status
+        if atual.status == conhecido and atual.status not in models.STATUS_FINAIS:
+            limite = time.monotonic() + timeout
+            while True:
+                evento = await proximo_evento(fila, limite - time.monotonic())
+                if evento is None:
+                    break
+                if evento["tipo"] == "status" and evento.get("status") != conhecido:
+                    break
+
+    return await _carregar_redacao(redacao_id)
@@ -0,0 +1,36 @@
+import time
+
+from prometheus_client import Counter, Histogram, make_asgi_app
+from starlette.middleware.base import BaseHTTPMiddleware
+
+HTTP_DURACAO = Histogram(
+    "api_requisicao_segundos",
+    "Duração das requisições HTTP, por endpoint, método e status.",
+    ["endpoint", "metodo", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 15, 60),
+)
+REDACOES_SUBMETIDAS = Counter(
+    "api_redacoes_submetidas_total",
+    "Redações recebidas, por origem (individual, lote) e destino (fila, acoplada).",
+    ["origem", "destino"],
+)
+
+# App ASGI que serve o registro padrão do prometheus_client em /metrics
+app_metricas = make_asgi_app()
+
+
+class MiddlewareMetricas(BaseHTTPMiddleware):
+    """Mede cada requisição; o endpoint é o nome da função que a atendeu."""
+
+    async def dispatch(self, request, call_next):
+        inicio = time.perf_counter()
+        status = 500
+        try:
+            resposta = await call_next(request)
+            status = resposta.status_code
+            return resposta
+        finally:
+            endpoint = request.scope.get("endpoint")
+            HTTP_DURACAO.labels(
+                getattr(endpoint, "__name__", "outros"), request.method, str(status)
+            ).observe(time.perf_counter() - inicio)
@@ -0,0 +1,104 @@
+"""
+Benchmark de carga da API (requisições/s e latência).
+
+Rode contra a API no ar antes e depois de uma mudança para comparar:
+
+    python benchmarks/bench_api.py --url http://localhost:8000 --cenario consultar --total 5000 --concorrencia 200
+    python benchmarks/bench_api.py --url http://localhost:8000 --cenario submeter --total 1000 --concorrencia 100
+
+O cenário "submeter" cria redações de verdade (e enfileira correções); use-o
+em um ambiente de teste. Requer `httpx` (pip install httpx).
+
+Referência (handlers síncronos com psycopg2 -> assíncronos com asyncpg), um
+processo uvicorn, Postgres e Redis locais, pool padrão de cada versão (5 + 10
+no síncrono, 10 + 20 no assíncrono), tudo em uma única vCPU dividida com o
+cliente; faixa de 2 a 3 execuções:
+
+    cenário               síncrono                   assíncrono
+    consultar, conc. 20   138-148 req/s, p99 0,6 s   168-177 req/s, p99 0,55 s
+    submeter, conc. 20    89-91 req/s, p99 0,42 s    99-109 req/s, p99 0,33 s
+    consultar, conc. 200  103-122 req/s, p99 7-10 s  117-140 req/s, p99 6-8 s
+    submeter, conc. 100   trava (todas expiram)      41-46 req/s, p99 7,8 s
+
+Na versão síncrona, com mais requisições que conexões no pool, as 40 threads
+do threadpool ficam esperando conexão enquanto as 15 conexões, "idle in
+transaction", esperam uma thread livre para o get_db fechar a sessão: a API
+só volta reiniciada. Na consulta com concorrência 200 isso aconteceu em uma
+de três execuções.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+
+import httpx
+
+
+def _percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))]
+
+
+async def _executar(args):
+    latencias, erros = [], 0
+    fila = asyncio.Queue()
+    for i in range(args.total):
+        fila.put_nowait(i)
+
+    async with httpx.AsyncClient(
+        base_url=args.url,
+        timeout=30,
+        limits=httpx.Limits(max_connections=args.concorrencia),
+    ) as cliente:
+        redacao_id = args.redacao_id
+        if args.cenario == "consultar" and redacao_id is None:
+            resposta = await cliente.post(
+                "/api/v1/redacoes/",
+                json={"tema": "benchmark", "texto_redacao": f"Texto de benchmark {uuid.uuid4()}"},
+            )
+            redacao_id = resposta.json()["id"]
+
+        async def _trabalhador():
+            nonlocal erros
+            while True:
+                try:
+                    i = fila.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                inicio = time.perf_counter()
+                try:
+                    if args.cenario == "submeter":
+                        resposta = await cliente.post(
+                            "/api/v1/redacoes/",
+                            json={"tema": "benchmark", "texto_redacao": f"Redação {i} {uuid.uuid4()}"},
+                        )
+                    else:
+                        resposta = await cliente.get(f"/api/v1/redacoes/{redacao_id}")
+                    if resposta.status_code >= 400:
+                        erros += 1
+                except httpx.HTTPError:
+                    erros += 1
+                latencias.append(time.perf_counter() - inicio)
+
+        inicio_total = time.perf_counter()
+        await asyncio.gather(*(_trabalhador() for _ in range(args.concorrencia)))
+        duracao = time.perf_counter() - inicio_total
+
+    print(f"cenário={args.cenario} total={args.total} concorrência={args.concorrencia}")
+    print(f"requisições/s: {args.total / duracao:.1f}")
+    print(
+        f"latência (ms): média={statistics.mean(latencias) * 1000:.1f} "
+        f"p50={_percentil(latencias, 0.50) * 1000:.1f} p99={_percentil(latencias, 0.99) * 1000:.1f}"
+    )
+    print(f"erros: {erros}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--cenario", choices=["consultar", "submeter"], default="consultar")
+    parser.add_argument("--total", type=int, default=2000)
+    parser.add_argument("--concorrencia", type=int, default=100)
+    parser.add_argument("--redacao-id", type=int, default=None)
+    asyncio.run(_executar(parser.parse_args()))
@@ -0,0 +1,100 @@
+"""
+Compara o tamanho do resultado de uma correção no formato antigo (um único
+resultado_json com as saídas completas de todos os corretores e as
+justificativas concatenadas nas médias) com o formato atual: resumo em
+resultado_json, notas em notas_competencia e detalhes comprimidos.
+
+Usa textos sintéticos com o tamanho típico das saídas do LLM (o vocabulário
+reduzido comprime mais que texto real, então a taxa de compressão dos
+detalhes é otimista); não acessa o banco:
+
+    python benchmarks/bench_armazenamento.py --supervisor
+"""
+import argparse
+import json
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "worker"))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from banca.rules import (  # noqa: E402
+    calcular_nota_consolidada,
+    resolver_discrepancia_com_supervisor,
+)
+from shared.resultados import separar_resultado  # noqa: E402
+
+# Bytes por linha de notas_competencia: cabeçalho da tupla (~24) + int4 + 2x int2 + float8
+BYTES_LINHA_NOTA = 24 + 4 + 2 + 2 + 8
+
+PALAVRAS = (
+    "a redação apresenta argumentação consistente porém o repertório sociocultural "
+    "não é legitimado e há desvios de concordância e regência que comprometem a coesão"
+).split()
+
+
+def _texto(rng, palavras):
+    return " ".join(rng.choice(PALAVRAS) for _ in range(palavras))
+
+
+def _correcao(rng, id_corretor, competencias=range(1, 6)):
+    avaliacoes = [
+        {
+            "competencia": n,
+            "analise_critica": _texto(rng, 180),
+            "nota": rng.choice((80, 120, 160, 200)),
+            "justificativa": _texto(rng, 60),
+        }
+        for n in competencias
+    ]
+    return {
+        "competencias": avaliacoes,
+        "nota_final": sum(a["nota"] for a in avaliacoes),
+        "comentarios_gerais": _texto(rng, 90),
+        "id_corretor": id_corretor,
+        "modo_avaliacao": "por_competencia",
+    }
+
+
+def _formato_antigo(resultado):
+    """Médias com as justificativas dos dois corretores concatenadas (formato anterior)."""
+    antigo = json.loads(json.dumps(resultado))
+    c1, c2 = antigo["detalhes"][0], antigo["detalhes"][1]
+    for final, comp1, comp2 in zip(antigo["competencias"], c1["competencias"], c2["competencias"]):
+        if final["justificativa"].startswith("[Média"):
+            final["justificativa"] += f" | {comp1['justificativa']} | {comp2['justificativa']}"
+    return antigo
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--supervisor", action="store_true", help="Inclui o Corretor Supervisor.")
+    parser.add_argument("--semente", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.semente)
+    c1, c2 = _correcao(rng, "Corretor 1"), _correcao(rng, "Corretor 2")
+    if args.supervisor:
+        resultado = resolver_discrepancia_com_supervisor(
+            c1, c2, _correcao(rng, "Corretor Supervisor", competencias=(2, 3))
+        )
+    else:
+        resultado = calcular_nota_consolidada(c1, c2)
+
+    antigo = len(json.dumps(_formato_antigo(resultado), ensure_ascii=False).encode("utf-8"))
+    resumo, colunas, notas = separar_resultado(resultado)
+    tamanho_resumo = len(json.dumps(resumo, ensure_ascii=False).encode("utf-8"))
+    tamanho_detalhes = len(colunas["detalhes_comprimidos"] or b"")
+    tamanho_notas = len(notas) * BYTES_LINHA_NOTA
+
+    print(f"Formato antigo (resultado_json único): {antigo:>7} bytes")
+    print(f"Resumo em resultado_json:              {tamanho_resumo:>7} bytes (lido em toda consulta)")
+    print(f"Detalhes comprimidos (sob demanda):    {tamanho_detalhes:>7} bytes")
+    print(f"notas_competencia ({len(notas)} linhas):         {tamanho_notas:>7} bytes")
+    total = tamanho_resumo + tamanho_detalhes + tamanho_notas
+    print(f"Total armazenado:                      {total:>7} bytes ({total / antigo:.0%} do antigo)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Benchmark ponta a ponta: API -> broker -> correct_essay -> banco.
+
+Suba a stack com o backend de LLM falso (sem gastar cota) e rode:
+
+    docker compose -f docker-compose.yml -f docker-compose.bench.yml up -d --build
+    python benchmarks/bench_pipeline.py --url http://localhost:8000 --redis redis://localhost:6379/0 --redacoes 200
+
+Mede redações/min, latência p50/p99 (da submissão até o status final) e
+chamadas ao LLM por redação (contador mantido pelo backend falso no Redis).
+Requer `httpx` (pip install httpx).
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+import uuid
+
+import httpx
+import redis
+
+CHAVE_CONTADOR = "fake_llm:chamadas"
+
+FRASES = [
+    "A educação pública de qualidade é um direito garantido pela Constituição Federal de 1988.",
+    "No entanto, a realidade brasileira mostra que esse direito ainda não foi plenamente efetivado.",
+    "Segundo dados do IBGE, milhões de jovens abandonam a escola antes de concluir o ensino médio.",
+    "Esse cenário decorre da falta de investimento e da desigualdade social que marca o país.",
+    "Além disso, a ausência de políticas de permanência estudantil agrava o problema.",
+    "Dessa forma, é necessário que o Estado atue de maneira mais efetiva para reverter essa situação.",
+    "Portanto, cabe ao Ministério da Educação ampliar programas de apoio aos estudantes.",
+    "Essa medida deve ser feita por meio de bolsas e acompanhamento pedagógico nas escolas.",
+]
+
+
+def _gerar_redacao(rng: random.Random) -> str:
+    paragrafos = []
+    for _ in range(4):
+        paragrafos.append(" ".join(rng.sample(FRASES, 4)))
+    # Identificador único para que cache e deduplicação não mascarem a medição
+    return "\n\n".join(paragrafos) + f"\n\nRedação de benchmark {uuid.uuid4()}."
+
+
+def _percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))]
+
+
+async def _executar(args):
+    rng = random.Random(args.semente)
+    contador = redis.Redis.from_url(args.redis)
+    chamadas_antes = int(contador.get(CHAVE_CONTADOR) or 0)
+
+    latencias, finais = [], {}
+    semaforo = asyncio.Semaphore(args.concorrencia)
+
+    async with httpx.AsyncClient(base_url=args.url, timeout=120) as cliente:
+
+        async def _uma_redacao():
+            async with semaforo:
+                inicio = time.perf_counter()
+                resposta = await cliente.post(
+                    "/api/v1/redacoes/",
+                    json={"tema": "Evasão escolar no Brasil", "texto_redacao": _gerar_redacao(rng)},
+                )
+                resposta.raise_for_status()
+                redacao_id, status = resposta.json()["id"], resposta.json()["status"]
+
+            # Long-poll até o status final (não ocupa o semáforo de submissão)
+            while status not in ("CONCLUIDO", "ERRO"):
+                resposta = await cliente.get(
+                    f"/api/v1/redacoes/{redacao_id}/aguardar",
+                    params={"status_atual": status, "timeout": 60},
+                )
+                status = resposta.json()["status"]
+            latencias.append(time.perf_counter() - inicio)
+            finais[status] = finais.get(status, 0) + 1
+
+        inicio_total = time.perf_counter()
+        await asyncio.gather(*(_uma_redacao() for _ in range(args.redacoes)))
+        duracao = time.perf_counter() - inicio_total
+
+    chamadas = int(contador.get(CHAVE_CONTADOR) or 0) - chamadas_antes
+    print(f"redações: {args.redacoes} em {duracao:.1f}s  status finais: {finais}")
+    print(f"vazão: {args.redacoes / duracao * 60:.1f} redações/min")
+    print(
+        f"latência (s): p50={_percentil(latencias, 0.50):.1f} "
+        f"p99={_percentil(latencias, 0.99):.1f} média={statistics.mean(latencias):.1f}"
+    )
+    print(f"chamadas ao LLM por redação: {chamadas / args.redacoes:.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--redis", default="redis://localhost:6379/0")
+    parser.add_argument("--redacoes", type=int, default=100)
+    parser.add_argument("--concorrencia", type=int, default=50, help="Submissões simultâneas.")
+    parser.add_argument("--semente", type=int, default=42)
+    asyncio.run(_executar(parser.parse_args()))
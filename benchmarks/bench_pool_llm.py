@@ -0,0 +1,59 @@
+"""
+Micro-benchmark do custo de preparação por chamada ao LLM.
+
+Compara a montagem feita a cada chamada (cliente ChatGoogleGenerativeAI,
+ChatPromptTemplate, JsonOutputParser, with_structured_output, pipe da chain e
+get_format_instructions) com a busca no pool do processo (agents/pool.py).
+Não faz chamadas de rede; basta uma GOOGLE_API_KEY qualquer:
+
+    cd worker && GOOGLE_API_KEY=x DATABASE_URL=postgresql://x python ../benchmarks/bench_pool_llm.py
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "worker"))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from langchain_google_genai import ChatGoogleGenerativeAI  # noqa: E402
+from langchain_core.output_parsers import JsonOutputParser  # noqa: E402
+from langchain_core.prompts import ChatPromptTemplate  # noqa: E402
+
+from agents.core import MODEL_NAME, TEMP_CORRETOR_PADRAO  # noqa: E402
+from agents.pool import obter_recursos  # noqa: E402
+from agents.prompts import TEMPLATE_AGENTE_COMPETENCIA  # noqa: E402
+from shared.schemas import AvaliacaoCompetencia  # noqa: E402
+
+
+def _montagem_por_chamada():
+    llm = ChatGoogleGenerativeAI(model=MODEL_NAME, temperature=TEMP_CORRETOR_PADRAO)
+    parser = JsonOutputParser(pydantic_object=AvaliacaoCompetencia)
+    prompt = ChatPromptTemplate.from_template(TEMPLATE_AGENTE_COMPETENCIA)
+    chain = prompt | llm.with_structured_output(AvaliacaoCompetencia)
+    return chain, parser.get_format_instructions()
+
+
+def _busca_no_pool():
+    return obter_recursos(MODEL_NAME, TEMP_CORRETOR_PADRAO).chain_competencia
+
+
+def _medir(funcao, repeticoes):
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        funcao()
+    return (time.perf_counter() - inicio) / repeticoes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeticoes", type=int, default=200)
+    args = parser.parse_args()
+
+    _busca_no_pool()  # primeira criação fica fora da medição, como no aquecimento do worker
+    por_chamada = _medir(_montagem_por_chamada, args.repeticoes)
+    pool = _medir(_busca_no_pool, args.repeticoes)
+
+    print(f"montagem por chamada: {por_chamada * 1e3:.3f} ms")
+    print(f"busca no pool:        {pool * 1e3:.3f} ms")
+    print(f"por redação (10 chamadas): {por_chamada * 10 * 1e3:.1f} ms -> {pool * 10 * 1e3:.3f} ms")
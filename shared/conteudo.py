@@ -0,0 +1,35 @@
+import hashlib
+import re
+import unicodedata
+
+_ESPACOS_HORIZONTAIS = re.compile(r"[ \t ]+")
+_LINHAS_EM_BRANCO = re.compile(r"\n{3,}")
+
+
+def normalizar_texto(texto: str) -> str:
+    """
+    Normaliza um texto para comparação de conteúdo.
+
+    Unifica a forma Unicode (NFC) e as quebras de linha, remove espaços
+    redundantes e linhas em branco extras, mas preserva a divisão em
+    parágrafos, que faz parte da avaliação.
+    """
+    texto = unicodedata.normalize("NFC", texto or "")
+    texto = texto.replace("\r\n", "\n").replace("\r", "\n")
+    linhas = [_ESPACOS_HORIZONTAIS.sub(" ", linha).strip() for linha in texto.split("\n")]
+    return _LINHAS_EM_BRANCO.sub("\n\n", "\n".join(linhas)).strip()
+
+
+def hash_conteudo(*partes) -> str:
+    """Hash SHA-256 (hex) estável de uma sequência de partes."""
+    return hashlib.sha256("\x1f".join(str(p) for p in partes).encode("utf-8")).hexdigest()
+
+
+def hash_redacao(tema: str, texto_redacao: str) -> str:
+    """Identidade de conteúdo de uma submissão (tema + texto normalizados)."""
+    return hash_conteudo(normalizar_texto(tema), normalizar_texto(texto_redacao))
+
+
+def chave_trava(hash_hex: str) -> int:
+    """Converte um hash em uma chave bigint para pg_advisory_xact_lock."""
+    return int.from_bytes(bytes.fromhex(hash_hex[:16]), "big", signed=True)
@@ -0,0 +1,195 @@
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+try:
+    import redis
+except ImportError:  # pragma: no cover - redis faz parte do requirements.txt
+    redis = None
+
+# Configuração de Logs
+logger = logging.getLogger(__name__)
+
+# Disjuntor da cota do LLM, compartilhado por todos os workers (e lido pela API)
+DISJUNTOR_REDIS_URL = os.getenv("DISJUNTOR_REDIS_URL") or os.getenv("CELERY_BROKER_URL")
+CHAVE_DISJUNTOR = "disjuntor:llm"
+
+# Pausa mínima e máxima após um 429. Aberturas seguidas dobram a pausa
+# (backoff exponencial), sem nunca ficar abaixo da espera sugerida pela API.
+DISJUNTOR_ESPERA_MINIMA = float(os.getenv("DISJUNTOR_ESPERA_MINIMA", "10"))
+DISJUNTOR_ESPERA_MAXIMA = float(os.getenv("DISJUNTOR_ESPERA_MAXIMA", "900"))
+# Duração da retomada gradual: a vazão sobe de DISJUNTOR_FATOR_INICIAL a 100%
+DISJUNTOR_RAMPA_SEGUNDOS = float(os.getenv("DISJUNTOR_RAMPA_SEGUNDOS", "60"))
+DISJUNTOR_FATOR_INICIAL = float(os.getenv("DISJUNTOR_FATOR_INICIAL", "0.2"))
+
+FECHADO = "FECHADO"
+ABERTO = "ABERTO"
+RECUPERANDO = "RECUPERANDO"
+
+# Abre o disjuntor de forma atômica. Se já estiver aberto, só informa quanto
+# falta (a enxurrada de 429 de uma mesma janela conta como uma abertura).
+# ARGV: espera sugerida, espera mínima, espera máxima, duração da rampa.
+# Retorna {segundos até fechar, 1 se esta chamada abriu o disjuntor}.
+SCRIPT_ABRIR = """
+local t = redis.call('TIME')
+local agora = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local sugerida = tonumber(ARGV[1])
+local minima = tonumber(ARGV[2])
+local maxima = tonumber(ARGV[3])
+local rampa = tonumber(ARGV[4])
+local estado = redis.call('HMGET', KEYS[1], 'aberto_ate', 'seguidas')
+local aberto_ate = tonumber(estado[1]) or 0
+local seguidas = tonumber(estado[2]) or 0
+if aberto_ate > agora then
+    return {tostring(aberto_ate - agora), '0'}
+end
+if agora > aberto_ate + rampa then
+    seguidas = 0
+end
+seguidas = seguidas + 1
+local espera = math.min(maxima, math.max(sugerida, minima * 2 ^ (seguidas - 1)))
+redis.call('HSET', KEYS[1], 'aberto_ate', agora + espera, 'seguidas', seguidas, 'ultima_abertura', agora)
+redis.call('HINCRBY', KEYS[1], 'aberturas', 1)
+return {tostring(espera), '1'}
+"""
+
+
+def _calcular_estado(campos: Dict[str, float], agora: float) -> Dict[str, Any]:
+    """Estado derivado do horário: aberto até `aberto_ate`, depois em rampa."""
+    aberto_ate = campos.get("aberto_ate", 0.0)
+    desde_fechamento = agora - aberto_ate
+    if desde_fechamento < 0:
+        estado, fator = ABERTO, 0.0
+    elif aberto_ate and desde_fechamento < DISJUNTOR_RAMPA_SEGUNDOS:
+        estado = RECUPERANDO
+        fator = DISJUNTOR_FATOR_INICIAL + (1 - DISJUNTOR_FATOR_INICIAL) * (
+            desde_fechamento / DISJUNTOR_RAMPA_SEGUNDOS
+        )
+    else:
+        estado, fator = FECHADO, 1.0
+    return {
+        "estado": estado,
+        "segundos_restantes": max(0.0, -desde_fechamento),
+        "fator_taxa": round(fator, 3),
+        "aberturas": int(campos.get("aberturas", 0)),
+        "aberturas_seguidas": int(campos.get("seguidas", 0)),
+        "ultima_abertura": campos.get("ultima_abertura"),
+    }
+
+
+class Disjuntor:
+    """
+    Disjuntor da cota do LLM.
+
+    Um 429 abre o disjuntor pela espera sugerida pela API (dobrando a cada
+    reincidência durante a retomada). Enquanto aberto, os workers param de
+    consumir a fila de correções; ao fechar, a vazão volta aos poucos
+    (`fator_taxa`) ao longo de DISJUNTOR_RAMPA_SEGUNDOS.
+
+    O estado fica no Redis; se ele falhar, cai para um estado local ao processo.
+    """
+
+    def __init__(self, cliente_redis=None, chave: str = CHAVE_DISJUNTOR):
+        self.cliente = cliente_redis
+        self.chave = chave
+        self._script = cliente_redis.register_script(SCRIPT_ABRIR) if cliente_redis else None
+        self._local: Dict[str, float] = {}
+        self._trava = threading.Lock()
+        self._fator_cache: Tuple[float, float] = (0.0, 1.0)
+
+    def _abrir_local(self, sugerida: float) -> Tuple[float, bool]:
+        with self._trava:
+            agora = time.time()
+            aberto_ate = self._local.get("aberto_ate", 0.0)
+            if aberto_ate > agora:
+                return aberto_ate - agora, False
+            seguidas = self._local.get("seguidas", 0)
+            if agora > aberto_ate + DISJUNTOR_RAMPA_SEGUNDOS:
+                seguidas = 0
+            seguidas += 1
+            espera = min(
+                DISJUNTOR_ESPERA_MAXIMA,
+                max(sugerida, DISJUNTOR_ESPERA_MINIMA * 2 ** (seguidas - 1)),
+            )
+            self._local.update(
+                aberto_ate=agora + espera,
+                seguidas=seguidas,
+                ultima_abertura=agora,
+                aberturas=self._local.get("aberturas", 0) + 1,
+            )
+            return espera, True
+
+    def abrir(self, espera_sugerida: Optional[float] = None) -> float:
+        """Registra um 429 e retorna quantos segundos faltam para o disjuntor fechar."""
+        sugerida = espera_sugerida or 0.0
+        abriu = False
+        restante = None
+        if self._script is not None:
+            try:
+                bruto, abriu = self._script(
+                    keys=[self.chave],
+                    args=[
+                        sugerida,
+                        DISJUNTOR_ESPERA_MINIMA,
+                        DISJUNTOR_ESPERA_MAXIMA,
+                        DISJUNTOR_RAMPA_SEGUNDOS,
+                    ],
+                )
+                restante, abriu = float(bruto), abriu in (b"1", "1")
+            except Exception as e:
+                logger.warning(f"Disjuntor no Redis indisponível ({e}); usando estado local.")
+        if restante is None:
+            restante, abriu = self._abrir_local(sugerida)
+        if abriu:
+            logger.warning(f"Disjuntor do LLM ABERTO por {restante:.0f}s.")
+        return restante
+
+    def estado(self) -> Dict[str, Any]:
+        """Estado atual (ABERTO, RECUPERANDO ou FECHADO), fator de vazão e contadores."""
+        if self.cliente is not None:
+            try:
+                with self.cliente.pipeline() as pipe:
+                    pipe.time()
+                    pipe.hgetall(self.chave)
+                    (segundos, micros), bruto = pipe.execute()
+                campos = {k.decode(): float(v) for k, v in bruto.items()}
+                return _calcular_estado(campos, segundos + micros / 1_000_000)
+            except Exception as e:
+                logger.warning(f"Falha ao ler o disjuntor no Redis: {e}")
+        with self._trava:
+            return _calcular_estado(dict(self._local), time.time())
+
+    def segundos_restantes(self) -> float:
+        return self.estado()["segundos_restantes"]
+
+    def fator_taxa(self) -> float:
+        """
+        Fração da cota liberada agora (1 = normal). Consultado antes de cada
+        chamada ao LLM, por isso é reaproveitado por um segundo.
+        """
+        lido_em, fator = self._fator_cache
+        agora = time.monotonic()
+        if agora - lido_em > 1.0:
+            fator = self.estado()["fator_taxa"]
+            self._fator_cache = (agora, fator)
+        return fator
+
+
+_disjuntor: Optional[Disjuntor] = None
+_trava_registro = threading.Lock()
+
+
+def obter_disjuntor() -> Disjuntor:
+    """Disjuntor compartilhado (instância única por processo)."""
+    global _disjuntor
+    with _trava_registro:
+        if _disjuntor is None:
+            cliente = None
+            if redis is not None and DISJUNTOR_REDIS_URL:
+                cliente = redis.Redis.from_url(
+                    DISJUNTOR_REDIS_URL, socket_timeout=2, socket_connect_timeout=2
+                )
+            _disjuntor = Disjuntor(cliente)
+        return _disjuntor
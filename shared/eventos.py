@@ -0,0 +1,158 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional, Set
+
+import redis
+import redis.asyncio as redis_async
+
+logger = logging.getLogger(__name__)
+
+# Redis usado para o pub/sub de eventos (por padrão, o mesmo do broker)
+EVENTOS_REDIS_URL = os.getenv("EVENTOS_REDIS_URL") or os.getenv("CELERY_BROKER_URL")
+# Eventos guardados por cliente que ainda não os leu; acima disso, descartados
+EVENTOS_FILA_MAX = int(os.getenv("EVENTOS_FILA_MAX", "100"))
+
+
+def canal_redacao(redacao_id: int) -> str:
+    """Canal pub/sub com as transições de status e o progresso de uma redação."""
+    return f"redacao:{redacao_id}:eventos"
+
+
+_cliente = None
+_cliente_async = None
+
+
+def _obter_cliente():
+    global _cliente
+    if _cliente is None:
+        _cliente = redis.Redis.from_url(EVENTOS_REDIS_URL, socket_timeout=2, socket_connect_timeout=2)
+    return _cliente
+
+
+def _obter_cliente_async():
+    global _cliente_async
+    if _cliente_async is None:
+        _cliente_async = redis_async.Redis.from_url(EVENTOS_REDIS_URL)
+    return _cliente_async
+
+
+def publicar_evento(redacao_id: int, tipo: str, **dados: Any) -> None:
+    """
+    Publica um evento (`status`, `progresso` ou `feedback`) no canal da redação.
+
+    A entrega é "melhor esforço": uma falha no Redis é registrada e não interrompe
+    a correção, já que o estado oficial continua no banco.
+    """
+    if not EVENTOS_REDIS_URL:
+        return
+    evento = {"tipo": tipo, "redacao_id": redacao_id, "ts": time.time(), **dados}
+    try:
+        _obter_cliente().publish(canal_redacao(redacao_id), json.dumps(evento, ensure_ascii=False))
+    except Exception as e:
+        logger.warning(f"Falha ao publicar evento '{tipo}' da redação {redacao_id}: {e}")
+
+
+class AssinanteEventos:
+    """
+    Uma única conexão pub/sub por processo da API, compartilhada por todos os
+    clientes SSE e long-poll. Cada canal é assinado no Redis uma vez, enquanto
+    houver alguém esperando por ele, e cada mensagem é repassada às filas
+    (asyncio.Queue) de todos os clientes daquela redação.
+    """
+
+    def __init__(self, cliente=None):
+        self._cliente = cliente
+        self._pubsub = None
+        self._leitor: Optional[asyncio.Task] = None
+        self._filas: Dict[str, Set[asyncio.Queue]] = {}
+        self._trava = asyncio.Lock()
+
+    async def assinar(self, canal: str) -> asyncio.Queue:
+        fila: asyncio.Queue = asyncio.Queue(maxsize=EVENTOS_FILA_MAX)
+        async with self._trava:
+            if self._pubsub is None:
+                self._pubsub = (self._cliente or _obter_cliente_async()).pubsub()
+            ouvintes = self._filas.setdefault(canal, set())
+            ouvintes.add(fila)
+            if len(ouvintes) == 1:
+                try:
+                    await self._pubsub.subscribe(canal)
+                except Exception:
+                    self._remover(canal, fila)
+                    raise
+            if self._leitor is None or self._leitor.done():
+                self._leitor = asyncio.create_task(self._ler())
+        return fila
+
+    async def cancelar(self, canal: str, fila: asyncio.Queue) -> None:
+        async with self._trava:
+            if self._remover(canal, fila):
+                try:
+                    await self._pubsub.unsubscribe(canal)
+                except Exception as e:
+                    logger.warning(f"Falha ao cancelar a assinatura de {canal}: {e}")
+
+    def _remover(self, canal: str, fila: asyncio.Queue) -> bool:
+        """Tira a fila dos ouvintes do canal; True se ele ficou sem nenhum."""
+        ouvintes = self._filas.get(canal, set())
+        ouvintes.discard(fila)
+        if ouvintes:
+            return False
+        self._filas.pop(canal, None)
+        return True
+
+    async def _ler(self) -> None:
+        # Termina quando não sobra nenhum ouvinte; a próxima assinatura o recria
+        while self._filas:
+            try:
+                mensagem = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            except Exception as e:
+                logger.warning(f"Falha ao ler os eventos do Redis: {e}")
+                await asyncio.sleep(1)
+                continue
+            if not mensagem or mensagem.get("type") != "message":
+                continue
+            canal = mensagem["channel"]
+            canal = canal.decode() if isinstance(canal, bytes) else canal
+            evento = json.loads(mensagem["data"])
+            for fila in list(self._filas.get(canal, ())):
+                try:
+                    fila.put_nowait(evento)
+                except asyncio.QueueFull:
+                    logger.warning(f"Cliente de {canal} não acompanha os eventos; descartando um.")
+
+
+_assinante: Optional[AssinanteEventos] = None
+
+
+def obter_assinante() -> AssinanteEventos:
+    global _assinante
+    if _assinante is None:
+        _assinante = AssinanteEventos()
+    return _assinante
+
+
+@asynccontextmanager
+async def assinar_eventos(redacao_id: int):
+    """Assina o canal da redação; use `proximo_evento` para aguardar mensagens."""
+    assinante = obter_assinante()
+    canal = canal_redacao(redacao_id)
+    fila = await assinante.assinar(canal)
+    try:
+        yield fila
+    finally:
+        await assinante.cancelar(canal, fila)
+
+
+async def proximo_evento(fila: asyncio.Queue, timeout: float) -> Optional[Dict[str, Any]]:
+    """Aguarda até `timeout` segundos pelo próximo evento do canal; None se não chegar nenhum."""
+    if timeout <= 0:
+        return None
+    try:
+        return await asyncio.wait_for(fila.get(), timeout)
+    except asyncio.TimeoutError:
+        return None
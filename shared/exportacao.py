@@ -0,0 +1,213 @@
+"""
+Exportação em massa das correções concluídas (CSV, NDJSON ou Parquet).
+
+A consulta achata as cinco notas finais por competência (notas_competencia,
+corretor 0) ao lado das colunas do resumo; as linhas são lidas com cursor do
+lado do servidor, em blocos de EXPORTACAO_LINHAS_POR_BLOCO, e cada bloco é
+serializado e entregue antes do seguinte ser lido. A memória usada não
+depende do tamanho da exportação.
+
+Usado pelo endpoint GET /api/v1/redacoes/exportacao e pelo script
+backend/exportar.py.
+"""
+import csv
+import importlib.util
+import io
+import json
+import os
+from datetime import datetime
+from typing import Any, Optional, Sequence
+
+from sqlalchemy import func, select, true
+
+from .models import NotaCompetencia, Redacao
+from .resultados import CORRETOR_FINAL
+
+# pyarrow é opcional (sem ele, só CSV e NDJSON) e pesado: fica em
+# requirements-parquet.txt, instalado só na imagem da API, e só é importado
+# quando uma exportação em Parquet é pedida, não na subida da API.
+PYARROW_DISPONIVEL = importlib.util.find_spec("pyarrow") is not None
+
+EXPORTACAO_LINHAS_POR_BLOCO = int(os.getenv("EXPORTACAO_LINHAS_POR_BLOCO", "10000"))
+
+NUMERO_COMPETENCIAS = 5
+COLUNAS = (
+    "id",
+    "tema",
+    "criado_em",
+    "lote_id",
+    "nota_final",
+    "fonte_resultado",
+    "usou_supervisor",
+    *(f"nota_c{n}" for n in range(1, NUMERO_COMPETENCIAS + 1)),
+)
+
+FORMATOS = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+
+def formatos_disponiveis() -> Sequence[str]:
+    return [formato for formato in FORMATOS if formato != "parquet" or PYARROW_DISPONIVEL]
+
+
+def consulta_exportacao(
+    tema: Optional[str] = None,
+    criado_desde: Optional[datetime] = None,
+    criado_ate: Optional[datetime] = None,
+):
+    """
+    Correções concluídas, uma linha por redação (na ordem do id), com as notas
+    finais das competências em colunas. Acopladas usam as notas da principal.
+    """
+    notas = (
+        select(
+            *(
+                func.max(NotaCompetencia.nota)
+                .filter(NotaCompetencia.competencia == n)
+                .label(f"nota_c{n}")
+                for n in range(1, NUMERO_COMPETENCIAS + 1)
+            )
+        )
+        .where(
+            NotaCompetencia.redacao_id == func.coalesce(Redacao.redacao_principal_id, Redacao.id),
+            NotaCompetencia.corretor == CORRETOR_FINAL,
+        )
+        .lateral("notas")
+    )
+    consulta = (
+        select(
+            Redacao.id,
+            Redacao.tema,
+            Redacao.criado_em,
+            Redacao.lote_id,
+            Redacao.nota_final,
+            Redacao.fonte_resultado,
+            Redacao.usou_supervisor,
+            *notas.c,
+        )
+        .outerjoin(notas, true())
+        .where(Redacao.status == "CONCLUIDO")
+        .order_by(Redacao.id)
+    )
+    if tema:
+        consulta = consulta.where(Redacao.tema == tema)
+    if criado_desde:
+        consulta = consulta.where(Redacao.criado_em >= criado_desde)
+    if criado_ate:
+        consulta = consulta.where(Redacao.criado_em < criado_ate)
+    return consulta.execution_options(stream_results=True, yield_per=EXPORTACAO_LINHAS_POR_BLOCO)
+
+
+class ExportadorCSV:
+    def inicio(self) -> bytes:
+        return self.bloco([COLUNAS])
+
+    def bloco(self, linhas) -> bytes:
+        saida = io.StringIO()
+        csv.writer(saida).writerows(
+            [valor.isoformat() if isinstance(valor, datetime) else valor for valor in linha]
+            for linha in linhas
+        )
+        return saida.getvalue().encode("utf-8")
+
+    def fim(self) -> bytes:
+        return b""
+
+
+class ExportadorNDJSON:
+    def inicio(self) -> bytes:
+        return b""
+
+    def bloco(self, linhas) -> bytes:
+        return "".join(
+            json.dumps(dict(zip(COLUNAS, linha)), ensure_ascii=False, default=datetime.isoformat) + "\n"
+            for linha in linhas
+        ).encode("utf-8")
+
+    def fim(self) -> bytes:
+        return b""
+
+
+class _SaidaIncremental(io.RawIOBase):
+    """
+    Destino do ParquetWriter que acumula só os bytes ainda não entregues,
+    mantendo a posição absoluta (usada nos offsets do rodapé do Parquet).
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._partes = []
+        self._posicao = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, dados) -> int:
+        self._partes.append(bytes(dados))
+        self._posicao += len(dados)
+        return len(dados)
+
+    def tell(self) -> int:
+        return self._posicao
+
+    def esvaziar(self) -> bytes:
+        dados = b"".join(self._partes)
+        self._partes.clear()
+        return dados
+
+
+class ExportadorParquet:
+    """Um row group por bloco de linhas, entregue assim que é escrito."""
+
+    def __init__(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self._pa = pa
+        self.schema = pa.schema(
+            [
+                ("id", pa.int64()),
+                ("tema", pa.string()),
+                ("criado_em", pa.timestamp("us", tz="UTC")),
+                ("lote_id", pa.int64()),
+                ("nota_final", pa.float64()),
+                ("fonte_resultado", pa.string()),
+                ("usou_supervisor", pa.bool_()),
+                *((f"nota_c{n}", pa.float64()) for n in range(1, NUMERO_COMPETENCIAS + 1)),
+            ]
+        )
+        self._saida = _SaidaIncremental()
+        self._escritor = pq.ParquetWriter(self._saida, self.schema, compression="zstd")
+
+    def inicio(self) -> bytes:
+        return self._saida.esvaziar()
+
+    def bloco(self, linhas) -> bytes:
+        pa = self._pa
+        colunas = list(zip(*linhas)) if linhas else [[] for _ in COLUNAS]
+        self._escritor.write_table(
+            pa.Table.from_arrays(
+                [pa.array(valores, type=campo.type) for valores, campo in zip(colunas, self.schema)],
+                schema=self.schema,
+            )
+        )
+        return self._saida.esvaziar()
+
+    def fim(self) -> bytes:
+        self._escritor.close()
+        return self._saida.esvaziar()
+
+
+def criar_exportador(formato: str) -> Any:
+    if formato == "csv":
+        return ExportadorCSV()
+    if formato == "ndjson":
+        return ExportadorNDJSON()
+    if formato == "parquet" and PYARROW_DISPONIVEL:
+        return ExportadorParquet()
+    raise ValueError(
+        f"Formato '{formato}' indisponível. Use um de: {', '.join(formatos_disponiveis())}."
+    )
@@ -0,0 +1,229 @@
+"""
+Criação e atualização do esquema do banco, como passo explícito do deploy.
+
+Antes, importar shared/models.py abria uma conexão e rodava create_all em
+todo processo (API, cada worker, beat, scripts). Agora o esquema é aplicado
+uma vez, antes de subir os serviços (serviço "migracoes" do docker-compose):
+
+    python -m shared.migracoes
+
+Cada mudança de esquema tem o seu passo em PASSOS, na ordem em que entrou
+nos modelos (create_all não altera tabelas existentes). Os passos aplicados
+ficam registrados em esquema_versoes e cada um roda uma única vez; todos
+também são idempotentes, então um banco atualizado antes do registro só
+confirma o que já tem. Um banco vazio é criado direto no esquema atual. Um
+advisory lock do Postgres impede que duas execuções simultâneas se atropelem.
+"""
+import logging
+import time
+from typing import Callable, List, Tuple
+
+from sqlalchemy import bindparam, inspect, text
+from sqlalchemy.schema import CreateColumn
+
+from .conteudo import hash_redacao
+from .models import (
+    STATUS_EM_ANDAMENTO,
+    AvaliacaoParcial,
+    Base,
+    CacheAvaliacao,
+    Lote,
+    NotaCompetencia,
+    Redacao,
+    TextoMotivador,
+    obter_engine,
+)
+
+# Configuração de Logs
+logger = logging.getLogger(__name__)
+
+# Chave do pg_advisory_xact_lock que serializa as migrações
+CHAVE_TRAVA_MIGRACAO = 7240513
+
+# Redações com hash calculado por UPDATE no preenchimento de hash_conteudo
+PREENCHIMENTO_LOTE = 1000
+
+TABELA_VERSOES = "esquema_versoes"
+
+
+def _criar_tabela(conexao, modelo) -> None:
+    modelo.__table__.create(bind=conexao, checkfirst=True)
+
+
+def _adicionar_colunas(conexao, modelo, *nomes: str) -> None:
+    """ALTER TABLE ... ADD COLUMN IF NOT EXISTS com a definição atual das colunas do modelo."""
+    tabela = modelo.__table__
+    for nome in nomes:
+        coluna = tabela.columns[nome]
+        definicao = str(CreateColumn(coluna).compile(dialect=conexao.dialect))
+        for fk in coluna.foreign_keys:
+            referencia = fk.column
+            definicao += f" REFERENCES {referencia.table.name} ({referencia.name})"
+            if fk.ondelete:
+                definicao += f" ON DELETE {fk.ondelete}"
+        conexao.execute(text(f"ALTER TABLE {tabela.name} ADD COLUMN IF NOT EXISTS {definicao}"))
+
+
+def _criar_indices(conexao, modelo, *nomes: str) -> None:
+    por_nome = {indice.name: indice for indice in modelo.__table__.indexes}
+    for nome in nomes:
+        por_nome[nome].create(bind=conexao, checkfirst=True)
+
+
+def _remover_indices(conexao, *nomes: str) -> None:
+    for nome in nomes:
+        conexao.execute(text(f"DROP INDEX IF EXISTS {nome}"))
+
+
+def _preencher_hash_conteudo(conexao) -> int:
+    """
+    Calcula hash_conteudo das redações em andamento gravadas antes da coluna
+    existir, para que submissões idênticas novas se acoplem a elas em vez de
+    abrir outra correção. As concluídas não são mais alvo de acoplamento.
+
+    Usa SQL explícito: o UPDATE do ORM também gravaria colunas que só
+    existem em passos posteriores (atualizado_em).
+    """
+    preenchidas = 0
+    while True:
+        linhas = conexao.execute(
+            text(
+                "SELECT id, tema, texto_redacao FROM redacoes "
+                "WHERE hash_conteudo IS NULL AND status IN :status LIMIT :limite"
+            ).bindparams(bindparam("status", expanding=True)),
+            {"status": list(STATUS_EM_ANDAMENTO), "limite": PREENCHIMENTO_LOTE},
+        ).all()
+        if not linhas:
+            if preenchidas:
+                logger.info(f"hash_conteudo preenchido em {preenchidas} redações em andamento.")
+            return preenchidas
+        conexao.execute(
+            text("UPDATE redacoes SET hash_conteudo = :hash_ WHERE id = :id_"),
+            [{"id_": id_, "hash_": hash_redacao(tema, texto)} for id_, tema, texto in linhas],
+        )
+        preenchidas += len(linhas)
+
+
+def _cache_avaliacoes(conexao) -> None:
+    _criar_tabela(conexao, CacheAvaliacao)
+
+
+def _acoplamento(conexao) -> None:
+    _adicionar_colunas(conexao, Redacao, "hash_conteudo", "redacao_principal_id")
+    _criar_indices(conexao, Redacao, "ix_redacoes_hash_conteudo", "ix_redacoes_redacao_principal_id")
+    _preencher_hash_conteudo(conexao)
+
+
+def _lotes(conexao) -> None:
+    _criar_tabela(conexao, Lote)
+    _adicionar_colunas(conexao, Redacao, "lote_id")
+    _criar_indices(conexao, Redacao, "ix_redacoes_lote_id")
+
+
+def _avaliacoes_parciais(conexao) -> None:
+    _criar_tabela(conexao, AvaliacaoParcial)
+
+
+def _textos_motivadores(conexao) -> None:
+    _criar_tabela(conexao, TextoMotivador)
+
+
+def _criado_em(conexao) -> None:
+    _adicionar_colunas(conexao, Redacao, "criado_em")
+
+
+def _resultado_compacto(conexao) -> None:
+    _adicionar_colunas(
+        conexao, Redacao, "nota_final", "fonte_resultado", "usou_supervisor", "detalhes_comprimidos"
+    )
+    _criar_tabela(conexao, NotaCompetencia)
+
+
+def _lease(conexao) -> None:
+    _adicionar_colunas(conexao, Redacao, "atualizado_em", "lease_dono", "lease_expira_em")
+    _criar_indices(conexao, Redacao, "ix_redacoes_varredura")
+
+
+def _feedback(conexao) -> None:
+    _adicionar_colunas(conexao, Redacao, "comentario_geral", "feedback_solicitado_em")
+
+
+def _listagem(conexao) -> None:
+    _criar_indices(
+        conexao,
+        Redacao,
+        "ix_redacoes_criado_em_id",
+        "ix_redacoes_status_criado_em_id",
+        "ix_redacoes_tema_criado_em_id",
+    )
+    # Cobertos pelos índices compostos da listagem
+    _remover_indices(conexao, "ix_redacoes_tema", "ix_redacoes_status")
+
+
+def _despacho(conexao) -> None:
+    _adicionar_colunas(conexao, Redacao, "prioridade", "origem", "despachado_em")
+    _criar_indices(conexao, Redacao, "ix_redacoes_despacho")
+
+
+def _exportacao(conexao) -> None:
+    _criar_indices(conexao, Redacao, "ix_redacoes_exportacao")
+
+
+# (versão, passo), na ordem em que as mudanças entraram nos modelos
+PASSOS: List[Tuple[str, Callable]] = [
+    ("0003_cache_avaliacoes", _cache_avaliacoes),
+    ("0004_acoplamento", _acoplamento),
+    ("0005_lotes", _lotes),
+    ("0010_avaliacoes_parciais", _avaliacoes_parciais),
+    ("0016_textos_motivadores", _textos_motivadores),
+    ("0017_criado_em", _criado_em),
+    ("0018_resultado_compacto", _resultado_compacto),
+    ("0020_lease", _lease),
+    ("0021_feedback", _feedback),
+    ("0022_listagem", _listagem),
+    ("0024_despacho", _despacho),
+    ("0025_exportacao", _exportacao),
+]
+
+
+def migrar(engine=None) -> List[str]:
+    """Aplica ao banco os passos de esquema pendentes; devolve as versões aplicadas."""
+    engine = engine or obter_engine()
+    inicio = time.perf_counter()
+    with engine.begin() as conexao:
+        conexao.execute(text("SELECT pg_advisory_xact_lock(:chave)"), {"chave": CHAVE_TRAVA_MIGRACAO})
+        conexao.execute(
+            text(
+                f"CREATE TABLE IF NOT EXISTS {TABELA_VERSOES} ("
+                "versao VARCHAR(64) PRIMARY KEY, aplicada_em TIMESTAMPTZ NOT NULL DEFAULT now())"
+            )
+        )
+        registradas = set(conexao.execute(text(f"SELECT versao FROM {TABELA_VERSOES}")).scalars())
+
+        if not inspect(conexao).has_table(Redacao.__tablename__):
+            # Banco vazio: o esquema atual já inclui todos os passos
+            Base.metadata.create_all(bind=conexao)
+            pendentes = [versao for versao, _ in PASSOS]
+        else:
+            pendentes = []
+            for versao, passo in PASSOS:
+                if versao in registradas:
+                    continue
+                logger.info(f"Aplicando o passo de esquema {versao}.")
+                passo(conexao)
+                pendentes.append(versao)
+
+        for versao in pendentes:
+            if versao not in registradas:
+                conexao.execute(
+                    text(f"INSERT INTO {TABELA_VERSOES} (versao) VALUES (:versao)"), {"versao": versao}
+                )
+    logger.info(f"Esquema atualizado em {time.perf_counter() - inicio:.2f}s ({len(pendentes)} passo(s)).")
+    return pendentes
+
+
+if __name__ == "__main__":
+    # Só quando executado como script: importado pela API ou pelo worker, não
+    # mexe na configuração de logs deles
+    logging.basicConfig(level=logging.INFO)
+    migrar()
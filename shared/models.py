@@ -1,25 +1,245 @@
-from sqlalchemy import create_engine, Column, Integer, String, Text, JSON
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy import (
+    create_engine,
+    Column,
+    Integer,
+    String,
+    Text,
+    JSON,
+    Boolean,
+    Float,
+    LargeBinary,
+    SmallInteger,
+    DateTime,
+    ForeignKey,
+    Index,
+    UniqueConstraint,
+)
+from sqlalchemy.orm import declarative_base, sessionmaker, deferred
+from sqlalchemy.sql import func, text
+from typing import Callable, Optional
 import os
+import threading
 
-DATABASE_URL = os.getenv("DATABASE_URL")
-if not DATABASE_URL:
-    raise ValueError("A variável de ambiente DATABASE_URL não está configurada!")
 
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def obter_database_url() -> str:
+    database_url = os.getenv("DATABASE_URL")
+    if not database_url:
+        raise ValueError("A variável de ambiente DATABASE_URL não está configurada!")
+    return database_url
+
+
+def opcoes_pool() -> dict:
+    """Configuração do pool de conexões, compartilhada pelos engines síncrono e assíncrono."""
+    return {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "10")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "20")),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "sim"),
+    }
+
+
+# Importar este módulo não abre conexões: o engine é criado na primeira sessão
+# e o esquema é criado/atualizado por shared/migracoes.py, um passo explícito
+# do deploy (serviço "migracoes" do docker-compose).
+_engine = None
+_trava_engine = threading.Lock()
+
+
+def obter_engine():
+    """Engine síncrono do processo, criado na primeira chamada."""
+    global _engine
+    if _engine is None:
+        with _trava_engine:
+            if _engine is None:
+                _engine = create_engine(obter_database_url(), **opcoes_pool())
+    return _engine
+
+
+def configurar_engine(url: Optional[str] = None, **opcoes) -> None:
+    """
+    Troca o engine usado pelas próximas sessões (outro banco em scripts, ou
+    outras opções de pool); sem argumentos, volta à DATABASE_URL do ambiente.
+    """
+    global _engine
+    with _trava_engine:
+        if _engine is not None:
+            _engine.dispose()
+        _engine = create_engine(url or obter_database_url(), **{**opcoes_pool(), **opcoes})
+
+
+class FabricaSessoes:
+    """
+    Fábrica de sessões (sync ou async) que só resolve o engine ao abrir a
+    primeira sessão. Usada como um sessionmaker: `db = SessionLocal()`.
+    """
+
+    def __init__(self, fabrica: Callable, obter_bind: Callable):
+        self._fabrica = fabrica
+        self._obter_bind = obter_bind
+
+    def __call__(self, **opcoes):
+        return self._fabrica(bind=self._obter_bind(), **opcoes)
+
+
+SessionLocal = FabricaSessoes(sessionmaker(autocommit=False, autoflush=False), obter_engine)
 Base = declarative_base()
 
+# Status em que uma redação ainda pode receber submissões idênticas acopladas
+STATUS_EM_ANDAMENTO = ("PENDENTE", "PROCESSANDO")
+STATUS_FINAIS = ("CONCLUIDO", "ERRO")
+
+# Prioridade da submissão: interativas vão direto para a fila; as de lote
+# esperam o despacho justo entre origens (worker/despacho.py)
+PRIORIDADE_INTERATIVA = "interativa"
+PRIORIDADE_LOTE = "lote"
+ORIGEM_PADRAO = "padrao"
+
+
+class Lote(Base):
+    """Agrupa redações submetidas de uma só vez pelo endpoint de lote."""
+
+    __tablename__ = "lotes"
+
+    id = Column(Integer, primary_key=True, index=True)
+    total = Column(Integer, nullable=False)
+    criado_em = Column(DateTime(timezone=True), server_default=func.now())
+
 
 class Redacao(Base):
     __tablename__ = "redacoes"
+    __table_args__ = (
+        # Listagem paginada por (criado_em, id) com filtro opcional de status
+        # ou tema (GET /api/v1/redacoes). Também atendem as buscas por status
+        # e por tema sozinhos, que antes tinham índices próprios.
+        Index("ix_redacoes_criado_em_id", "criado_em", "id"),
+        Index("ix_redacoes_status_criado_em_id", "status", "criado_em", "id"),
+        Index("ix_redacoes_tema_criado_em_id", "tema", "criado_em", "id"),
+        # Exportação das concluídas de um tema na ordem do id (shared/exportacao.py),
+        # lida direto do índice, sem ordenar o tema inteiro antes da primeira linha
+        Index(
+            "ix_redacoes_exportacao",
+            "tema",
+            "id",
+            postgresql_where=text("status = 'CONCLUIDO'"),
+        ),
+        # Fila de despacho dos lotes: só as redações ainda não enviadas ao broker
+        Index(
+            "ix_redacoes_despacho",
+            "origem",
+            "id",
+            postgresql_where=text(
+                "status = 'PENDENTE' AND despachado_em IS NULL AND redacao_principal_id IS NULL"
+            ),
+        ),
+        # Índice parcial da varredura (worker/varredura.py): só contém as
+        # redações principais em andamento, então continua pequeno mesmo com
+        # milhões de correções concluídas
+        Index(
+            "ix_redacoes_varredura",
+            "status",
+            "lease_expira_em",
+            "atualizado_em",
+            postgresql_where=text(
+                "status IN ('PENDENTE', 'PROCESSANDO') AND redacao_principal_id IS NULL"
+            ),
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    tema = Column(String, index=True)
+    tema = Column(String)
     texto_redacao = Column(Text, nullable=False)
     status = Column(String, default="PENDENTE")
     resultado_json = Column(JSON, nullable=True)
+    # Hash de (tema, texto) normalizados, usado para agrupar submissões idênticas
+    hash_conteudo = Column(String(64), index=True, nullable=True)
+    # Quando preenchido, esta redação aguarda a correção da redação principal
+    redacao_principal_id = Column(
+        Integer, ForeignKey("redacoes.id"), index=True, nullable=True
+    )
+    lote_id = Column(Integer, ForeignKey("lotes.id"), index=True, nullable=True)
+    # Momento da submissão, usado para medir a espera na fila
+    criado_em = Column(DateTime(timezone=True), server_default=func.now())
+    # Resumo tipado do resultado; as notas por corretor ficam em notas_competencia
+    nota_final = Column(Float, nullable=True)
+    fonte_resultado = Column(String, nullable=True)
+    usou_supervisor = Column(Boolean, nullable=True)
+    # Saídas completas dos corretores (análises e justificativas), em JSON
+    # comprimido com zlib. Só carregado quando pedido explicitamente.
+    detalhes_comprimidos = deferred(Column(LargeBinary, nullable=True))
+    # Comentário geral para o aluno, gerado sob demanda a partir do resultado
+    # consolidado (GET /api/v1/redacoes/{id}/feedback, tarefa gerar_feedback)
+    comentario_geral = Column(Text, nullable=True)
+    feedback_solicitado_em = Column(DateTime(timezone=True), nullable=True)
+    # Última alteração da linha; na varredura, indica há quanto tempo uma
+    # redação PENDENTE espera sem que nenhum worker a tenha reivindicado
+    atualizado_em = Column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
+    # Lease do worker que está corrigindo a redação (id da tarefa do Celery).
+    # Se expirar sem ser renovado, a varredura devolve a redação para a fila.
+    lease_dono = Column(String, nullable=True)
+    lease_expira_em = Column(DateTime(timezone=True), nullable=True)
+    # Prioridade (interativa ou lote) e origem (escola, cliente...) da
+    # submissão, usadas no despacho justo entre origens
+    prioridade = Column(
+        String(16), nullable=False, default=PRIORIDADE_INTERATIVA, server_default=PRIORIDADE_INTERATIVA
+    )
+    origem = Column(String(64), nullable=False, default=ORIGEM_PADRAO, server_default=ORIGEM_PADRAO)
+    # Momento em que a mensagem da correção foi enviada ao broker; NULL enquanto
+    # uma redação de lote espera o despacho
+    despachado_em = Column(DateTime(timezone=True), nullable=True)
+
+
+class NotaCompetencia(Base):
+    """
+    Nota de um corretor (0 = nota final da banca, ver shared/resultados.py)
+    em uma competência. Tabela estreita, usada para consultas e reprocessamentos.
+    """
+
+    __tablename__ = "notas_competencia"
+
+    redacao_id = Column(
+        Integer, ForeignKey("redacoes.id", ondelete="CASCADE"), primary_key=True
+    )
+    corretor = Column(SmallInteger, primary_key=True)
+    competencia = Column(SmallInteger, primary_key=True)
+    nota = Column(Float, nullable=False)
+
+
+class AvaliacaoParcial(Base):
+    """Checkpoint de cada competência avaliada, para que um retry retome de onde parou."""
+
+    __tablename__ = "avaliacoes_parciais"
+    __table_args__ = (UniqueConstraint("redacao_id", "corretor", "competencia"),)
+
+    id = Column(Integer, primary_key=True)
+    redacao_id = Column(Integer, ForeignKey("redacoes.id", ondelete="CASCADE"), nullable=False, index=True)
+    corretor = Column(String, nullable=False)
+    competencia = Column(Integer, nullable=False)
+    resultado = Column(JSON, nullable=False)
+    criado_em = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class CacheAvaliacao(Base):
+    """Avaliações de competência já calculadas, endereçadas pelo hash da entrada."""
+
+    __tablename__ = "cache_avaliacoes"
+
+    chave = Column(String(64), primary_key=True)
+    versao_prompt = Column(String(16), nullable=False, index=True)
+    competencia = Column(Integer, nullable=False)
+    resultado = Column(JSON, nullable=False)
+    criado_em = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class TextoMotivador(Base):
+    """Textos motivadores de um tema, usados na triagem para detectar cópia."""
+
+    __tablename__ = "textos_motivadores"
 
+    id = Column(Integer, primary_key=True)
+    tema = Column(String, nullable=False, index=True)
+    texto = Column(Text, nullable=False)
+    criado_em = Column(DateTime(timezone=True), server_default=func.now())
 
-Base.metadata.create_all(bind=engine)
@@ -0,0 +1,65 @@
+import json
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+# Código de cada corretor na tabela notas_competencia (0 = nota final da banca)
+CORRETOR_FINAL = 0
+CODIGOS_CORRETOR = {
+    "Corretor 1": 1,
+    "Corretor 2": 2,
+    "Corretor Supervisor": 3,
+}
+NOMES_CORRETOR = {codigo: nome for nome, codigo in CODIGOS_CORRETOR.items()}
+
+NIVEL_COMPRESSAO = 6
+
+
+def comprimir_detalhes(detalhes: Any) -> Optional[bytes]:
+    """Serializa e comprime (zlib) as saídas completas dos corretores."""
+    if not detalhes:
+        return None
+    bruto = json.dumps(detalhes, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return zlib.compress(bruto, NIVEL_COMPRESSAO)
+
+
+def descomprimir_detalhes(comprimido: Optional[bytes]) -> List[Dict[str, Any]]:
+    if not comprimido:
+        return []
+    return json.loads(zlib.decompress(comprimido).decode("utf-8"))
+
+
+def separar_resultado(
+    resultado: Dict[str, Any],
+) -> Tuple[Dict[str, Any], Dict[str, Any], List[Dict[str, Any]]]:
+    """
+    Divide o resultado consolidado da banca em três partes:
+
+    - resumo: o que vai em resultado_json (notas finais, justificativas curtas,
+      fonte, tempos), sem as saídas completas dos corretores;
+    - colunas: nota final, fonte, uso do Supervisor e a lista `detalhes`
+      (análises e justificativas de cada corretor) comprimida, lida sob demanda;
+    - notas: uma linha por (corretor, competência), para a tabela notas_competencia.
+    """
+    resumo = {chave: valor for chave, valor in resultado.items() if chave != "detalhes"}
+    detalhes = resultado.get("detalhes") or []
+
+    notas = [
+        {"corretor": CORRETOR_FINAL, "competencia": c["competencia"], "nota": c["nota"]}
+        for c in resultado.get("competencias", [])
+    ]
+    for correcao in detalhes:
+        codigo = CODIGOS_CORRETOR.get(correcao.get("id_corretor"))
+        if codigo is None:
+            continue
+        notas.extend(
+            {"corretor": codigo, "competencia": c["competencia"], "nota": c["nota"]}
+            for c in correcao.get("competencias", [])
+        )
+
+    colunas = {
+        "nota_final": resultado.get("nota_final"),
+        "fonte_resultado": resultado.get("fonte_resultado"),
+        "usou_supervisor": any(c.get("id_corretor") == "Corretor Supervisor" for c in detalhes),
+        "detalhes_comprimidos": comprimir_detalhes(detalhes),
+    }
+    return resumo, colunas, notas
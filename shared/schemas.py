@@ -1,3 +1,5 @@
+from datetime import datetime
+
 from pydantic import BaseModel, Field 
 from typing import Optional, Dict, Any, List 
 
@@ -5,6 +7,11 @@ from typing import Optional, Dict, Any, List
 class RedacaoCreate(BaseModel):
     tema: str
     texto_redacao: str
+    # "interativa" (um aluno esperando a nota) ou "lote"; no endpoint de lote
+    # vale sempre "lote"
+    prioridade: str = Field("interativa", regex="^(interativa|lote)$")
+    # Quem submeteu (escola, cliente...): o despacho dos lotes reveza entre origens
+    origem: str = Field("padrao", min_length=1, max_length=64)
 
 
 class RedacaoStatus(BaseModel):
@@ -13,11 +20,81 @@ class RedacaoStatus(BaseModel):
     message: str
 
 
+class TextoMotivadorCreate(BaseModel):
+    tema: str
+    texto: str
+
+
+class TextoMotivadorStatus(BaseModel):
+    id: int
+    tema: str
+
+    class Config:
+        orm_mode = True
+
+
+class LoteStatus(BaseModel):
+    lote_id: int
+    total: int
+    correcoes_disparadas: int
+    message: str
+
+
+class LoteProgresso(BaseModel):
+    lote_id: int
+    total: int
+    por_status: Dict[str, int]
+    finalizadas: int
+    percentual: float
+
+
+class EstadoDisjuntor(BaseModel):
+    estado: str
+    segundos_restantes: float
+    fator_taxa: float
+    aberturas: int
+    aberturas_seguidas: int
+    ultima_abertura: Optional[float]
+
+
+class FeedbackStatus(BaseModel):
+    id: int
+    # PRONTO (comentário disponível) ou GERANDO (tente de novo em instantes)
+    status: str
+    comentario_geral: Optional[str]
+
+
+class RedacaoResumo(BaseModel):
+    """Item da listagem: só colunas pequenas, sem o texto nem o resultado."""
+
+    id: int
+    status: str
+    tema: Optional[str]
+    criado_em: datetime
+    nota_final: Optional[float]
+    fonte_resultado: Optional[str]
+    usou_supervisor: Optional[bool]
+    lote_id: Optional[int]
+    redacao_principal_id: Optional[int]
+
+
+class PaginaRedacoes(BaseModel):
+    itens: List[RedacaoResumo]
+    # Passe em ?cursor= para obter a página seguinte; None na última página
+    proximo_cursor: Optional[str]
+
+
 class RedacaoResult(BaseModel):
     id: int
     status: str
     tema: str
     resultado_json: Optional[Dict[str, Any]]
+    nota_final: Optional[float]
+    fonte_resultado: Optional[str]
+    usou_supervisor: Optional[bool]
+    comentario_geral: Optional[str]
+    # Saídas completas dos corretores, só com ?expand=detalhes
+    detalhes: Optional[List[Dict[str, Any]]]
 
     class Config:
         orm_mode = True
@@ -26,4 +103,9 @@ class AvaliacaoCompetencia(BaseModel):
     competencia: int = Field(description="O número da competência (de 1 a 5)")
     analise_critica: str = Field(description="Análise detalhada dos erros encontrados e raciocínio antes da nota.")
     nota: int = Field(description="A nota para esta competência (0, 40, 80, 120, 160, ou 200)")
-    justificativa: str = Field(description="A justificativa final resumida para a nota atribuída.")
\ No newline at end of file
+    justificativa: str = Field(description="A justificativa final resumida para a nota atribuída.")
+
+
+class AvaliacaoCompleta(BaseModel):
+    competencias: List[AvaliacaoCompetencia] = Field(description="As avaliações das 5 competências, da 1 à 5.")
+    comentarios_gerais: str = Field(description="Um parágrafo de comentário geral conciso, motivador e útil para o aluno.")
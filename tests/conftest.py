@@ -0,0 +1,12 @@
+import os
+import sys
+
+# Mesmo layout dos containers: o pacote shared na raiz e os módulos do worker
+# (agents, banca, varredura...) importáveis pelo nome. A raiz vem primeiro
+# para que worker/shared (substituído pelo volume no container) não a encubra.
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+# Sem broker: limitador, disjuntor e eventos usam só o estado em memória
+os.environ["CELERY_BROKER_URL"] = ""
+sys.path[:0] = [RAIZ, os.path.join(RAIZ, "worker")]
+# Módulos da API (main, database...) por último: celery_app continua sendo o do worker
+sys.path.append(os.path.join(RAIZ, "backend"))
@@ -0,0 +1,107 @@
+"""
+Submissão interativa idêntica a uma redação de lote ainda não despachada.
+Chama o handler da API com uma sessão assíncrona de verdade: roda só com
+TEST_DATABASE_URL apontando para um banco de testes descartável.
+"""
+import asyncio
+import os
+
+import pytest
+from sqlalchemy import create_engine, delete
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from shared import schemas
+from shared.conteudo import hash_redacao
+from shared.migracoes import migrar
+from shared.models import PRIORIDADE_INTERATIVA, PRIORIDADE_LOTE, Redacao
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+pytestmark = pytest.mark.skipif(not TEST_DATABASE_URL, reason="requer TEST_DATABASE_URL (Postgres)")
+
+TEMA = "Tema do acoplamento"
+
+
+@pytest.fixture
+def fabrica():
+    engine = create_engine(TEST_DATABASE_URL)
+    migrar(engine)
+    yield sessionmaker(bind=engine)
+    with engine.begin() as conexao:
+        conexao.execute(delete(Redacao).where(Redacao.tema == TEMA))
+    engine.dispose()
+
+
+@pytest.fixture
+def enviadas(monkeypatch):
+    import main
+
+    enviadas = []
+
+    async def _enviar_tarefa(nome, args):
+        enviadas.append((nome, args))
+
+    monkeypatch.setattr(main, "_enviar_tarefa", _enviar_tarefa)
+    return enviadas
+
+
+def _redacao_de_lote(fabrica, texto, despachada):
+    db = fabrica()
+    redacao = Redacao(
+        tema=TEMA,
+        texto_redacao=texto,
+        status="PENDENTE",
+        hash_conteudo=hash_redacao(TEMA, texto),
+        prioridade=PRIORIDADE_LOTE,
+        origem="escola-a",
+    )
+    db.add(redacao)
+    db.commit()
+    redacao_id = redacao.id
+    if despachada:
+        db.query(Redacao).filter(Redacao.id == redacao_id).update({"despachado_em": Redacao.criado_em})
+        db.commit()
+    db.close()
+    return redacao_id
+
+
+def _submeter_interativa(texto):
+    import main
+    from database import _url_assincrona
+
+    async def _submeter():
+        engine = create_async_engine(_url_assincrona(TEST_DATABASE_URL))
+        try:
+            async with AsyncSession(engine, expire_on_commit=False) as db:
+                return await main.criar_correcao(schemas.RedacaoCreate(tema=TEMA, texto_redacao=texto), db)
+        finally:
+            await engine.dispose()
+
+    return asyncio.run(_submeter())
+
+
+def test_interativa_promove_a_principal_de_lote_ainda_nao_despachada(fabrica, enviadas):
+    principal_id = _redacao_de_lote(fabrica, "Texto esperando o despacho.", despachada=False)
+
+    resposta = _submeter_interativa("Texto esperando o despacho.")
+
+    assert enviadas == [("correct_essay", [principal_id])]
+    db = fabrica()
+    principal = db.get(Redacao, principal_id)
+    assert principal.prioridade == PRIORIDADE_INTERATIVA
+    assert principal.despachado_em is not None
+    assert db.get(Redacao, resposta["id"]).redacao_principal_id == principal_id
+    db.close()
+
+
+def test_interativa_so_se_acopla_a_principal_ja_despachada(fabrica, enviadas):
+    principal_id = _redacao_de_lote(fabrica, "Texto na fila de lote.", despachada=True)
+
+    resposta = _submeter_interativa("Texto na fila de lote.")
+
+    assert enviadas == []
+    db = fabrica()
+    assert db.get(Redacao, principal_id).prioridade == PRIORIDADE_LOTE
+    assert db.get(Redacao, resposta["id"]).redacao_principal_id == principal_id
+    db.close()
@@ -0,0 +1,142 @@
+import asyncio
+
+import pytest
+from prometheus_client import REGISTRY
+
+from agents import cache, core
+from agents.cache import CacheAvaliacoes, cache_avaliacoes
+from agents.prompts import COMPETENCIAS_INFO
+from shared.schemas import AvaliacaoCompetencia
+
+TEXTO = "Texto da redação sobre educação pública."
+TEMA = "Educação pública"
+
+
+class _Rota:
+    """Rota falsa: responde sempre pelo primeiro modelo da lista `responde_com`."""
+
+    def __init__(self, modelos, responde_com=None):
+        self.id_corretor = "Corretor 1"
+        self.temperatura = 0.2
+        self.modelos = modelos
+        self.responde_com = responde_com or modelos[0]
+        self.chamadas = 0
+
+    async def invocar(self, nome_chain, entrada, tokens_entrada, tokens_saida):
+        self.chamadas += 1
+        avaliacao = AvaliacaoCompetencia(
+            competencia=entrada["competencia_numero"],
+            analise_critica="Análise.",
+            nota=160,
+            justificativa=f"Avaliada por {self.responde_com}.",
+        )
+        return avaliacao, self.responde_com
+
+
+@pytest.fixture(autouse=True)
+def cache_vazio():
+    cache_avaliacoes.limpar_memoria()
+    yield
+    cache_avaliacoes.limpar_memoria()
+
+
+def _avaliar(rota):
+    return asyncio.run(core.avaliar_competencia_individual(rota, TEXTO, TEMA, COMPETENCIAS_INFO[0]))
+
+
+def test_avaliacao_fica_no_cache_sob_o_modelo_que_respondeu():
+    mista = _Rota(["barato", "forte"], responde_com="barato")
+    assert _avaliar(mista)["justificativa"] == "Avaliada por barato."
+
+    # Uma rota só com o modelo forte não recebe a avaliação do barato
+    forte = _Rota(["forte"])
+    assert _avaliar(forte)["justificativa"] == "Avaliada por forte."
+    assert forte.chamadas == 1
+
+    # A rota mista reaproveita a avaliação do modelo que realmente respondeu
+    assert _avaliar(_Rota(["barato", "forte"], responde_com="forte"))["justificativa"] == "Avaliada por barato."
+    assert _avaliar(_Rota(["barato"]))["justificativa"] == "Avaliada por barato."
+
+
+class _Banco:
+    """Tabela cache_avaliacoes em um dict; `falhar` simula o Postgres fora do ar."""
+
+    def __init__(self, monkeypatch, falhar=False):
+        self.linhas = {}
+        self.consultas = 0
+        self.falhar = falhar
+        monkeypatch.setattr(CacheAvaliacoes, "_obter_banco", staticmethod(self.obter))
+        monkeypatch.setattr(CacheAvaliacoes, "_salvar_banco", staticmethod(self.salvar))
+
+    def obter(self, chave):
+        self.consultas += 1
+        if self.falhar:
+            raise ConnectionError("Postgres fora do ar")
+        return self.linhas.get(chave)
+
+    def salvar(self, chave, competencia, valor, versao_prompt):
+        if self.falhar:
+            raise ConnectionError("Postgres fora do ar")
+        self.linhas[chave] = valor
+
+
+def _consultas(resultado):
+    return REGISTRY.get_sample_value("cache_avaliacoes_consultas_total", {"resultado": resultado}) or 0.0
+
+
+def test_consultas_contadas_pela_camada_que_respondeu(monkeypatch):
+    banco = _Banco(monkeypatch)
+    banco.linhas["no-banco"] = {"nota": 120}
+    camadas = CacheAvaliacoes()
+    antes = {resultado: _consultas(resultado) for resultado in ("memoria", "banco", "falta")}
+
+    assert asyncio.run(camadas.obter("ausente")) is None
+    assert asyncio.run(camadas.obter("no-banco")) == {"nota": 120}
+    # O acerto no banco promove a entrada para a memória
+    assert asyncio.run(camadas.obter("no-banco")) == {"nota": 120}
+    assert banco.consultas == 2
+
+    assert {resultado: _consultas(resultado) - antes[resultado] for resultado in antes} == {
+        "memoria": 1,
+        "banco": 1,
+        "falta": 1,
+    }
+    assert (camadas.acertos_memoria, camadas.acertos_banco, camadas.faltas) == (1, 1, 1)
+
+
+def test_memoria_descarta_a_menos_usada_e_as_expiradas(monkeypatch):
+    _Banco(monkeypatch)
+    relogio = [1000.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: relogio[0])
+    camadas = CacheAvaliacoes(max_itens=2, ttl=60)
+
+    for chave in ("a", "b"):
+        asyncio.run(camadas.salvar(chave, 1, {"chave": chave}))
+    asyncio.run(camadas.obter("a"))
+    asyncio.run(camadas.salvar("c", 1, {"chave": "c"}))
+    assert camadas._obter_memoria("b") is None
+    assert camadas._obter_memoria("a") == {"chave": "a"}
+
+    relogio[0] += 61
+    assert camadas._obter_memoria("a") is None
+    # Expirada na memória, a avaliação continua no banco
+    assert asyncio.run(camadas.obter("a")) == {"chave": "a"}
+
+
+def test_devolve_copia_que_o_chamador_pode_alterar(monkeypatch):
+    _Banco(monkeypatch)
+    camadas = CacheAvaliacoes()
+    asyncio.run(camadas.salvar("chave", 1, {"nota": 160}))
+
+    asyncio.run(camadas.obter("chave"))["nota"] = 0
+    assert asyncio.run(camadas.obter("chave")) == {"nota": 160}
+
+
+def test_banco_fora_do_ar_vira_falta_sem_interromper_a_correcao(monkeypatch):
+    _Banco(monkeypatch, falhar=True)
+    camadas = CacheAvaliacoes()
+
+    asyncio.run(camadas.salvar("chave", 1, {"nota": 160}))
+    assert asyncio.run(camadas.obter("outra")) is None
+    # A camada em memória continua servindo o que foi gravado neste processo
+    assert asyncio.run(camadas.obter("chave")) == {"nota": 160}
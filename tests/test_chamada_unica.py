@@ -0,0 +1,103 @@
+import asyncio
+
+import pytest
+
+from agents import core
+from agents.cache import CacheAvaliacoes, cache_avaliacoes
+from agents.core import MODO_CHAMADA_UNICA, MODO_POR_COMPETENCIA, executar_correcao_completa_async
+from shared.schemas import AvaliacaoCompetencia, AvaliacaoCompleta
+
+TEXTO = "Texto da redação sobre mobilidade urbana."
+TEMA = "Mobilidade urbana"
+NOTAS = {1: 160, 2: 120, 3: 200, 4: 160, 5: 80}
+
+
+def _avaliacao(numero):
+    return AvaliacaoCompetencia(
+        competencia=numero, analise_critica="Análise.", nota=NOTAS[numero], justificativa=f"C{numero}."
+    )
+
+
+class _Rota:
+    """Rota falsa de um modelo só; registra as chains e competências chamadas."""
+
+    def __init__(self):
+        self.id_corretor = "Corretor 1"
+        self.temperatura = 0.1
+        self.modelos = ["modelo-falso"]
+        self.chamadas = []
+        self.competencias = []
+
+    async def invocar(self, nome_chain, entrada, tokens_entrada, tokens_saida):
+        self.chamadas.append(nome_chain)
+        self.competencias.append(entrada.get("competencia_numero"))
+        if nome_chain == "chain_completa":
+            # Fora de ordem, como o modelo às vezes devolve
+            competencias = [_avaliacao(numero) for numero in (3, 1, 2, 5, 4)]
+            return AvaliacaoCompleta(competencias=competencias, comentarios_gerais="Bom texto."), "modelo-falso"
+        return _avaliacao(entrada["competencia_numero"]), "modelo-falso"
+
+
+@pytest.fixture
+def rota(monkeypatch):
+    rota = _Rota()
+    monkeypatch.setattr(core, "rota_do_corretor", lambda id_corretor: rota)
+    monkeypatch.setattr(CacheAvaliacoes, "_obter_banco", staticmethod(lambda chave: None))
+    monkeypatch.setattr(CacheAvaliacoes, "_salvar_banco", staticmethod(lambda *args: None))
+    cache_avaliacoes.limpar_memoria()
+    yield rota
+    cache_avaliacoes.limpar_memoria()
+
+
+def _corrigir(**opcoes):
+    notificadas = []
+    resultado = asyncio.run(
+        executar_correcao_completa_async(
+            "Corretor 1", TEXTO, TEMA, lambda corretor, avaliacao: notificadas.append(avaliacao["competencia"]), **opcoes
+        )
+    )
+    return resultado, notificadas
+
+
+def test_chamada_unica_avalia_as_cinco_competencias_em_uma_requisicao(rota):
+    resultado, notificadas = _corrigir(modo=MODO_CHAMADA_UNICA)
+
+    assert rota.chamadas == ["chain_completa"]
+    assert [a["competencia"] for a in resultado["competencias"]] == [1, 2, 3, 4, 5]
+    assert resultado["nota_final"] == sum(NOTAS.values())
+    assert resultado["comentarios_gerais"] == "Bom texto."
+    assert resultado["modo_avaliacao"] == MODO_CHAMADA_UNICA
+    assert sorted(notificadas) == [1, 2, 3, 4, 5]
+
+
+def test_chamada_unica_repetida_sai_do_cache_sem_comentario(rota):
+    _corrigir(modo=MODO_CHAMADA_UNICA)
+    resultado, _ = _corrigir(modo=MODO_CHAMADA_UNICA)
+
+    assert rota.chamadas == ["chain_completa"]
+    assert resultado["nota_final"] == sum(NOTAS.values())
+    # O comentário não é cacheado: o do aluno é gerado sob demanda
+    assert resultado["comentarios_gerais"] is None
+
+
+def test_retomada_ou_subconjunto_usam_uma_chamada_por_competencia(rota):
+    prontas = {1: _avaliacao(1).dict(), 2: _avaliacao(2).dict()}
+    resultado, _ = _corrigir(modo=MODO_CHAMADA_UNICA, avaliacoes_prontas=prontas)
+    assert sorted(rota.chamadas) == ["chain_competencia"] * 3
+    assert resultado["modo_avaliacao"] == MODO_POR_COMPETENCIA
+    assert resultado["nota_final"] == sum(NOTAS.values())
+
+    rota.chamadas.clear()
+    rota.competencias.clear()
+    resultado, _ = _corrigir(modo=MODO_CHAMADA_UNICA, competencias=[2, 4])
+    # C4 ficou no cache da retomada; só C2 vai ao modelo
+    assert rota.chamadas == ["chain_competencia"]
+    assert rota.competencias == [2]
+    assert [a["competencia"] for a in resultado["competencias"]] == [2, 4]
+
+
+def test_chamadas_previstas_seguem_o_modo_do_corretor(monkeypatch):
+    monkeypatch.setitem(core.MODOS_AVALIACAO, "Corretor 1", MODO_CHAMADA_UNICA)
+    monkeypatch.setitem(core.MODOS_AVALIACAO, "Corretor 2", MODO_POR_COMPETENCIA)
+    assert core.chamadas_llm_previstas("Corretor 1") == 1
+    assert core.chamadas_llm_previstas("Corretor 2") == 5
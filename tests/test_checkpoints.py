@@ -0,0 +1,145 @@
+"""
+Checkpoint por competência: um 429 no meio da banca preserva as competências
+concluídas e o retry avalia só as que faltam; outras falhas também sobem para
+a tarefa, sem virar nota zero. A gravação no banco usa
+INSERT ... ON CONFLICT do Postgres: roda só com TEST_DATABASE_URL.
+"""
+import asyncio
+import os
+
+import pytest
+from google.api_core.exceptions import ResourceExhausted
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import tasks
+from agents import core
+from agents.cache import cache_avaliacoes
+from shared.migracoes import migrar
+from shared.models import AvaliacaoParcial, Redacao
+from shared.schemas import AvaliacaoCompetencia, AvaliacaoCompleta
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+
+class _Rota:
+    """Rota falsa de um corretor; a competência `falhar_em` recebe `erro` na primeira tentativa."""
+
+    def __init__(self, id_corretor, falhar_em=None, erro=None):
+        self.id_corretor = id_corretor
+        self.temperatura = 0.2
+        self.modelos = ["modelo-falso"]
+        self.falhar_em = falhar_em
+        self.erro = erro or ResourceExhausted("Quota exceeded. Please retry in 10s.")
+        self.avaliadas = []
+
+    async def invocar(self, nome_chain, entrada, tokens_entrada, tokens_saida):
+        numero = entrada["competencia_numero"]
+        if numero == self.falhar_em:
+            self.falhar_em = None
+            raise self.erro
+        self.avaliadas.append(numero)
+        avaliacao = AvaliacaoCompetencia(competencia=numero, analise_critica="Análise.", nota=160, justificativa="Ok.")
+        return avaliacao, "modelo-falso"
+
+
+@pytest.fixture
+def rotas(monkeypatch):
+    rotas = {"Corretor 1": _Rota("Corretor 1"), "Corretor 2": _Rota("Corretor 2", falhar_em=4)}
+    monkeypatch.setattr(core, "rota_do_corretor", lambda id_corretor: rotas[id_corretor])
+
+    async def _sem_cache(*args, **kwargs):
+        return None
+
+    monkeypatch.setattr(cache_avaliacoes, "obter", _sem_cache)
+    monkeypatch.setattr(cache_avaliacoes, "salvar", _sem_cache)
+    return rotas
+
+
+def _banca(parciais, checkpoints, salvos):
+    async def _ao_concluir(id_corretor, avaliacao):
+        salvos.setdefault(id_corretor, {})[avaliacao["competencia"]] = avaliacao
+
+    return asyncio.run(tasks._executar_banca_async("Texto.", "Tema", parciais, _ao_concluir, checkpoints))
+
+
+def test_retry_apos_429_avalia_so_as_competencias_que_faltam(rotas):
+    parciais = {"c1": None, "c2": None, "c3": None}
+    salvos = {}
+    with pytest.raises(ResourceExhausted):
+        _banca(parciais, {}, salvos)
+
+    # O corretor que terminou fica em `parciais`; o outro, nos checkpoints
+    assert parciais["c1"]["nota_final"] == 800
+    assert parciais["c2"] is None
+    assert sorted(salvos["Corretor 2"]) == [1, 2, 3, 5]
+
+    rotas["Corretor 1"].avaliadas.clear()
+    rotas["Corretor 2"].avaliadas.clear()
+    resultado = _banca(parciais, {"Corretor 2": dict(salvos["Corretor 2"])}, salvos)
+
+    assert rotas["Corretor 1"].avaliadas == []
+    assert rotas["Corretor 2"].avaliadas == [4]
+    assert resultado["nota_final"] == 800
+
+
+def test_falha_que_nao_e_429_sobe_sem_virar_nota_zero(rotas):
+    rotas["Corretor 2"].erro = ValueError("Resposta fora do formato.")
+    parciais = {"c1": None, "c2": None, "c3": None}
+    salvos = {}
+    with pytest.raises(ValueError):
+        _banca(parciais, {}, salvos)
+
+    # Nenhuma nota inventada: só as competências avaliadas de fato viram checkpoint
+    assert parciais["c2"] is None
+    assert sorted(salvos["Corretor 2"]) == [1, 2, 3, 5]
+    assert all(a["nota"] == 160 for a in salvos["Corretor 2"].values())
+
+
+def test_chamada_unica_sem_todas_as_competencias_falha(monkeypatch):
+    class _RotaIncompleta(_Rota):
+        async def invocar(self, nome_chain, entrada, tokens_entrada, tokens_saida):
+            competencias = [
+                AvaliacaoCompetencia(competencia=n, analise_critica="Análise.", nota=160, justificativa="Ok.")
+                for n in (1, 2, 3, 5)
+            ]
+            return AvaliacaoCompleta(competencias=competencias, comentarios_gerais="Bom."), "modelo-falso"
+
+    async def _sem_cache(*args, **kwargs):
+        return None
+
+    monkeypatch.setattr(cache_avaliacoes, "obter", _sem_cache)
+    monkeypatch.setattr(cache_avaliacoes, "salvar", _sem_cache)
+    with pytest.raises(ValueError, match="competência 4"):
+        asyncio.run(core.avaliar_todas_competencias(_RotaIncompleta("Corretor 1"), "Texto.", "Tema"))
+
+
+@pytest.mark.skipif(not TEST_DATABASE_URL, reason="requer TEST_DATABASE_URL (Postgres)")
+def test_checkpoint_sobrescreve_a_competencia_e_renova_o_lease(monkeypatch):
+    engine = create_engine(TEST_DATABASE_URL)
+    migrar(engine)
+    fabrica = sessionmaker(bind=engine)
+    monkeypatch.setattr(tasks, "SessionLocal", fabrica)
+
+    db = fabrica()
+    redacao = Redacao(tema="Tema", texto_redacao="Texto", status="PROCESSANDO", lease_dono="tarefa-1")
+    db.add(redacao)
+    db.commit()
+    redacao_id = redacao.id
+    try:
+        tasks._salvar_checkpoint(redacao_id, "Corretor 2", {"competencia": 3, "nota": 120}, "tarefa-1")
+        tasks._salvar_checkpoint(redacao_id, "Corretor 2", {"competencia": 3, "nota": 160}, "tarefa-1")
+        tasks._salvar_checkpoint(redacao_id, "Corretor 1", {"competencia": 1, "nota": 200}, "tarefa-1")
+
+        db.expire_all()
+        assert tasks._carregar_checkpoints(db, redacao_id) == {
+            "Corretor 2": {3: {"competencia": 3, "nota": 160}},
+            "Corretor 1": {1: {"competencia": 1, "nota": 200}},
+        }
+        assert db.get(Redacao, redacao_id).lease_expira_em is not None
+    finally:
+        db.query(AvaliacaoParcial).filter(AvaliacaoParcial.redacao_id == redacao_id).delete()
+        db.query(Redacao).filter(Redacao.id == redacao_id).delete()
+        db.commit()
+        db.close()
+        engine.dispose()
@@ -0,0 +1,35 @@
+import unicodedata
+
+from shared.conteudo import chave_trava, hash_conteudo, hash_redacao, normalizar_texto
+
+
+def test_normalizar_texto_ignora_espacos_quebras_e_forma_unicode():
+    texto = "Educação  pública\t de qualidade.\r\n\r\n\r\n  Segundo   parágrafo. "
+    decomposto = unicodedata.normalize("NFD", texto)
+    esperado = "Educação pública de qualidade.\n\nSegundo parágrafo."
+    assert normalizar_texto(texto) == esperado
+    assert normalizar_texto(decomposto) == esperado
+
+
+def test_normalizar_texto_preserva_os_paragrafos():
+    assert normalizar_texto("Primeiro.\nSegundo.") != normalizar_texto("Primeiro. Segundo.")
+    assert normalizar_texto("") == normalizar_texto(None) == ""
+
+
+def test_hash_conteudo_e_estavel_e_separa_as_partes():
+    assert hash_conteudo("a", 1, 0.2) == hash_conteudo("a", 1, 0.2)
+    assert len(hash_conteudo("a")) == 64
+    assert hash_conteudo("ab", "c") != hash_conteudo("a", "bc")
+
+
+def test_hash_redacao_identifica_submissoes_com_o_mesmo_conteudo():
+    original = hash_redacao("Tema", "Texto da redação.\n\nSegundo parágrafo.")
+    assert hash_redacao(" Tema ", "Texto  da redação.\r\n\r\nSegundo parágrafo.  ") == original
+    assert hash_redacao("Outro tema", "Texto da redação.\n\nSegundo parágrafo.") != original
+
+
+def test_chave_trava_cabe_em_um_bigint():
+    for tema in ("a", "b", "c", "d"):
+        chave = chave_trava(hash_redacao(tema, "texto"))
+        assert -(2 ** 63) <= chave < 2 ** 63
+    assert chave_trava(hash_redacao("a", "texto")) == chave_trava(hash_redacao("a", "texto"))
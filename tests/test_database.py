@@ -0,0 +1,108 @@
+"""
+Caminho assíncrono da API: engine asyncpg criado sob demanda, opções de pool
+vindas do ambiente e publicação no broker fora do event loop.
+"""
+import asyncio
+import os
+import time
+
+import pytest
+from sqlalchemy import text
+
+import database
+from shared.models import FabricaSessoes, opcoes_pool
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+
+def test_opcoes_do_pool_vem_do_ambiente(monkeypatch):
+    monkeypatch.setenv("DB_POOL_SIZE", "3")
+    monkeypatch.setenv("DB_MAX_OVERFLOW", "4")
+    monkeypatch.setenv("DB_POOL_PRE_PING", "nao")
+    opcoes = opcoes_pool()
+    assert (opcoes["pool_size"], opcoes["max_overflow"], opcoes["pool_pre_ping"]) == (3, 4, False)
+
+
+@pytest.mark.parametrize(
+    "url, esperada",
+    [
+        ("postgresql://u:s@db/redacoes", "postgresql+asyncpg://u:s@db/redacoes"),
+        ("postgresql+psycopg2://u:s@db/redacoes", "postgresql+asyncpg://u:s@db/redacoes"),
+        ("postgres://u:s@db/redacoes", "postgresql+asyncpg://u:s@db/redacoes"),
+        ("sqlite:///teste.db", "sqlite:///teste.db"),
+    ],
+)
+def test_url_assincrona_troca_so_o_driver_do_postgres(url, esperada):
+    assert database._url_assincrona(url) == esperada
+
+
+def test_fabrica_so_resolve_o_engine_ao_abrir_a_sessao():
+    resolvidos = []
+
+    def _obter_bind():
+        resolvidos.append(True)
+        return "engine"
+
+    fabrica = FabricaSessoes(lambda bind, **opcoes: (bind, opcoes), _obter_bind)
+    assert resolvidos == []
+    assert fabrica(expire_on_commit=False) == ("engine", {"expire_on_commit": False})
+    assert resolvidos == [True]
+
+
+def test_publicar_no_broker_nao_para_o_event_loop(monkeypatch):
+    import main
+
+    def _send_task_lento(nome, args=None):
+        time.sleep(0.3)
+        return nome
+
+    monkeypatch.setattr(main.celery_app, "send_task", _send_task_lento)
+
+    async def _cenario():
+        batidas = 0
+
+        async def _relogio():
+            nonlocal batidas
+            while True:
+                await asyncio.sleep(0.01)
+                batidas += 1
+
+        relogio = asyncio.create_task(_relogio())
+        resultado = await main._enviar_tarefa("correct_essay", args=[1])
+        relogio.cancel()
+        return resultado, batidas
+
+    resultado, batidas = asyncio.run(_cenario())
+    assert resultado == "correct_essay"
+    assert batidas >= 10
+
+
+@pytest.mark.skipif(not TEST_DATABASE_URL, reason="requer TEST_DATABASE_URL (Postgres)")
+def test_sessoes_da_api_usam_o_pool_configurado(monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", TEST_DATABASE_URL)
+    monkeypatch.setenv("DB_POOL_SIZE", "2")
+    monkeypatch.delenv("DATABASE_URL_ASYNC", raising=False)
+    monkeypatch.setattr(database, "_engine_async", None)
+
+    async def _cenario():
+        async def _consultar():
+            # Como o FastAPI: fecha a dependência ao fim da requisição
+            sessoes = database.get_db()
+            db = await sessoes.__anext__()
+            try:
+                return (await db.execute(text("SELECT pg_backend_pid()"))).scalar()
+            finally:
+                await sessoes.aclose()
+
+        pids = [await _consultar() for _ in range(3)]
+        engine = database.obter_engine_async()
+        try:
+            return pids, engine.pool.size(), engine.url.drivername
+        finally:
+            await engine.dispose()
+
+    pids, tamanho, driver = asyncio.run(_cenario())
+    assert driver == "postgresql+asyncpg"
+    assert tamanho == 2
+    # A conexão devolvida ao pool é reaproveitada pelas sessões seguintes
+    assert len(set(pids)) == 1
@@ -0,0 +1,124 @@
+import contextlib
+import os
+
+import pytest
+
+import despacho
+import tasks
+from despacho import distribuir_vagas, trava_despacho
+
+TEST_REDIS_URL = os.getenv("TEST_REDIS_URL")
+
+
+def test_origem_grande_nao_passa_a_frente_das_pequenas():
+    alocadas = distribuir_vagas({"escola-a": 20000, "escola-b": 3}, 6, {}, pesos={})
+    assert alocadas == {"escola-a": 3, "escola-b": 3}
+
+
+def test_vagas_repartidas_conforme_os_pesos():
+    alocadas = distribuir_vagas({"escola-a": 100, "escola-b": 100}, 9, {}, pesos={"escola-a": 2})
+    assert alocadas == {"escola-a": 6, "escola-b": 3}
+
+
+def test_nunca_aloca_mais_que_as_vagas_ou_as_pendentes():
+    pendentes = {"a": 2, "b": 0, "c": 7, "d": 1}
+    alocadas = distribuir_vagas(pendentes, 50, {}, pesos={"c": 3})
+    assert alocadas == {"a": 2, "c": 7, "d": 1}
+
+    alocadas = distribuir_vagas(pendentes, 4, {}, pesos={"c": 3})
+    assert sum(alocadas.values()) == 4
+    assert all(alocadas[origem] <= pendentes[origem] for origem in alocadas)
+
+
+def test_credito_fracionario_fica_para_o_proximo_despacho():
+    deficits = {}
+    assert distribuir_vagas({"escola-a": 5}, 1, deficits, pesos={"escola-a": 0.4}) == {"escola-a": 1}
+    assert deficits["escola-a"] == pytest.approx(0.2)
+
+
+def test_origens_sem_redacoes_esperando_perdem_o_credito():
+    deficits = {"antiga": 3.0, "escola-a": 0.5}
+    distribuir_vagas({"escola-a": 10}, 0, deficits, pesos={})
+    assert deficits == {"escola-a": 0.5}
+
+
+def test_origem_esgotada_sai_do_rodizio_sem_credito():
+    deficits = {}
+    alocadas = distribuir_vagas({"escola-a": 1, "escola-b": 10}, 5, deficits, pesos={})
+    assert alocadas == {"escola-a": 1, "escola-b": 4}
+    assert "escola-a" not in deficits
+
+
+class _SessaoVazia:
+    def close(self):
+        pass
+
+
+def test_despachar_lotes_publica_a_fatia_em_um_so_group(monkeypatch):
+    publicados = []
+
+    class _Grupo:
+        def __init__(self, assinaturas):
+            self.assinaturas = list(assinaturas)
+
+        def apply_async(self, producer=None):
+            publicados.append((self.assinaturas, producer))
+
+    def _selecionar(db, vagas):
+        vagas_pedidas.append(vagas)
+        return {"escola-a": [1, 2], "escola-b": [3]}
+
+    producer = object()
+    vagas_pedidas = []
+    monkeypatch.setattr(tasks, "profundidade_fila", lambda app, fila: 5)
+    monkeypatch.setattr(tasks, "SessionLocal", _SessaoVazia)
+    monkeypatch.setattr(tasks, "selecionar_para_despacho", _selecionar)
+    monkeypatch.setattr(tasks, "group", _Grupo)
+    monkeypatch.setattr(tasks.celery_app, "producer_or_acquire", lambda: contextlib.nullcontext(producer))
+
+    tasks.despachar_lotes.run()
+
+    assert vagas_pedidas == [tasks.DESPACHO_FILA_ALVO - 5]
+    assert len(publicados) == 1
+    assinaturas, usado = publicados[0]
+    assert usado is producer
+    assert [a.args for a in assinaturas] == [(1,), (2,), (3,)]
+    assert {a.options["queue"] for a in assinaturas} == {tasks.FILA_LOTE}
+
+
+def test_despacho_em_andamento_em_outro_worker_pula_a_rodada(monkeypatch):
+    class _TravaOcupada:
+        def acquire(self, blocking=True):
+            return False
+
+    class _Redis:
+        def lock(self, nome, timeout=None):
+            return _TravaOcupada()
+
+    def _nao_deveria_rodar(*args):
+        raise AssertionError("despacho concorrente não deveria ler a fila nem os créditos")
+
+    monkeypatch.setattr(despacho, "_obter_cliente", lambda: _Redis())
+    monkeypatch.setattr(tasks, "profundidade_fila", _nao_deveria_rodar)
+    monkeypatch.setattr(tasks, "selecionar_para_despacho", _nao_deveria_rodar)
+
+    tasks.despachar_lotes.run()
+
+
+@pytest.mark.skipif(not TEST_REDIS_URL, reason="requer TEST_REDIS_URL (Redis)")
+def test_trava_do_despacho_admite_um_despacho_por_vez(monkeypatch):
+    import redis
+
+    cliente = redis.Redis.from_url(TEST_REDIS_URL)
+    cliente.delete(despacho.CHAVE_TRAVA)
+    monkeypatch.setattr(despacho, "_obter_cliente", lambda: cliente)
+
+    with trava_despacho() as primeira:
+        assert primeira
+        with trava_despacho() as segunda:
+            assert not segunda
+        # A execução que não pegou a trava não a libera
+        assert cliente.exists(despacho.CHAVE_TRAVA)
+    assert not cliente.exists(despacho.CHAVE_TRAVA)
+    with trava_despacho() as depois:
+        assert depois
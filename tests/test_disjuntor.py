@@ -0,0 +1,166 @@
+import os
+import uuid
+
+import pytest
+
+import controle_fila
+from controle_fila import ControleFila
+from shared import disjuntor
+from shared.disjuntor import ABERTO, FECHADO, RECUPERANDO, Disjuntor
+
+TEST_REDIS_URL = os.getenv("TEST_REDIS_URL")
+
+
+class _Relogio:
+    def __init__(self, agora=1_000_000.0):
+        self.agora = agora
+
+    def __call__(self):
+        return self.agora
+
+
+@pytest.fixture
+def relogio(monkeypatch):
+    relogio = _Relogio()
+    monkeypatch.setattr(disjuntor.time, "time", relogio)
+    monkeypatch.setattr(disjuntor, "DISJUNTOR_ESPERA_MINIMA", 10.0)
+    monkeypatch.setattr(disjuntor, "DISJUNTOR_ESPERA_MAXIMA", 100.0)
+    monkeypatch.setattr(disjuntor, "DISJUNTOR_RAMPA_SEGUNDOS", 60.0)
+    monkeypatch.setattr(disjuntor, "DISJUNTOR_FATOR_INICIAL", 0.2)
+    return relogio
+
+
+def test_enxurrada_de_429_conta_como_uma_abertura(relogio):
+    local = Disjuntor()
+    assert local.abrir() == 10.0
+    relogio.agora += 4
+    assert local.abrir(30.0) == pytest.approx(6.0)
+
+    estado = local.estado()
+    assert (estado["estado"], estado["aberturas"], estado["fator_taxa"]) == (ABERTO, 1, 0.0)
+    assert local.segundos_restantes() == pytest.approx(6.0)
+
+
+def test_reincidencia_na_rampa_dobra_a_pausa_e_a_sugerida_prevalece(relogio):
+    local = Disjuntor()
+    local.abrir()
+    relogio.agora += 10 + 30
+    # Fechou há 30s, no meio da rampa: a vazão está em 20% + 80% * 30/60
+    estado = local.estado()
+    assert (estado["estado"], estado["fator_taxa"]) == (RECUPERANDO, 0.6)
+
+    assert local.abrir() == 20.0
+    relogio.agora += 20 + 1
+    assert local.abrir(50.0) == 50.0
+    relogio.agora += 50 + 1
+    assert local.abrir() == 80.0
+    relogio.agora += 80 + 1
+    assert local.abrir() == 100.0
+    assert local.estado()["aberturas_seguidas"] == 5
+
+
+def test_depois_da_rampa_o_disjuntor_fecha_e_zera_o_backoff(relogio):
+    local = Disjuntor()
+    local.abrir()
+    relogio.agora += 10 + 60
+    assert (local.estado()["estado"], local.estado()["fator_taxa"]) == (FECHADO, 1.0)
+
+    relogio.agora += 1
+    assert local.abrir() == 10.0
+    assert local.estado()["aberturas"] == 2
+
+
+def test_fator_de_taxa_e_reaproveitado_por_um_segundo(relogio, monkeypatch):
+    monotonico = _Relogio(500.0)
+    monkeypatch.setattr(disjuntor.time, "monotonic", monotonico)
+    local = Disjuntor()
+    assert local.fator_taxa() == 1.0
+
+    local.abrir()
+    assert local.fator_taxa() == 1.0
+    monotonico.agora += 1.5
+    assert local.fator_taxa() == 0.0
+
+
+class _RedisFora:
+    def register_script(self, script):
+        def _executar(keys, args):
+            raise ConnectionError("Redis fora do ar")
+
+        return _executar
+
+    def pipeline(self):
+        raise ConnectionError("Redis fora do ar")
+
+
+def test_redis_fora_do_ar_cai_para_o_estado_local(relogio):
+    compartilhado = Disjuntor(_RedisFora())
+    assert compartilhado.abrir(15.0) == 15.0
+    assert compartilhado.estado()["estado"] == ABERTO
+
+
+@pytest.mark.skipif(not TEST_REDIS_URL, reason="requer TEST_REDIS_URL (Redis)")
+def test_script_no_redis_segue_o_mesmo_backoff(monkeypatch):
+    import redis
+
+    monkeypatch.setattr(disjuntor, "DISJUNTOR_ESPERA_MINIMA", 10.0)
+    monkeypatch.setattr(disjuntor, "DISJUNTOR_RAMPA_SEGUNDOS", 60.0)
+    cliente = redis.Redis.from_url(TEST_REDIS_URL)
+    chave = f"teste:disjuntor:{uuid.uuid4().hex}"
+    workers = [Disjuntor(cliente, chave), Disjuntor(cliente, chave)]
+    try:
+        assert workers[0].abrir() == pytest.approx(10.0)
+        # O outro worker vê o mesmo disjuntor aberto e não abre de novo
+        assert workers[1].abrir(30.0) <= 10.0
+        estado = workers[1].estado()
+        assert (estado["estado"], estado["aberturas"]) == (ABERTO, 1)
+
+        # Simula o fechamento há 5s: a próxima abertura é reincidência
+        agora = cliente.time()
+        cliente.hset(chave, "aberto_ate", agora[0] + agora[1] / 1_000_000 - 5)
+        assert workers[1].estado()["estado"] == RECUPERANDO
+        assert workers[1].abrir() == pytest.approx(20.0)
+        assert workers[0].estado()["aberturas_seguidas"] == 2
+    finally:
+        cliente.delete(chave)
+        cliente.close()
+
+
+class _Controle:
+    def __init__(self):
+        self.comandos = []
+
+    def cancel_consumer(self, fila, destination):
+        self.comandos.append(("cancel_consumer", fila, tuple(destination)))
+
+    def add_consumer(self, fila, destination):
+        self.comandos.append(("add_consumer", fila, tuple(destination)))
+
+
+class _App:
+    def __init__(self):
+        self.control = _Controle()
+
+
+def test_controle_da_fila_pausa_e_retoma_so_este_worker(relogio, monkeypatch):
+    local = Disjuntor()
+    monkeypatch.setattr(controle_fila, "obter_disjuntor", lambda: local)
+    monkeypatch.setattr(controle_fila, "CONTROLE_FILA_JITTER", 0)
+    app = _App()
+    controle = ControleFila(app, "worker@a", filas=["correcoes", "correcoes_lote"])
+
+    controle._pausar()
+    local.abrir()
+    # Reaberto durante o jitter: continua pausado
+    controle._retomar()
+    assert not controle.consumindo
+
+    relogio.agora += 11
+    controle._retomar()
+    assert controle.consumindo
+    assert app.control.comandos == [
+        ("cancel_consumer", "correcoes", ("worker@a",)),
+        ("cancel_consumer", "correcoes_lote", ("worker@a",)),
+        ("add_consumer", "correcoes", ("worker@a",)),
+        ("add_consumer", "correcoes_lote", ("worker@a",)),
+    ]
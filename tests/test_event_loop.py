@@ -0,0 +1,44 @@
+import asyncio
+
+import event_loop
+
+
+def test_renova_enquanto_espera_vaga_e_para_ao_conseguir(monkeypatch):
+    renovacoes = []
+
+    async def correcao():
+        quantidade = len(renovacoes)
+        await asyncio.sleep(0.05)
+        return quantidade
+
+    async def cenario():
+        semaforo = asyncio.Semaphore(1)
+        monkeypatch.setattr(event_loop, "_semaforo", semaforo)
+        await semaforo.acquire()
+        tarefa = asyncio.ensure_future(
+            event_loop._com_limite(correcao(), lambda: renovacoes.append(1), 0.01)
+        )
+        await asyncio.sleep(0.1)
+        semaforo.release()
+        return await tarefa
+
+    renovadas_ao_comecar = asyncio.run(cenario())
+
+    assert renovadas_ao_comecar >= 2
+    # Depois de conseguir a vaga, a renovação periódica é cancelada
+    assert len(renovacoes) == renovadas_ao_comecar
+
+
+def test_sem_espera_nao_renova(monkeypatch):
+    renovacoes = []
+
+    async def correcao():
+        await asyncio.sleep(0.03)
+        return "ok"
+
+    async def cenario():
+        monkeypatch.setattr(event_loop, "_semaforo", asyncio.Semaphore(1))
+        return await event_loop._com_limite(correcao(), lambda: renovacoes.append(1), 0.01)
+
+    assert asyncio.run(cenario()) == "ok"
+    assert renovacoes == []
@@ -0,0 +1,122 @@
+import asyncio
+import json
+import os
+
+import pytest
+
+from shared import eventos
+from shared.eventos import AssinanteEventos, assinar_eventos, canal_redacao, proximo_evento
+
+TEST_REDIS_URL = os.getenv("TEST_REDIS_URL")
+
+
+class _PubSubFalso:
+    """Conexão pub/sub em memória: registra as assinaturas e entrega o que `publicar` enviar."""
+
+    def __init__(self):
+        self.assinados = []
+        self.comandos = []
+        self._mensagens = asyncio.Queue()
+
+    async def subscribe(self, canal):
+        self.comandos.append(("subscribe", canal))
+        self.assinados.append(canal)
+
+    async def unsubscribe(self, canal):
+        self.comandos.append(("unsubscribe", canal))
+        self.assinados.remove(canal)
+
+    async def get_message(self, ignore_subscribe_messages, timeout):
+        try:
+            return await asyncio.wait_for(self._mensagens.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def publicar(self, redacao_id, **evento):
+        if canal_redacao(redacao_id) in self.assinados:
+            self._mensagens.put_nowait(
+                {"type": "message", "channel": canal_redacao(redacao_id).encode(), "data": json.dumps(evento)}
+            )
+
+
+class _Redis:
+    def __init__(self):
+        self.conexoes = []
+
+    def pubsub(self):
+        self.conexoes.append(_PubSubFalso())
+        return self.conexoes[-1]
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    redis = _Redis()
+    monkeypatch.setattr(eventos, "_assinante", None)
+    monkeypatch.setattr(eventos, "_obter_cliente_async", lambda: redis)
+    return redis
+
+
+def test_clientes_da_mesma_redacao_dividem_uma_assinatura(redis):
+    async def _cenario():
+        async with assinar_eventos(1) as fila_a, assinar_eventos(1) as fila_b, assinar_eventos(2) as fila_c:
+            pubsub = redis.conexoes[0]
+            pubsub.publicar(1, tipo="status", status="PROCESSANDO")
+            recebidos = [await proximo_evento(fila, 1) for fila in (fila_a, fila_b)]
+            outra = await proximo_evento(fila_c, 0.05)
+        return recebidos, outra, pubsub
+
+    recebidos, outra, pubsub = asyncio.run(_cenario())
+    assert len(redis.conexoes) == 1
+    assert recebidos == [{"tipo": "status", "status": "PROCESSANDO"}] * 2
+    assert outra is None
+    # Um SUBSCRIBE por canal, cancelado quando o último cliente sai
+    assert sorted(pubsub.comandos) == sorted(
+        [(comando, canal_redacao(id_)) for comando in ("subscribe", "unsubscribe") for id_ in (1, 2)]
+    )
+    assert pubsub.assinados == []
+
+
+def test_cliente_lento_perde_eventos_sem_travar_os_demais(redis, monkeypatch):
+    monkeypatch.setattr(eventos, "EVENTOS_FILA_MAX", 2)
+
+    async def _cenario():
+        async with assinar_eventos(1) as lento, assinar_eventos(1) as rapido:
+            pubsub = redis.conexoes[0]
+            lidos = []
+            for i in range(4):
+                pubsub.publicar(1, tipo="progresso", etapa=i)
+                lidos.append((await proximo_evento(rapido, 1))["etapa"])
+            return lidos, lento.qsize()
+
+    lidos, pendentes_lento = asyncio.run(_cenario())
+    assert lidos == [0, 1, 2, 3]
+    assert pendentes_lento == 2
+
+
+@pytest.mark.skipif(not TEST_REDIS_URL, reason="requer TEST_REDIS_URL (Redis)")
+def test_eventos_publicados_no_redis_chegam_a_todos_os_clientes():
+    import redis as redis_sync
+    import redis.asyncio as redis_async
+
+    publicador = redis_sync.Redis.from_url(TEST_REDIS_URL)
+    canal = canal_redacao(987654)
+
+    async def _cenario():
+        cliente = redis_async.Redis.from_url(TEST_REDIS_URL)
+        assinante = AssinanteEventos(cliente)
+        filas = [await assinante.assinar(canal) for _ in range(3)]
+        assinaturas = dict(publicador.pubsub_numsub(canal))[canal.encode()]
+        await asyncio.to_thread(publicador.publish, canal, json.dumps({"tipo": "status", "status": "CONCLUIDO"}))
+        recebidos = [await proximo_evento(fila, 2) for fila in filas]
+        for fila in filas:
+            await assinante.cancelar(canal, fila)
+        await asyncio.sleep(0.1)
+        restantes = dict(publicador.pubsub_numsub(canal))[canal.encode()]
+        await assinante._pubsub.aclose()
+        await cliente.aclose()
+        return assinaturas, recebidos, restantes
+
+    assinaturas, recebidos, restantes = asyncio.run(_cenario())
+    assert assinaturas == 1
+    assert recebidos == [{"tipo": "status", "status": "CONCLUIDO"}] * 3
+    assert restantes == 0
@@ -0,0 +1,135 @@
+"""
+Exportação em streaming das correções concluídas. Os testes com banco usam
+o cursor do lado do servidor e o EXPLAIN do Postgres: rodam só com
+TEST_DATABASE_URL apontando para um banco de testes descartável.
+"""
+import io
+import json
+import os
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import create_engine, delete, text
+from sqlalchemy.orm import sessionmaker
+
+from shared import exportacao
+from shared.exportacao import COLUNAS, ExportadorCSV, ExportadorNDJSON, consulta_exportacao
+from shared.migracoes import migrar
+from shared.models import NotaCompetencia, Redacao
+from shared.resultados import CORRETOR_FINAL
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+requer_postgres = pytest.mark.skipif(not TEST_DATABASE_URL, reason="requer TEST_DATABASE_URL (Postgres)")
+
+TEMA = "Tema da exportacao"
+CRIADO_EM = datetime(2024, 5, 1, 12, 30, tzinfo=timezone.utc)
+LINHA = (7, TEMA, CRIADO_EM, None, 880.0, "banca", False, 160.0, 200.0, 120.0, 200.0, 200.0)
+
+
+def test_csv_tem_cabecalho_e_datas_em_iso():
+    exportador = ExportadorCSV()
+    saida = exportador.inicio() + exportador.bloco([LINHA]) + exportador.fim()
+    cabecalho, linha = saida.decode("utf-8").splitlines()
+    assert cabecalho == ",".join(COLUNAS)
+    assert linha == "7,Tema da exportacao,2024-05-01T12:30:00+00:00,,880.0,banca,False,160.0,200.0,120.0,200.0,200.0"
+
+
+def test_ndjson_tem_um_objeto_por_linha():
+    exportador = ExportadorNDJSON()
+    saida = exportador.inicio() + exportador.bloco([LINHA, LINHA]) + exportador.fim()
+    linhas = [json.loads(linha) for linha in saida.decode("utf-8").splitlines()]
+    assert len(linhas) == 2
+    assert linhas[0]["criado_em"] == "2024-05-01T12:30:00+00:00"
+    assert linhas[0]["lote_id"] is None
+    assert linhas[0]["nota_c3"] == 120.0
+
+
+def test_parquet_entrega_um_row_group_por_bloco():
+    pq = pytest.importorskip("pyarrow.parquet")
+    exportador = exportacao.criar_exportador("parquet")
+    partes = [exportador.inicio(), exportador.bloco([LINHA]), exportador.bloco([LINHA, LINHA]), exportador.fim()]
+    # Cada bloco sai assim que é escrito, antes do próximo ser lido
+    assert all(partes[1:3])
+
+    arquivo = pq.ParquetFile(io.BytesIO(b"".join(partes)))
+    assert arquivo.num_row_groups == 2
+    assert arquivo.read().column("nota_c2").to_pylist() == [200.0, 200.0, 200.0]
+
+
+@pytest.fixture
+def fabrica():
+    engine = create_engine(TEST_DATABASE_URL)
+    migrar(engine)
+    fabrica = sessionmaker(bind=engine)
+    yield fabrica
+    with engine.begin() as conexao:
+        conexao.execute(delete(Redacao).where(Redacao.tema == TEMA))
+    engine.dispose()
+
+
+@pytest.fixture
+def concluidas(fabrica):
+    """Três concluídas com notas, uma acoplada à primeira e uma ainda pendente."""
+    db = fabrica()
+    redacoes = [
+        Redacao(tema=TEMA, texto_redacao=f"Texto {i}", status="CONCLUIDO", nota_final=800.0 + i, criado_em=CRIADO_EM)
+        for i in range(3)
+    ]
+    db.add_all(redacoes)
+    db.flush()
+    for i, redacao in enumerate(redacoes):
+        db.add_all(
+            NotaCompetencia(redacao_id=redacao.id, corretor=CORRETOR_FINAL, competencia=c, nota=40.0 * c + i)
+            for c in range(1, 6)
+        )
+    acoplada = Redacao(
+        tema=TEMA, texto_redacao="Texto 0", status="CONCLUIDO", nota_final=800.0, redacao_principal_id=redacoes[0].id
+    )
+    db.add_all([acoplada, Redacao(tema=TEMA, texto_redacao="Texto pendente", status="PENDENTE")])
+    db.commit()
+    ids = [redacao.id for redacao in redacoes] + [acoplada.id]
+    db.close()
+    return ids
+
+
+class _Saida(io.BytesIO):
+    def __init__(self):
+        super().__init__()
+        self.escritas = 0
+
+    def write(self, dados):
+        self.escritas += 1
+        return super().write(dados)
+
+
+@requer_postgres
+def test_exportacao_le_e_grava_em_blocos(fabrica, concluidas, monkeypatch):
+    import exportar
+
+    monkeypatch.setattr(exportacao, "EXPORTACAO_LINHAS_POR_BLOCO", 3)
+    monkeypatch.setattr(exportar, "SessionLocal", fabrica)
+    saida = _Saida()
+
+    assert exportar.exportar(saida, "ndjson", tema=TEMA) == 4
+    # inicio + um bloco de 3 linhas + um de 1 + fim
+    assert saida.escritas == 4
+    linhas = [json.loads(linha) for linha in saida.getvalue().decode("utf-8").splitlines()]
+    assert [linha["id"] for linha in linhas] == concluidas
+    assert [linha["nota_c5"] for linha in linhas] == [200.0, 201.0, 202.0, 200.0]
+
+
+@requer_postgres
+def test_exportacao_de_um_tema_le_na_ordem_do_indice(fabrica, concluidas):
+    db = fabrica()
+    try:
+        db.execute(text("SET LOCAL enable_seqscan = off"))
+        plano = "\n".join(
+            db.execute(
+                text("EXPLAIN " + str(consulta_exportacao(TEMA).compile(compile_kwargs={"literal_binds": True})))
+            ).scalars()
+        )
+    finally:
+        db.close()
+    assert "ix_redacoes_exportacao" in plano
+    assert "Sort" not in plano
@@ -0,0 +1,77 @@
+import tasks
+from shared.models import Redacao
+from shared.resultados import comprimir_detalhes
+
+
+def _correcao(id_corretor, comentario, erro=False):
+    competencias = [{"competencia": n, "nota": 120, "justificativa": "ok"} for n in range(1, 6)]
+    if erro:
+        competencias = [{**c, "nota": 0, "erro": True} for c in competencias]
+    return {"id_corretor": id_corretor, "competencias": competencias, "comentarios_gerais": comentario}
+
+
+def _redacao(*correcoes):
+    return Redacao(
+        id=1,
+        status="CONCLUIDO",
+        resultado_json={"competencias": [{"competencia": n, "nota": 120} for n in range(1, 6)]},
+        detalhes_comprimidos=comprimir_detalhes(list(correcoes)),
+    )
+
+
+class _Consulta:
+    def __init__(self, redacao, atualizacoes):
+        self.redacao = redacao
+        self.atualizacoes = atualizacoes
+
+    def options(self, *args):
+        return self
+
+    def filter(self, *args):
+        return self
+
+    def first(self):
+        return self.redacao
+
+    def update(self, valores, synchronize_session=None):
+        self.atualizacoes.append(valores)
+
+
+class _Sessao:
+    def __init__(self, redacao):
+        self.redacao = redacao
+        self.atualizacoes = []
+
+    def query(self, *args):
+        return _Consulta(self.redacao, self.atualizacoes)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def test_comentario_da_chamada_unica_ignora_corretores_sem_comentario_ou_com_erro():
+    assert tasks._comentario_da_chamada_unica(_redacao(_correcao("Corretor 1", None))) is None
+    assert tasks._comentario_da_chamada_unica(_redacao(_correcao("Corretor 1", "Falhou.", erro=True))) is None
+    redacao = _redacao(_correcao("Corretor 1", None), _correcao("Corretor 2", "Bom texto."))
+    assert tasks._comentario_da_chamada_unica(redacao) == "Bom texto."
+
+
+def test_gerar_feedback_reaproveita_o_comentario_da_chamada_unica(monkeypatch):
+    sessao = _Sessao(_redacao(_correcao("Corretor 1", None), _correcao("Corretor 2", "Bom texto.")))
+    monkeypatch.setattr(tasks, "SessionLocal", lambda: sessao)
+    monkeypatch.setattr(tasks, "publicar_evento", lambda *args, **kwargs: None)
+
+    def _sem_llm(coro):
+        coro.close()
+        raise AssertionError("gerar_feedback não deveria chamar o LLM")
+
+    monkeypatch.setattr(tasks, "executar_no_loop", _sem_llm)
+
+    tasks.gerar_feedback.run(1)
+    assert sessao.atualizacoes == [{Redacao.comentario_geral: "Bom texto."}]
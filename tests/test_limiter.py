@@ -0,0 +1,113 @@
+import os
+
+import pytest
+
+from agents import limiter
+from agents.limiter import BaldeMemoria, LimitadorLLM
+
+TEST_REDIS_URL = os.getenv("TEST_REDIS_URL")
+
+
+class _Relogio:
+    def __init__(self):
+        self.agora = 1000.0
+
+    def __call__(self):
+        return self.agora
+
+
+@pytest.fixture
+def relogio(monkeypatch):
+    relogio = _Relogio()
+    monkeypatch.setattr(limiter.time, "monotonic", relogio)
+    return relogio
+
+
+def test_balde_libera_a_rajada_e_depois_espera_a_reposicao(relogio):
+    balde = BaldeMemoria(capacidade=3, taxa_por_segundo=1.0)
+    assert [balde.reservar() for _ in range(3)] == [0.0, 0.0, 0.0]
+    # Saldo negativo: cada reserva espera a reposição das anteriores
+    assert balde.reservar() == pytest.approx(1.0)
+    assert balde.reservar() == pytest.approx(2.0)
+
+
+def test_balde_repoe_com_o_tempo_ate_a_capacidade(relogio):
+    balde = BaldeMemoria(capacidade=2, taxa_por_segundo=0.5)
+    balde.reservar(2)
+    relogio.agora += 2
+    assert balde.reservar() == 0.0
+    assert balde.reservar() == pytest.approx(2.0)
+
+    relogio.agora += 3600
+    assert balde.reservar(2) == 0.0
+
+
+def test_balde_reserva_custo_fracionario(relogio):
+    balde = BaldeMemoria(capacidade=100, taxa_por_segundo=10.0)
+    assert balde.reservar(150) == pytest.approx(5.0)
+
+
+def test_limitador_espera_pela_cota_mais_apertada(relogio):
+    limitador = LimitadorLLM("teste-limitador", requisicoes_por_minuto=60, tokens_por_minuto=600, rajada=10)
+    assert limitador._reservar_chamada(600) == 0.0
+    # RPM ainda tem folga; TPM precisa repor 600 tokens a 10/s
+    assert limitador._reservar_chamada(600) == pytest.approx(60.0)
+
+
+class _RedisFalso:
+    """Registra as execuções do script; `falhar` simula o Redis fora do ar."""
+
+    def __init__(self, falhar=False):
+        self.falhar = falhar
+        self.execucoes = []
+
+    def register_script(self, script):
+        def _executar(keys, args):
+            if self.falhar:
+                raise ConnectionError("Redis fora do ar")
+            self.execucoes.append((keys, args))
+            return "0"
+
+        return _executar
+
+
+def test_rpm_e_tpm_sao_reservados_em_uma_so_execucao_no_redis(relogio):
+    redis = _RedisFalso()
+    limitador = LimitadorLLM("teste-atomico", requisicoes_por_minuto=60, tokens_por_minuto=600, rajada=10, cliente_redis=redis)
+    assert limitador._reservar_chamada(100) == 0.0
+
+    assert len(redis.execucoes) == 1
+    chaves, argumentos = redis.execucoes[0]
+    assert chaves == [f"{limiter.PREFIXO_CHAVE_REDIS}:teste-atomico:rpm", f"{limiter.PREFIXO_CHAVE_REDIS}:teste-atomico:tpm"]
+    assert argumentos == pytest.approx([10, 1, 1, 600, 10, 100])
+    # Nada cobrado nos baldes locais
+    assert limitador._locais["rpm"]._tokens == 10
+    assert limitador._locais["tpm"]._tokens == 600
+
+
+def test_redis_fora_do_ar_cobra_a_chamada_uma_vez_na_cota_local(relogio):
+    limitador = LimitadorLLM(
+        "teste-sem-redis", requisicoes_por_minuto=60, tokens_por_minuto=600, rajada=10, cliente_redis=_RedisFalso(falhar=True)
+    )
+    assert limitador._reservar_chamada(100) == 0.0
+    assert limitador._locais["rpm"]._tokens == pytest.approx(9)
+    assert limitador._locais["tpm"]._tokens == pytest.approx(500)
+
+
+@pytest.mark.skipif(not TEST_REDIS_URL, reason="requer TEST_REDIS_URL (Redis)")
+def test_script_debita_todos_os_baldes_e_espera_pelo_mais_apertado():
+    import redis
+
+    cliente = redis.Redis.from_url(TEST_REDIS_URL)
+    identificador = "teste-script-limitador"
+    prefixo = f"{limiter.PREFIXO_CHAVE_REDIS}:{identificador}"
+    cliente.delete(f"{prefixo}:rpm", f"{prefixo}:tpm")
+    try:
+        limitador = LimitadorLLM(identificador, requisicoes_por_minuto=60, tokens_por_minuto=600, rajada=10, cliente_redis=cliente)
+        assert limitador._reservar_chamada(600) == 0.0
+        assert float(cliente.hget(f"{prefixo}:rpm", "tokens")) == pytest.approx(9, abs=0.1)
+        assert float(cliente.hget(f"{prefixo}:tpm", "tokens")) == pytest.approx(0, abs=1)
+        # RPM ainda tem folga; TPM precisa repor 600 tokens a 10/s
+        assert limitador._reservar_chamada(600) == pytest.approx(60.0, abs=0.5)
+    finally:
+        cliente.delete(f"{prefixo}:rpm", f"{prefixo}:tpm")
@@ -0,0 +1,134 @@
+"""
+Listagem paginada por chave (GET /api/v1/redacoes/). O cursor inválido é
+recusado sem banco; a paginação e os filtros rodam só com TEST_DATABASE_URL
+apontando para um banco de testes descartável.
+"""
+import asyncio
+import os
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+from sqlalchemy import create_engine, delete
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from shared.migracoes import migrar
+from shared.models import Redacao
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+requer_postgres = pytest.mark.skipif(not TEST_DATABASE_URL, reason="requer TEST_DATABASE_URL (Postgres)")
+
+TEMA = "Tema da listagem"
+INICIO = datetime(2024, 3, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def _listar(**parametros):
+    import main
+    from database import _url_assincrona
+
+    async def _requisicao():
+        engine = create_async_engine(_url_assincrona(TEST_DATABASE_URL)) if TEST_DATABASE_URL else None
+
+        async def _get_db():
+            if engine is None:
+                yield None
+                return
+            async with AsyncSession(engine) as db:
+                yield db
+
+        main.app.dependency_overrides[main.get_db] = _get_db
+        try:
+            async with httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=main.app), base_url="http://teste"
+            ) as cliente:
+                return await cliente.get("/api/v1/redacoes/", params=parametros)
+        finally:
+            main.app.dependency_overrides.clear()
+            if engine is not None:
+                await engine.dispose()
+
+    return asyncio.run(_requisicao())
+
+
+def test_cursor_invalido_e_recusado():
+    resposta = _listar(cursor="nao-e-um-cursor")
+    assert resposta.status_code == 400
+
+
+def test_cursor_volta_a_mesma_chave():
+    import main
+
+    assert main._decodificar_cursor(main._codificar_cursor(INICIO, 42)) == (INICIO, 42)
+
+
+@pytest.fixture
+def redacoes():
+    """Seis redações do tema: duas empatadas no mesmo instante (desempate pelo id)."""
+    engine = create_engine(TEST_DATABASE_URL)
+    migrar(engine)
+    db = sessionmaker(bind=engine)()
+    momentos = [INICIO, INICIO, INICIO + timedelta(hours=1), INICIO + timedelta(hours=2),
+                INICIO + timedelta(days=1), INICIO + timedelta(days=2)]
+    status = ["CONCLUIDO", "PENDENTE", "CONCLUIDO", "ERRO", "CONCLUIDO", "PENDENTE"]
+    linhas = [
+        Redacao(tema=TEMA, texto_redacao=f"Texto {i}", status=s, criado_em=momento)
+        for i, (momento, s) in enumerate(zip(momentos, status))
+    ]
+    db.add_all(linhas)
+    db.commit()
+    # Mais recentes primeiro; no empate, o maior id antes
+    ordem = [r.id for r in sorted(linhas, key=lambda r: (r.criado_em, r.id), reverse=True)]
+    por_id = {r.id: r.status for r in linhas}
+    db.close()
+    yield ordem, por_id
+    with engine.begin() as conexao:
+        conexao.execute(delete(Redacao).where(Redacao.tema == TEMA))
+    engine.dispose()
+
+
+def _todas_as_paginas(**filtros):
+    paginas, cursor = [], None
+    while True:
+        corpo = _listar(tema=TEMA, limite=2, **filtros, **({"cursor": cursor} if cursor else {})).json()
+        paginas.append([item["id"] for item in corpo["itens"]])
+        cursor = corpo["proximo_cursor"]
+        if cursor is None:
+            return paginas
+
+
+@requer_postgres
+def test_paginas_seguem_criado_em_e_id_sem_repetir_nem_pular(redacoes):
+    ordem, _ = redacoes
+    assert _todas_as_paginas() == [ordem[0:2], ordem[2:4], ordem[4:6]]
+
+
+@requer_postgres
+def test_filtros_de_status_e_data_valem_em_todas_as_paginas(redacoes):
+    ordem, por_id = redacoes
+    concluidas = [i for i in ordem if por_id[i] == "CONCLUIDO"]
+    assert _todas_as_paginas(status="CONCLUIDO") == [concluidas[0:2], concluidas[2:]]
+
+    # criado_ate é exclusivo: a redação de INICIO + 1 dia fica de fora
+    primeiro_dia = _todas_as_paginas(
+        criado_desde=INICIO.isoformat(), criado_ate=(INICIO + timedelta(days=1)).isoformat()
+    )
+    assert sum(primeiro_dia, []) == ordem[2:]
+
+
+@requer_postgres
+def test_itens_da_listagem_nao_trazem_o_texto_nem_o_resultado(redacoes):
+    resposta = _listar(tema=TEMA, limite=1)
+    assert resposta.status_code == 200
+    assert set(resposta.json()["itens"][0]) == {
+        "id",
+        "status",
+        "tema",
+        "criado_em",
+        "nota_final",
+        "fonte_resultado",
+        "usou_supervisor",
+        "lote_id",
+        "redacao_principal_id",
+    }
@@ -0,0 +1,184 @@
+"""
+Ingestão de lotes (POST /api/v1/redacoes/lote) pela API, com httpx sobre o
+ASGI. A validação do corpo roda sem banco; a inserção e o acoplamento usam
+uma sessão assíncrona de verdade e rodam só com TEST_DATABASE_URL apontando
+para um banco de testes descartável.
+"""
+import asyncio
+import json
+import os
+
+import httpx
+import pytest
+from sqlalchemy import create_engine, delete, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from shared.conteudo import hash_redacao
+from shared.migracoes import migrar
+from shared.models import PRIORIDADE_LOTE, Lote, Redacao
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+requer_postgres = pytest.mark.skipif(not TEST_DATABASE_URL, reason="requer TEST_DATABASE_URL (Postgres)")
+
+TEMA = "Tema do lote"
+
+
+@pytest.fixture
+def api(monkeypatch):
+    """Chama a API em memória; `api.enviadas` guarda as tarefas publicadas no broker."""
+    import main
+
+    enviadas = []
+
+    async def _enviar_tarefa(nome, args=None):
+        enviadas.append((nome, args))
+
+    monkeypatch.setattr(main, "_enviar_tarefa", _enviar_tarefa)
+
+    def _chamar(metodo, url, engine_url=None, **kwargs):
+        async def _requisicao():
+            engine = create_async_engine(engine_url) if engine_url else None
+
+            async def _get_db():
+                if engine is None:
+                    yield None
+                    return
+                async with AsyncSession(engine, expire_on_commit=False) as db:
+                    yield db
+
+            main.app.dependency_overrides[main.get_db] = _get_db
+            try:
+                async with httpx.AsyncClient(
+                    transport=httpx.ASGITransport(app=main.app), base_url="http://teste"
+                ) as cliente:
+                    return await cliente.request(metodo, url, **kwargs)
+            finally:
+                main.app.dependency_overrides.clear()
+                if engine is not None:
+                    await engine.dispose()
+
+        return asyncio.run(_requisicao())
+
+    _chamar.enviadas = enviadas
+    return _chamar
+
+
+def _item(texto, **extra):
+    return {"tema": TEMA, "texto_redacao": texto, **extra}
+
+
+def test_corpo_que_nao_e_array_e_recusado(api):
+    resposta = api("POST", "/api/v1/redacoes/lote", json=_item("Texto"))
+    assert resposta.status_code == 422
+
+
+def test_json_invalido_e_recusado(api):
+    resposta = api("POST", "/api/v1/redacoes/lote", content=b"[{", headers={"content-type": "application/json"})
+    assert resposta.status_code == 400
+
+
+def test_item_invalido_informa_a_posicao(api):
+    resposta = api("POST", "/api/v1/redacoes/lote", json=[_item("Texto"), {"tema": TEMA}])
+    assert resposta.status_code == 422
+    assert resposta.json()["detail"]["item"] == 1
+
+
+def test_lote_acima_do_limite_e_recusado(api, monkeypatch):
+    import main
+
+    monkeypatch.setattr(main, "LOTE_MAX_ITENS", 2)
+    corpo = "\n".join(json.dumps(_item(f"Texto {i}")) for i in range(3))
+    resposta = api(
+        "POST", "/api/v1/redacoes/lote", content=corpo.encode(), headers={"content-type": "application/x-ndjson"}
+    )
+    assert resposta.status_code == 413
+    assert api.enviadas == []
+
+
+@pytest.fixture
+def fabrica():
+    engine = create_engine(TEST_DATABASE_URL)
+    migrar(engine)
+    yield sessionmaker(bind=engine)
+    with engine.begin() as conexao:
+        lotes = conexao.execute(select(Redacao.lote_id).where(Redacao.tema == TEMA)).scalars().all()
+        conexao.execute(delete(Redacao).where(Redacao.tema == TEMA))
+        conexao.execute(delete(Lote).where(Lote.id.in_([lote for lote in lotes if lote])))
+    engine.dispose()
+
+
+def _url_async():
+    from database import _url_assincrona
+
+    return _url_assincrona(TEST_DATABASE_URL)
+
+
+@requer_postgres
+def test_array_json_insere_o_lote_e_acopla_as_repetidas(api, fabrica):
+    itens = [_item("Texto A", origem="escola-a"), _item("Texto B"), _item("Texto  A", origem="escola-a")]
+    resposta = api("POST", "/api/v1/redacoes/lote", engine_url=_url_async(), json=itens)
+
+    assert resposta.status_code == 202
+    corpo = resposta.json()
+    assert (corpo["total"], corpo["correcoes_disparadas"]) == (3, 2)
+    # Só antecipa o despacho justo; as correções não vão direto para a fila
+    assert api.enviadas == [("despachar_lotes", None)]
+
+    db = fabrica()
+    redacoes = db.execute(select(Redacao).where(Redacao.lote_id == corpo["lote_id"]).order_by(Redacao.id)).scalars().all()
+    # Principais inseridas primeiro, depois as cópias acopladas
+    assert [(r.texto_redacao, r.origem) for r in redacoes] == [
+        ("Texto A", "escola-a"),
+        ("Texto B", "padrao"),
+        ("Texto  A", "escola-a"),
+    ]
+    assert {(r.prioridade, r.status, r.despachado_em) for r in redacoes} == {(PRIORIDADE_LOTE, "PENDENTE", None)}
+    assert [r.redacao_principal_id for r in redacoes] == [None, None, redacoes[0].id]
+    db.close()
+
+    progresso = api("GET", f"/api/v1/redacoes/lote/{corpo['lote_id']}", engine_url=_url_async()).json()
+    assert progresso == {
+        "lote_id": corpo["lote_id"],
+        "total": 3,
+        "por_status": {"PENDENTE": 3},
+        "finalizadas": 0,
+        "percentual": 0.0,
+    }
+
+
+@requer_postgres
+def test_ndjson_em_pedacos_acopla_a_correcao_ja_em_andamento(api, fabrica):
+    db = fabrica()
+    em_andamento = Redacao(
+        tema=TEMA, texto_redacao="Texto C", status="PROCESSANDO", hash_conteudo=hash_redacao(TEMA, "Texto C")
+    )
+    db.add(em_andamento)
+    db.commit()
+    em_andamento_id = em_andamento.id
+    db.close()
+
+    corpo = (json.dumps(_item("Texto C")) + "\n\n" + json.dumps(_item("Texto D")) + "\n").encode()
+
+    async def _em_pedacos():
+        for inicio in range(0, len(corpo), 7):
+            yield corpo[inicio:inicio + 7]
+
+    resposta = api(
+        "POST",
+        "/api/v1/redacoes/lote",
+        engine_url=_url_async(),
+        content=_em_pedacos(),
+        headers={"content-type": "application/x-ndjson"},
+    )
+
+    assert resposta.status_code == 202
+    assert resposta.json()["correcoes_disparadas"] == 1
+    db = fabrica()
+    acoplada, nova = db.execute(
+        select(Redacao).where(Redacao.lote_id == resposta.json()["lote_id"]).order_by(Redacao.texto_redacao)
+    ).scalars().all()
+    assert (acoplada.redacao_principal_id, acoplada.status) == (em_andamento_id, "PROCESSANDO")
+    assert (nova.texto_redacao, nova.redacao_principal_id) == ("Texto D", None)
+    db.close()
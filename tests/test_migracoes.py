@@ -0,0 +1,115 @@
+"""
+Atualização de um banco criado pela versão original (só a tabela redacoes)
+até o esquema atual, passo a passo. Apaga as tabelas do banco: roda só com
+TEST_DATABASE_URL apontando para um banco de testes descartável.
+"""
+import os
+
+import pytest
+from sqlalchemy import create_engine, inspect, text
+
+from shared import migracoes
+from shared.conteudo import hash_redacao
+from shared.migracoes import PASSOS, TABELA_VERSOES, migrar
+from shared.models import Base
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+pytestmark = pytest.mark.skipif(not TEST_DATABASE_URL, reason="requer TEST_DATABASE_URL (Postgres)")
+
+ESQUEMA_ORIGINAL = """
+CREATE TABLE redacoes (
+    id SERIAL PRIMARY KEY,
+    tema VARCHAR,
+    texto_redacao TEXT NOT NULL,
+    status VARCHAR,
+    resultado_json JSON
+);
+CREATE INDEX ix_redacoes_id ON redacoes (id);
+CREATE INDEX ix_redacoes_tema ON redacoes (tema);
+"""
+
+
+def _limpar(conexao):
+    Base.metadata.drop_all(bind=conexao)
+    conexao.execute(text(f"DROP TABLE IF EXISTS {TABELA_VERSOES}"))
+
+
+def _esquema(engine):
+    """Colunas (tipo, nulidade, default) e índices (colunas, filtro) de cada tabela dos modelos."""
+    inspetor = inspect(engine)
+    esquema = {}
+    for tabela in Base.metadata.sorted_tables:
+        colunas = {
+            coluna["name"]: (str(coluna["type"]), coluna["nullable"], coluna["default"])
+            for coluna in inspetor.get_columns(tabela.name)
+        }
+        indices = {
+            indice["name"]: (
+                tuple(indice["column_names"]),
+                indice.get("dialect_options", {}).get("postgresql_where"),
+            )
+            for indice in inspetor.get_indexes(tabela.name)
+        }
+        esquema[tabela.name] = (colunas, indices)
+    return esquema
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine(TEST_DATABASE_URL)
+    with engine.begin() as conexao:
+        _limpar(conexao)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def esquema_atual(engine):
+    """Esquema de um banco criado vazio pela migração (create_all)."""
+    assert migrar(engine) == [versao for versao, _ in PASSOS]
+    esquema = _esquema(engine)
+    with engine.begin() as conexao:
+        _limpar(conexao)
+        conexao.execute(text(ESQUEMA_ORIGINAL))
+        conexao.execute(
+            text(
+                "INSERT INTO redacoes (tema, texto_redacao, status) VALUES "
+                "('Tema', 'Texto  em andamento', 'PENDENTE'), ('Tema', 'Texto corrigido', 'CONCLUIDO')"
+            )
+        )
+    return esquema
+
+
+def test_banco_original_atualizado_fica_igual_ao_criado_do_zero(engine, esquema_atual):
+    assert migrar(engine) == [versao for versao, _ in PASSOS]
+    assert migrar(engine) == []  # cada passo roda uma única vez
+
+    assert _esquema(engine) == esquema_atual
+
+    with engine.connect() as conexao:
+        linhas = conexao.execute(
+            text("SELECT status, hash_conteudo, prioridade, origem FROM redacoes ORDER BY id")
+        ).all()
+    assert linhas[0] == ("PENDENTE", hash_redacao("Tema", "Texto em andamento"), "interativa", "padrao")
+    # Concluídas não recebem hash: não são mais alvo de acoplamento
+    assert linhas[1] == ("CONCLUIDO", None, "interativa", "padrao")
+
+
+def test_cada_passo_pode_ser_aplicado_sozinho(engine, esquema_atual, monkeypatch):
+    # Como em um deploy a cada mudança: cada migração só aplica o passo novo
+    for quantidade in range(1, len(PASSOS) + 1):
+        monkeypatch.setattr(migracoes, "PASSOS", PASSOS[:quantidade])
+        assert migrar(engine) == [PASSOS[quantidade - 1][0]]
+
+    assert _esquema(engine) == esquema_atual
+
+
+def test_banco_atualizado_antes_do_registro_de_versoes(engine, esquema_atual):
+    migrar(engine)
+    with engine.begin() as conexao:
+        conexao.execute(text(f"DELETE FROM {TABELA_VERSOES}"))
+
+    # Os passos são idempotentes: só registram o que o banco já tem
+    assert migrar(engine) == [versao for versao, _ in PASSOS]
+    assert _esquema(engine) == esquema_atual
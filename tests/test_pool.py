@@ -0,0 +1,77 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from langchain_core.runnables import RunnableLambda
+
+from agents import pool
+from agents.provedores import ProvedorLLM
+from agents.roteador import EndpointLLM
+
+
+class _ProvedorLento(ProvedorLLM):
+    """Cria clientes instantaneamente, exceto o do modelo "lento", que espera `liberar`."""
+
+    nome = "lento"
+
+    def __init__(self):
+        self.liberar = threading.Event()
+        self.criando = threading.Event()
+
+    def criar_cliente(self, modelo, temperatura, api_key=None):
+        if modelo == "lento":
+            self.criando.set()
+            assert self.liberar.wait(5)
+        return {"modelo": modelo}
+
+    def saida_estruturada(self, cliente, schema):
+        return RunnableLambda(lambda entrada: entrada)
+
+    def saida_texto(self, cliente):
+        return RunnableLambda(lambda entrada: entrada)
+
+
+@pytest.fixture
+def provedor(monkeypatch):
+    provedor = _ProvedorLento()
+    monkeypatch.setattr(pool, "_pool", {})
+    monkeypatch.setattr(pool, "obter_provedor", lambda: provedor)
+    yield provedor
+    provedor.liberar.set()
+
+
+def test_criacao_lenta_nao_trava_quem_busca_recursos_prontos(provedor):
+    pronto = pool.obter_recursos("rapido", 0.2, "chave")
+    criacao = threading.Thread(target=pool.obter_recursos, args=("lento", 0.2, "chave"))
+    criacao.start()
+    assert provedor.criando.wait(5)
+
+    inicio = time.perf_counter()
+    assert pool.obter_recursos("rapido", 0.2, "chave") is pronto
+    assert pool.obter_recursos("rapido-2", 0.2, "chave") is not None
+    assert time.perf_counter() - inicio < 1
+
+    provedor.liberar.set()
+    criacao.join(5)
+    assert pool.recursos_prontos("lento", 0.2, "chave") is not None
+
+
+def test_criacao_na_rota_nao_para_o_event_loop(provedor):
+    endpoint = EndpointLLM("lento", "chave-teste-pool", "lento")
+
+    async def _cenario():
+        criacao = asyncio.create_task(endpoint.recursos_sem_bloquear(0.2))
+        # Enquanto o cliente é criado em outra thread, o loop segue atendendo
+        await asyncio.to_thread(provedor.criando.wait, 5)
+        batidas = 0
+        for _ in range(3):
+            await asyncio.sleep(0)
+            batidas += 1
+        provedor.liberar.set()
+        recursos = await criacao
+        return batidas, recursos
+
+    batidas, recursos = asyncio.run(_cenario())
+    assert batidas == 3
+    assert recursos is pool.recursos_prontos("lento", 0.2, "chave-teste-pool")
@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+from langchain_core.prompts import ChatPromptTemplate
+
+from agents.provedores import ProvedorFalso, ProvedorLLM
+from agents.roteador import EndpointLLM, RotaLLM
+from agents.telemetria import iniciar_telemetria_redacao
+from shared.schemas import AvaliacaoCompetencia
+
+
+class _Recursos:
+    def __init__(self, chain):
+        self.chain_competencia = chain
+
+
+def test_provedor_incompleto_falha_ao_ser_criado():
+    class _SemTexto(ProvedorLLM):
+        def criar_cliente(self, modelo, temperatura, api_key=None):
+            return None
+
+        def saida_estruturada(self, cliente, schema):
+            return None
+
+    with pytest.raises(TypeError):
+        _SemTexto()
+
+
+def test_saida_estruturada_do_provedor_falso_informa_os_tokens(monkeypatch):
+    monkeypatch.setenv("FAKE_LLM_LATENCIA", "fixa:0")
+    monkeypatch.setenv("FAKE_LLM_TOKENS_SAIDA", "123")
+    provedor = ProvedorFalso()
+    cliente = provedor.criar_cliente("modelo-falso", 0.2)
+    chain = ChatPromptTemplate.from_template("Competência 3: {texto}") | provedor.saida_estruturada(
+        cliente, AvaliacaoCompetencia
+    )
+
+    resposta = asyncio.run(chain.ainvoke({"texto": "Uma redação."}))
+    assert resposta["parsing_error"] is None
+    assert resposta["parsed"].competencia == 3
+    assert resposta["raw"].usage_metadata["output_tokens"] == 123
+    assert resposta["raw"].usage_metadata["input_tokens"] > 0
+
+
+def test_invocar_devolve_o_schema_e_soma_os_tokens_informados(monkeypatch):
+    monkeypatch.setenv("FAKE_LLM_LATENCIA", "fixa:0")
+    monkeypatch.setenv("FAKE_LLM_TOKENS_SAIDA", "123")
+    provedor = ProvedorFalso()
+    chain = ChatPromptTemplate.from_template("Competência 2: {texto}") | provedor.saida_estruturada(
+        provedor.criar_cliente("modelo-falso", 0.2), AvaliacaoCompetencia
+    )
+    endpoint = EndpointLLM("unico", "chave-teste-provedores", "modelo-falso", requisicoes_por_minuto=6000)
+    monkeypatch.setattr(endpoint, "recursos", lambda temperatura: _Recursos(chain))
+    rota = RotaLLM("Corretor 1", [endpoint], 0.2)
+
+    async def _corrigir():
+        contadores = iniciar_telemetria_redacao()
+        resultado, modelo = await rota.invocar("chain_competencia", {"texto": "Uma redação."}, 10, 500)
+        return resultado, modelo, contadores
+
+    resultado, modelo, contadores = asyncio.run(_corrigir())
+    assert isinstance(resultado, AvaliacaoCompetencia)
+    assert modelo == "modelo-falso"
+    assert contadores["chamadas_llm"] == 1
+    assert contadores["tokens_saida"] == 123
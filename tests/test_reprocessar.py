@@ -0,0 +1,88 @@
+import random
+
+import numpy as np
+import pytest
+
+from banca.reprocessar import NUMERO_COMPETENCIAS, _montar_matriz, reconsolidar
+from banca.rules import (
+    calcular_nota_consolidada,
+    resolver_discrepancia_com_supervisor,
+    verificar_discrepancia,
+)
+
+NOTAS = (0, 40, 80, 120, 160, 200)
+
+
+def _corretor(notas):
+    competencias = [{"competencia": n, "nota": nota} for n, nota in enumerate(notas, start=1)]
+    return {"competencias": competencias, "nota_final": sum(notas)}
+
+
+def test_montar_matriz_posiciona_notas_e_deixa_ausentes_como_nan():
+    linhas = np.array(
+        [
+            (7, 1, 1, 120),
+            (7, 2, 5, 80),
+            (3, 3, 2, 200),
+        ],
+        dtype=np.float64,
+    )
+    ids, notas = _montar_matriz(linhas)
+
+    assert ids.tolist() == [3, 7]
+    assert notas[1, 1, 0] == 120
+    assert notas[1, 2, 4] == 80
+    assert notas[0, 3, 1] == 200
+    assert np.isnan(notas).sum() == notas.size - 3
+
+
+@pytest.mark.parametrize("semente", range(5))
+def test_reconsolidar_coincide_com_as_regras_da_banca(semente):
+    aleatorio = random.Random(semente)
+    redacoes = 200
+    notas = np.full((redacoes, 4, NUMERO_COMPETENCIAS), np.nan)
+    esperado = []
+    for i in range(redacoes):
+        s1 = [aleatorio.choice(NOTAS) for _ in range(NUMERO_COMPETENCIAS)]
+        s2 = [aleatorio.choice(NOTAS) for _ in range(NUMERO_COMPETENCIAS)]
+        c1, c2 = _corretor(s1), _corretor(s2)
+        notas[i, 1], notas[i, 2] = s1, s2
+
+        discrepantes = verificar_discrepancia(c1, c2)
+        if discrepantes:
+            # O Supervisor só reavalia as competências discrepantes
+            c3 = {"competencias": []}
+            for numero in discrepantes:
+                nota = aleatorio.choice(NOTAS)
+                c3["competencias"].append({"competencia": numero, "nota": nota})
+                notas[i, 3, numero - 1] = nota
+            resultado = resolver_discrepancia_com_supervisor(c1, c2, c3)
+        else:
+            resultado = calcular_nota_consolidada(c1, c2)
+        esperado.append(resultado)
+
+    calculo = reconsolidar(notas)
+
+    assert calculo["validas"].all()
+    assert not calculo["falta_supervisor"].any()
+    for i, resultado in enumerate(esperado):
+        assert calculo["final"][i].tolist() == [c["nota"] for c in resultado["competencias"]]
+        assert calculo["nota_final"][i] == resultado["nota_final"]
+
+
+def test_reconsolidar_sinaliza_discrepancia_sem_supervisor():
+    notas = np.full((1, 4, NUMERO_COMPETENCIAS), np.nan)
+    notas[0, 1] = [200, 120, 120, 120, 120]
+    notas[0, 2] = [80, 160, 120, 120, 120]
+
+    calculo = reconsolidar(notas)
+
+    assert calculo["falta_supervisor"][0].tolist() == [True, False, False, False, False]
+    assert calculo["final"][0, :2].tolist() == [140, 140]
+
+
+def test_reconsolidar_ignora_redacoes_incompletas():
+    notas = np.full((1, 4, NUMERO_COMPETENCIAS), np.nan)
+    notas[0, 1] = [120] * NUMERO_COMPETENCIAS
+
+    assert not reconsolidar(notas)["validas"][0]
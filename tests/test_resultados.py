@@ -0,0 +1,76 @@
+from banca.rules import resolver_discrepancia_com_supervisor
+from shared.resultados import (
+    CODIGOS_CORRETOR,
+    CORRETOR_FINAL,
+    comprimir_detalhes,
+    descomprimir_detalhes,
+    separar_resultado,
+)
+
+
+def _correcao(id_corretor, notas):
+    return {
+        "id_corretor": id_corretor,
+        "competencias": [
+            {
+                "competencia": n,
+                "nota": nota,
+                "analise_critica": f"Análise da competência {n}: coesão, repertório e proposta.",
+                "justificativa": "Justificativa com acentuação: ç, ã, é.",
+            }
+            for n, nota in notas.items()
+        ],
+        "nota_final": sum(notas.values()),
+        "comentarios_gerais": None,
+    }
+
+
+def _resultado():
+    c1 = _correcao("Corretor 1", dict(zip(range(1, 6), (40, 120, 120, 200, 120))))
+    c2 = _correcao("Corretor 2", dict(zip(range(1, 6), (160, 120, 160, 80, 120))))
+    c3 = _correcao("Corretor Supervisor", {1: 40, 4: 160})
+    resultado = resolver_discrepancia_com_supervisor(c1, c2, c3)
+    resultado["tempos"] = {"banca_s": 1.5}
+    return resultado
+
+
+def test_detalhes_comprimidos_voltam_iguais():
+    detalhes = _resultado()["detalhes"]
+    comprimido = comprimir_detalhes(detalhes)
+    assert isinstance(comprimido, bytes)
+    assert descomprimir_detalhes(comprimido) == detalhes
+
+
+def test_detalhes_vazios_nao_sao_gravados():
+    assert comprimir_detalhes([]) is None
+    assert descomprimir_detalhes(None) == []
+
+
+def test_separar_resultado_divide_resumo_colunas_e_notas():
+    resultado = _resultado()
+    resumo, colunas, notas = separar_resultado(resultado)
+
+    assert "detalhes" not in resumo
+    assert resumo["competencias"] == resultado["competencias"]
+    assert resumo["tempos"] == {"banca_s": 1.5}
+
+    assert colunas["nota_final"] == resultado["nota_final"]
+    assert colunas["fonte_resultado"] == resultado["fonte_resultado"]
+    assert colunas["usou_supervisor"] is True
+    assert descomprimir_detalhes(colunas["detalhes_comprimidos"]) == resultado["detalhes"]
+
+    por_corretor = {}
+    for nota in notas:
+        por_corretor.setdefault(nota["corretor"], {})[nota["competencia"]] = nota["nota"]
+    assert por_corretor[CORRETOR_FINAL] == {c["competencia"]: c["nota"] for c in resultado["competencias"]}
+    assert por_corretor[CODIGOS_CORRETOR["Corretor 1"]] == {1: 40, 2: 120, 3: 120, 4: 200, 5: 120}
+    assert por_corretor[CODIGOS_CORRETOR["Corretor Supervisor"]] == {1: 40, 4: 160}
+
+
+def test_resultado_sem_banca_nao_usa_supervisor():
+    resumo, colunas, notas = separar_resultado(
+        {"competencias": [{"competencia": 1, "nota": 0}], "nota_final": 0, "detalhes": []}
+    )
+    assert colunas["usou_supervisor"] is False
+    assert colunas["detalhes_comprimidos"] is None
+    assert notas == [{"corretor": CORRETOR_FINAL, "competencia": 1, "nota": 0}]
@@ -0,0 +1,59 @@
+import asyncio
+
+import pytest
+from google.api_core.exceptions import ResourceExhausted
+
+from agents import roteador
+from agents.roteador import EndpointLLM, RotaLLM
+
+
+class _ChainSemCota:
+    def __init__(self):
+        self.chamadas = 0
+
+    async def ainvoke(self, entrada):
+        self.chamadas += 1
+        raise ResourceExhausted("Quota exceeded. Please retry in 0.01s")
+
+
+class _Recursos:
+    def __init__(self, chain):
+        self.chain_competencia = chain
+
+
+def test_endpoints_da_mesma_chave_com_modelos_diferentes_tem_cota_e_saude_proprias():
+    rapido = EndpointLLM("rapido", "chave-teste-roteador", "modelo-a", requisicoes_por_minuto=60)
+    forte = EndpointLLM("forte", "chave-teste-roteador", "modelo-b", requisicoes_por_minuto=6)
+
+    assert rapido.limitador is not forte.limitador
+    assert rapido.limitador._locais["rpm"].taxa_por_segundo == 1.0
+    assert forte.limitador._locais["rpm"].taxa_por_segundo == 0.1
+
+    rapido.limitador.marcar_indisponivel(60)
+    assert rapido.limitador.segundos_indisponivel() > 0
+    assert forte.limitador.segundos_indisponivel() == 0
+
+
+def test_invocar_desiste_apos_o_maximo_de_429(monkeypatch):
+    monkeypatch.setattr(roteador, "ROTEADOR_MAX_TENTATIVAS", 3)
+    chain = _ChainSemCota()
+    endpoint = EndpointLLM("unico", "chave-teste-tentativas", "modelo-a", requisicoes_por_minuto=6000)
+    monkeypatch.setattr(endpoint, "recursos", lambda temperatura: _Recursos(chain))
+    rota = RotaLLM("Corretor 1", [endpoint], 0.2)
+
+    with pytest.raises(ResourceExhausted):
+        asyncio.run(rota.invocar("chain_competencia", {}, 10, 10))
+    assert chain.chamadas == 3
+
+
+def test_invocar_desiste_quando_a_espera_acumulada_passa_do_maximo(monkeypatch):
+    monkeypatch.setattr(roteador, "ROTEADOR_MAX_TENTATIVAS", 1000)
+    monkeypatch.setattr(roteador, "ROTEADOR_ESPERA_MAXIMA", 0.05)
+    chain = _ChainSemCota()
+    endpoint = EndpointLLM("unico", "chave-teste-espera", "modelo-a", requisicoes_por_minuto=6000)
+    monkeypatch.setattr(endpoint, "recursos", lambda temperatura: _Recursos(chain))
+    rota = RotaLLM("Corretor 1", [endpoint], 0.2)
+
+    with pytest.raises(ResourceExhausted):
+        asyncio.run(rota.invocar("chain_competencia", {}, 10, 10))
+    assert chain.chamadas < 10
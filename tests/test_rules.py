@@ -0,0 +1,71 @@
+from banca.rules import (
+    FONTE_MEDIA,
+    calcular_nota_consolidada,
+    resolver_discrepancia_com_supervisor,
+    verificar_discrepancia,
+)
+
+
+def _correcao(notas, id_corretor="Corretor 1"):
+    return {
+        "id_corretor": id_corretor,
+        "competencias": [{"competencia": n, "nota": nota} for n, nota in notas.items()],
+        "nota_final": sum(notas.values()),
+    }
+
+
+def _cinco(*notas):
+    return dict(zip(range(1, 6), notas))
+
+
+def test_verificar_discrepancia_sem_divergencia_retorna_lista_vazia():
+    c1 = _correcao(_cinco(120, 120, 120, 120, 120))
+    c2 = _correcao(_cinco(160, 80, 120, 160, 120))
+    assert verificar_discrepancia(c1, c2) == []
+
+
+def test_verificar_discrepancia_retorna_so_as_competencias_acima_do_limite():
+    c1 = _correcao(_cinco(40, 120, 120, 200, 120))
+    c2 = _correcao(_cinco(160, 120, 120, 80, 120))
+    assert verificar_discrepancia(c1, c2) == [1, 4]
+
+
+def test_verificar_discrepancia_na_nota_total_retorna_todas_as_competencias():
+    c1 = _correcao(_cinco(80, 80, 80, 80, 80))
+    c2 = _correcao(_cinco(120, 120, 120, 120, 160))
+    assert verificar_discrepancia(c1, c2) == [1, 2, 3, 4, 5]
+
+
+def test_sem_discrepancia_a_nota_e_a_media_por_competencia():
+    resultado = calcular_nota_consolidada(
+        _correcao(_cinco(120, 120, 120, 120, 120)), _correcao(_cinco(160, 80, 120, 160, 120))
+    )
+    assert [c["nota"] for c in resultado["competencias"]] == [140, 100, 120, 140, 120]
+    assert resultado["nota_final"] == 620
+    assert resultado["fonte_resultado"] == FONTE_MEDIA
+
+
+def test_supervisor_parcial_aplica_consenso_so_nas_competencias_reavaliadas():
+    c1 = _correcao(_cinco(40, 120, 120, 200, 120))
+    c2 = _correcao(_cinco(160, 120, 160, 80, 120), "Corretor 2")
+    # Supervisor reavaliou só C1 e C4, e responde fora de ordem
+    c3 = _correcao({4: 160, 1: 40}, "Corretor Supervisor")
+
+    resultado = resolver_discrepancia_com_supervisor(c1, c2, c3)
+
+    # C1: (40, 160, 40) -> 40; C4: (200, 80, 160) -> 180; demais: média de 1 e 2
+    assert [c["nota"] for c in resultado["competencias"]] == [40, 120, 140, 180, 120]
+    assert resultado["nota_final"] == 600
+    assert "C1, C4" in resultado["fonte_resultado"]
+    assert resultado["detalhes"] == [c1, c2, c3]
+
+
+def test_supervisor_completo_usa_a_fonte_de_consenso_da_banca():
+    c1 = _correcao(_cinco(40, 40, 40, 40, 40))
+    c2 = _correcao(_cinco(200, 200, 200, 200, 200), "Corretor 2")
+    c3 = _correcao(_cinco(160, 160, 160, 160, 160), "Corretor Supervisor")
+
+    resultado = resolver_discrepancia_com_supervisor(c1, c2, c3)
+
+    assert [c["nota"] for c in resultado["competencias"]] == [180] * 5
+    assert resultado["fonte_resultado"] == "Consenso da Banca (média das 2 notas mais próximas)"
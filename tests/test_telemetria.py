@@ -0,0 +1,94 @@
+import asyncio
+
+import pytest
+from langchain_core.messages import AIMessage
+from prometheus_client import REGISTRY
+
+from agents.limiter import estimar_tokens
+from agents.telemetria import (
+    ETAPA_DURACAO,
+    iniciar_telemetria_redacao,
+    medir,
+    registrar_chamada_llm,
+    registrar_espera_cota,
+    registrar_falha_llm,
+)
+from shared.schemas import AvaliacaoCompetencia
+
+CORRETOR, ENDPOINT = "Corretor Teste", "endpoint-teste"
+
+
+def _amostra(nome, **rotulos):
+    return REGISTRY.get_sample_value(nome, rotulos) or 0.0
+
+
+def _tokens(tipo):
+    return _amostra("llm_tokens_total", corretor=CORRETOR, endpoint=ENDPOINT, tipo=tipo)
+
+
+def _chamadas(resultado):
+    return _amostra(
+        "llm_chamadas_total", corretor=CORRETOR, endpoint=ENDPOINT, chain="chain_competencia", resultado=resultado
+    )
+
+
+def test_tokens_informados_pelo_provedor_prevalecem_sobre_a_estimativa():
+    antes = _tokens("entrada"), _tokens("saida")
+    contadores = iniciar_telemetria_redacao()
+    resposta = AIMessage(
+        content="Comentário.", usage_metadata={"input_tokens": 900, "output_tokens": 120, "total_tokens": 1020}
+    )
+
+    registrar_chamada_llm(CORRETOR, ENDPOINT, "chain_feedback", 1.5, resposta, tokens_entrada_estimados=700)
+
+    assert (_tokens("entrada") - antes[0], _tokens("saida") - antes[1]) == (900, 120)
+    assert contadores == {"chamadas_llm": 1, "tokens_entrada": 900, "tokens_saida": 120, "espera_cota_s": 0.0}
+
+
+def test_sem_uso_do_provedor_os_tokens_de_saida_sao_estimados():
+    contadores = iniciar_telemetria_redacao()
+    avaliacao = AvaliacaoCompetencia(competencia=1, analise_critica="Análise.", nota=160, justificativa="Ok.")
+
+    registrar_chamada_llm(CORRETOR, ENDPOINT, "chain_competencia", 2.0, avaliacao, tokens_entrada_estimados=700)
+
+    assert contadores["tokens_entrada"] == 700
+    assert contadores["tokens_saida"] == estimar_tokens(avaliacao.json())
+
+
+def test_falhas_e_esperas_somam_na_redacao_e_nas_metricas():
+    antes = _chamadas("cota")
+    contadores = iniciar_telemetria_redacao()
+
+    registrar_falha_llm(CORRETOR, ENDPOINT, "chain_competencia", "cota")
+    registrar_espera_cota(CORRETOR, ENDPOINT, 2.5)
+    registrar_espera_cota(CORRETOR, ENDPOINT, 1.0)
+
+    assert _chamadas("cota") - antes == 1
+    assert (contadores["chamadas_llm"], contadores["espera_cota_s"]) == (1, 3.5)
+
+
+def test_correcoes_no_mesmo_loop_nao_misturam_os_contadores():
+    async def _correcao(chamadas):
+        contadores = iniciar_telemetria_redacao()
+        for _ in range(chamadas):
+            # Cede o loop entre as chamadas, como durante a espera pelo LLM
+            await asyncio.sleep(0)
+            registrar_falha_llm(CORRETOR, ENDPOINT, "chain_competencia", "erro")
+        return contadores["chamadas_llm"]
+
+    async def _cenario():
+        return await asyncio.gather(_correcao(2), _correcao(5))
+
+    assert asyncio.run(_cenario()) == [2, 5]
+
+
+def test_medir_registra_a_etapa_mesmo_com_erro():
+    antes = _amostra("correcao_etapa_segundos_count", etapa="teste")
+    tempos = {}
+
+    with pytest.raises(RuntimeError):
+        with medir(ETAPA_DURACAO, tempos, "teste_s", etapa="teste"):
+            raise RuntimeError("falhou")
+
+    assert _amostra("correcao_etapa_segundos_count", etapa="teste") - antes == 1
+    assert tempos["teste_s"] >= 0
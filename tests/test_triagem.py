@@ -0,0 +1,46 @@
+from banca.triagem import MINIMO_LINHAS, contar_linhas, triar_redacao
+
+PARAGRAFO = (
+    "A educação pública de qualidade é um direito de todos e deve ser garantida pelo "
+    "Estado, com investimento contínuo na formação dos professores e na estrutura das escolas."
+)
+REDACAO = "\n".join([PARAGRAFO] * 6)
+
+
+def test_redacao_valida_segue_para_a_banca():
+    assert contar_linhas(REDACAO) > MINIMO_LINHAS
+    assert triar_redacao(REDACAO, ["Texto motivador sobre o trabalho infantil no Brasil."]) is None
+
+
+def test_redacao_em_branco_recebe_zero():
+    resultado = triar_redacao("  \n\n ")
+    assert resultado["nota_final"] == 0
+    assert resultado["triagem"]["motivo"] == "redação em branco"
+    assert [c["nota"] for c in resultado["competencias"]] == [0] * 5
+
+
+def test_texto_insuficiente_recebe_zero():
+    resultado = triar_redacao(PARAGRAFO)
+    assert resultado["nota_final"] == 0
+    assert resultado["triagem"]["motivo"].startswith("texto insuficiente")
+    assert resultado["detalhes"] == []
+
+
+def test_texto_em_outra_lingua_recebe_zero():
+    paragrafo = (
+        "Quality public education is a right for everybody and should be guaranteed by "
+        "governments, through steady investment in teacher training and school buildings."
+    )
+    resultado = triar_redacao("\n".join([paragrafo] * 6))
+    assert resultado["triagem"]["motivo"] == "texto não redigido em língua portuguesa"
+
+
+def test_copia_dos_textos_motivadores_recebe_zero():
+    resultado = triar_redacao(REDACAO, [PARAGRAFO])
+    assert resultado["triagem"]["motivo"] == "cópia dos textos motivadores"
+    assert resultado["triagem"]["proporcao_copiada"] > 0.5
+
+
+def test_copia_parcial_com_texto_proprio_suficiente_segue_para_a_banca():
+    motivador = "A educação pública de qualidade é um direito de todos e deve ser garantida"
+    assert triar_redacao(REDACAO, [motivador]) is None
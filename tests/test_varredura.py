@@ -0,0 +1,113 @@
+"""
+Semântica do lease das redações. Usa SELECT ... FOR UPDATE SKIP LOCKED e
+now() do Postgres: roda só com TEST_DATABASE_URL apontando para um banco de
+testes descartável (as tabelas são criadas por shared/migracoes.py).
+"""
+import os
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from shared.migracoes import migrar
+from shared.models import Redacao
+from varredura import LEASE_SEGUNDOS, estender_lease, reivindicar_redacao
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+pytestmark = pytest.mark.skipif(not TEST_DATABASE_URL, reason="requer TEST_DATABASE_URL (Postgres)")
+
+
+@pytest.fixture(scope="module")
+def fabrica():
+    engine = create_engine(TEST_DATABASE_URL)
+    migrar(engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def redacao_id(fabrica):
+    db = fabrica()
+    redacao = Redacao(tema="Tema", texto_redacao="Texto", status="PENDENTE")
+    db.add(redacao)
+    db.commit()
+    yield redacao.id
+    db.query(Redacao).filter(Redacao.id == redacao.id).delete()
+    db.commit()
+    db.close()
+
+
+def _ler(fabrica, redacao_id):
+    db = fabrica()
+    try:
+        return db.query(Redacao).filter(Redacao.id == redacao_id).one()
+    finally:
+        db.close()
+
+
+def test_reivindica_pendente_sem_lease(fabrica, redacao_id):
+    db = fabrica()
+    antes = datetime.now(timezone.utc)
+    redacao = reivindicar_redacao(db, redacao_id, "tarefa-a")
+    db.close()
+
+    assert redacao is not None
+    lida = _ler(fabrica, redacao_id)
+    assert lida.status == "PROCESSANDO"
+    assert lida.lease_dono == "tarefa-a"
+    assert lida.lease_expira_em > antes + timedelta(seconds=LEASE_SEGUNDOS - 60)
+
+
+def test_lease_valido_de_outra_tarefa_impede_reivindicacao(fabrica, redacao_id):
+    db = fabrica()
+    assert reivindicar_redacao(db, redacao_id, "tarefa-a") is not None
+    assert reivindicar_redacao(db, redacao_id, "tarefa-b") is None
+    # O retry da mesma tarefa mantém o lease
+    assert reivindicar_redacao(db, redacao_id, "tarefa-a") is not None
+    db.close()
+
+
+def test_lease_expirado_pode_ser_reivindicado(fabrica, redacao_id):
+    db = fabrica()
+    reivindicar_redacao(db, redacao_id, "tarefa-a")
+    estender_lease(db, redacao_id, "tarefa-a", -1)
+    db.commit()
+
+    assert reivindicar_redacao(db, redacao_id, "tarefa-b") is not None
+    db.close()
+    assert _ler(fabrica, redacao_id).lease_dono == "tarefa-b"
+
+
+def test_estender_lease_ignora_outro_dono(fabrica, redacao_id):
+    db = fabrica()
+    reivindicar_redacao(db, redacao_id, "tarefa-a")
+    expira = _ler(fabrica, redacao_id).lease_expira_em
+    estender_lease(db, redacao_id, "tarefa-b", 10 * LEASE_SEGUNDOS)
+    db.commit()
+    db.close()
+
+    assert _ler(fabrica, redacao_id).lease_expira_em == expira
+
+
+def test_redacao_finalizada_nao_e_reivindicada(fabrica, redacao_id):
+    db = fabrica()
+    db.query(Redacao).filter(Redacao.id == redacao_id).update({Redacao.status: "CONCLUIDO"})
+    db.commit()
+
+    assert reivindicar_redacao(db, redacao_id, "tarefa-a") is None
+    db.close()
+
+
+def test_linha_travada_e_pulada_sem_esperar(fabrica, redacao_id):
+    trava = fabrica()
+    trava.query(Redacao).filter(Redacao.id == redacao_id).with_for_update().one()
+
+    db = fabrica()
+    try:
+        assert reivindicar_redacao(db, redacao_id, "tarefa-a") is None
+    finally:
+        db.close()
+        trava.rollback()
+        trava.close()
@@ -0,0 +1,198 @@
+import argparse
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+from sqlalchemy.dialects.postgresql import insert
+
+from shared.conteudo import normalizar_texto, hash_conteudo
+from shared.models import SessionLocal, CacheAvaliacao
+from .prompts import VERSAO_PROMPT, VERSOES_PROMPT_ATUAIS
+from .telemetria import CACHE_CONSULTAS
+
+# Configuração de Logs
+logger = logging.getLogger(__name__)
+
+# Camada em memória (LRU com expiração) na frente da tabela cache_avaliacoes
+CACHE_MEMORIA_MAX_ITENS = int(os.getenv("CACHE_MEMORIA_MAX_ITENS", "2048"))
+CACHE_MEMORIA_TTL_SEGUNDOS = float(os.getenv("CACHE_MEMORIA_TTL_SEGUNDOS", "3600"))
+
+
+def chave_avaliacao(
+    texto_redacao: str,
+    tema: str,
+    competencia: int,
+    modelo: str,
+    temperatura: float,
+    versao_prompt: str = VERSAO_PROMPT,
+) -> str:
+    """Chave de conteúdo de uma avaliação: mesma entrada + mesmo prompt/modelo = mesma chave."""
+    return hash_conteudo(
+        normalizar_texto(texto_redacao),
+        normalizar_texto(tema),
+        competencia,
+        versao_prompt,
+        modelo,
+        temperatura,
+    )
+
+
+class CacheAvaliacoes:
+    """
+    Cache de duas camadas para avaliações de competência.
+
+    A camada em memória é um LRU com TTL por processo; a camada persistente é a
+    tabela `cache_avaliacoes` no Postgres, compartilhada entre os workers.
+    Falhas no cache nunca interrompem a correção: viram um miss.
+    """
+
+    def __init__(self, max_itens: int = CACHE_MEMORIA_MAX_ITENS, ttl: float = CACHE_MEMORIA_TTL_SEGUNDOS):
+        self.max_itens = max_itens
+        self.ttl = ttl
+        self._memoria: "OrderedDict[str, tuple]" = OrderedDict()
+        self._trava = threading.Lock()
+        self.acertos_memoria = 0
+        self.acertos_banco = 0
+        self.faltas = 0
+
+    def _obter_memoria(self, chave: str) -> Optional[Dict[str, Any]]:
+        with self._trava:
+            item = self._memoria.get(chave)
+            if item is None:
+                return None
+            expira_em, valor = item
+            if expira_em < time.monotonic():
+                del self._memoria[chave]
+                return None
+            self._memoria.move_to_end(chave)
+            return valor
+
+    def _salvar_memoria(self, chave: str, valor: Dict[str, Any]) -> None:
+        with self._trava:
+            self._memoria[chave] = (time.monotonic() + self.ttl, valor)
+            self._memoria.move_to_end(chave)
+            while len(self._memoria) > self.max_itens:
+                self._memoria.popitem(last=False)
+
+    @staticmethod
+    def _obter_banco(chave: str) -> Optional[Dict[str, Any]]:
+        db = SessionLocal()
+        try:
+            registro = (
+                db.query(CacheAvaliacao.resultado)
+                .filter(CacheAvaliacao.chave == chave)
+                .first()
+            )
+            return registro.resultado if registro else None
+        finally:
+            db.close()
+
+    @staticmethod
+    def _salvar_banco(chave: str, competencia: int, valor: Dict[str, Any], versao_prompt: str) -> None:
+        db = SessionLocal()
+        try:
+            db.execute(
+                insert(CacheAvaliacao)
+                .values(
+                    chave=chave,
+                    versao_prompt=versao_prompt,
+                    competencia=competencia,
+                    resultado=valor,
+                )
+                .on_conflict_do_nothing(index_elements=["chave"])
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    async def obter(self, chave: str) -> Optional[Dict[str, Any]]:
+        valor = self._obter_memoria(chave)
+        if valor is not None:
+            self.acertos_memoria += 1
+            CACHE_CONSULTAS.labels("memoria").inc()
+            return dict(valor)
+
+        try:
+            valor = await asyncio.to_thread(self._obter_banco, chave)
+        except Exception as e:
+            logger.warning(f"Falha ao consultar o cache de avaliações: {e}")
+            valor = None
+
+        if valor is None:
+            self.faltas += 1
+            CACHE_CONSULTAS.labels("falta").inc()
+            return None
+
+        self.acertos_banco += 1
+        CACHE_CONSULTAS.labels("banco").inc()
+        self._salvar_memoria(chave, valor)
+        return dict(valor)
+
+    async def salvar(
+        self, chave: str, competencia: int, valor: Dict[str, Any], versao_prompt: str = VERSAO_PROMPT
+    ) -> None:
+        self._salvar_memoria(chave, valor)
+        try:
+            await asyncio.to_thread(self._salvar_banco, chave, competencia, valor, versao_prompt)
+        except Exception as e:
+            logger.warning(f"Falha ao gravar no cache de avaliações: {e}")
+
+    def limpar_memoria(self) -> None:
+        with self._trava:
+            self._memoria.clear()
+
+    def estatisticas(self) -> Dict[str, Any]:
+        """Contadores de acerto/falta do processo atual."""
+        acertos = self.acertos_memoria + self.acertos_banco
+        total = acertos + self.faltas
+        return {
+            "acertos_memoria": self.acertos_memoria,
+            "acertos_banco": self.acertos_banco,
+            "faltas": self.faltas,
+            "taxa_acerto": round(acertos / total, 4) if total else 0.0,
+            "itens_memoria": len(self._memoria),
+            "versoes_prompt": list(VERSOES_PROMPT_ATUAIS),
+        }
+
+
+# Instância compartilhada por todas as avaliações do processo
+cache_avaliacoes = CacheAvaliacoes()
+
+
+def invalidar_cache(tudo: bool = False) -> int:
+    """
+    Remove entradas do cache de avaliações.
+
+    Por padrão apaga apenas as entradas geradas com versões anteriores dos
+    prompts (TEMPLATE_AGENTE_COMPETENCIA, TEMPLATE_AGENTE_COMPLETO) ou de
+    COMPETENCIAS_INFO, que já não são mais lidas, pois a versão faz parte
+    da chave. Com `tudo=True`, esvazia o cache inteiro.
+
+    Returns:
+        int: Número de linhas removidas da tabela.
+    """
+    cache_avaliacoes.limpar_memoria()
+    db = SessionLocal()
+    try:
+        consulta = db.query(CacheAvaliacao)
+        if not tudo:
+            consulta = consulta.filter(CacheAvaliacao.versao_prompt.notin_(VERSOES_PROMPT_ATUAIS))
+        removidas = consulta.delete(synchronize_session=False)
+        db.commit()
+        return removidas
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Invalida o cache de avaliações de competência.")
+    parser.add_argument("--tudo", action="store_true", help="Remove também as entradas da versão atual do prompt.")
+    args = parser.parse_args()
+    print(
+        f"{invalidar_cache(tudo=args.tudo)} entradas removidas do cache "
+        f"(versões atuais: {', '.join(VERSOES_PROMPT_ATUAIS)})."
+    )
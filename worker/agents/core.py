@@ -1,15 +1,26 @@
 import asyncio
+import inspect
 import json
 import logging
-from typing import Dict, Any, List
+import os
+import time
+from typing import Dict, Any, List, Callable, Optional, Tuple
 
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import JsonOutputParser
+from google.api_core.exceptions import ResourceExhausted
 
 # Imports internos
-from .prompts import PROMPT_AGENTE_COMPETENCIA, COMPETENCIAS_INFO
-from shared.schemas import AvaliacaoCompetencia
+from .prompts import (
+    TEMPLATE_AGENTE_COMPETENCIA,
+    TEMPLATE_AGENTE_COMPLETO,
+    COMPETENCIAS_INFO,
+    VERSAO_PROMPT_COMPLETO,
+)
+from .limiter import estimar_tokens
+from .cache import cache_avaliacoes, chave_avaliacao
+from .roteador import RotaLLM, obter_rota
+from .telemetria import AVALIACOES, AVALIACAO_DURACAO
+from .pool import CRITERIOS_TODAS_COMPETENCIAS, instrucoes_formato
+from shared.schemas import AvaliacaoCompetencia, AvaliacaoCompleta
 
 # Configuração de Logs
 logger = logging.getLogger(__name__)
@@ -19,9 +30,86 @@ MODEL_NAME = "models/gemini-flash-latest"
 TEMP_CORRETOR_PADRAO = 0.2
 TEMP_CORRETOR_RIGOROSO = 0.1
 
+# Orçamento de tokens de saída usado para reservar cota de TPM antes de cada chamada
+TOKENS_SAIDA_COMPETENCIA = 800
+TOKENS_SAIDA_FEEDBACK = 300
+
+# Modos de avaliação: uma chamada por competência ou uma única chamada
+# estruturada com as 5 competências (e um comentário, que sai de graça).
+# O comentário geral para o aluno é gerado sob demanda, depois da correção
+# (ver gerar_feedback_geral).
+MODO_POR_COMPETENCIA = "por_competencia"
+MODO_CHAMADA_UNICA = "chamada_unica"
+
+# Modo de cada corretor, configurável por variável de ambiente
+MODOS_AVALIACAO = {
+    "Corretor 1": os.getenv("MODO_AVALIACAO_CORRETOR_1", MODO_POR_COMPETENCIA),
+    "Corretor 2": os.getenv("MODO_AVALIACAO_CORRETOR_2", MODO_POR_COMPETENCIA),
+    "Corretor Supervisor": os.getenv("MODO_AVALIACAO_SUPERVISOR", MODO_POR_COMPETENCIA),
+}
+
+# Corretor cuja rota (endpoints e temperatura) gera o comentário geral sob demanda
+CORRETOR_FEEDBACK = os.getenv("CORRETOR_FEEDBACK", "Corretor 2")
+
+
+def temperatura_do_corretor(id_corretor: str) -> float:
+    """
+    Definição de temperatura baseada no perfil do corretor.
+    'Corretor 1' tende a ser mais rigoroso/conservador (temperatura menor).
+    """
+    return TEMP_CORRETOR_RIGOROSO if id_corretor == "Corretor 1" else TEMP_CORRETOR_PADRAO
+
+
+def chamadas_llm_previstas(id_corretor: str) -> int:
+    """Chamadas ao LLM de uma correção completa do corretor, no modo configurado."""
+    if MODOS_AVALIACAO.get(id_corretor, MODO_POR_COMPETENCIA) == MODO_CHAMADA_UNICA:
+        return 1
+    return len(COMPETENCIAS_INFO)
+
+
+def rota_do_corretor(id_corretor: str) -> RotaLLM:
+    """Endpoints (chave de API + modelo) que atendem o corretor, na temperatura dele."""
+    return obter_rota(id_corretor, temperatura_do_corretor(id_corretor), MODEL_NAME)
+
+
+def combinacoes_pool() -> List[Tuple[str, float, str]]:
+    """Combinações (modelo, temperatura, api_key) usadas pelos corretores, para aquecer o pool."""
+    combinacoes = set()
+    for id_corretor in MODOS_AVALIACAO:
+        rota = rota_do_corretor(id_corretor)
+        combinacoes.update((e.modelo, rota.temperatura, e.api_key) for e in rota.endpoints)
+    return sorted(combinacoes)
+
+
+def _registrar_avaliacao(recursos: RotaLLM, competencia: Any, origem: str, inicio: float) -> None:
+    """Conta a avaliação (origem: cache, llm ou erro) e mede sua duração, com esperas."""
+    rotulos = (recursos.id_corretor, str(competencia))
+    AVALIACOES.labels(*rotulos, origem).inc()
+    AVALIACAO_DURACAO.labels(*rotulos).observe(time.perf_counter() - inicio)
+
+
+async def _obter_do_cache(
+    recursos: RotaLLM, chaves_por_modelo: Callable[[str], List[str]]
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    Avaliações em cache para as chaves de algum dos modelos da rota (todas do
+    mesmo modelo), ou None. A chave leva o modelo que gerou a avaliação, então
+    uma rota com vários modelos nunca serve a avaliação de um sob a chave do outro.
+    """
+    for modelo in recursos.modelos:
+        avaliacoes = []
+        for chave in chaves_por_modelo(modelo):
+            avaliacao = await cache_avaliacoes.obter(chave)
+            if avaliacao is None:
+                break
+            avaliacoes.append(avaliacao)
+        else:
+            return avaliacoes
+    return None
+
 
 async def avaliar_competencia_individual(
-    llm: ChatGoogleGenerativeAI, 
+    recursos: RotaLLM, 
     texto_redacao: str, 
     tema: str, 
     comp_info: Dict[str, Any]
@@ -30,99 +118,253 @@ async def avaliar_competencia_individual(
     Agente Especialista: Avalia uma única competência do ENEM de forma isolada.
     
     Args:
-        llm: Instância do modelo de linguagem configurada.
+        recursos: Rota do corretor entre os endpoints do LLM (ver agents/roteador.py).
         texto_redacao: O texto da redação a ser corrigida.
         tema: O tema da redação.
         comp_info: Dicionário contendo metadados da competência (número, critérios).
 
     Returns:
         Dict: Dicionário contendo a nota e a justificativa da competência.
+
+    Raises:
+        Exception: Qualquer falha da chamada (inclusive 429) sobe para a tarefa.
     """
-    try:
-        # Configura o parser para garantir que a saída obedeça ao schema Pydantic
-        parser = JsonOutputParser(pydantic_object=AvaliacaoCompetencia)
-        
-        # O uso de with_structured_output força o modelo a retornar JSON estrito
-        llm_estruturado = llm.with_structured_output(AvaliacaoCompetencia)
+    inicio = time.perf_counter()
+
+    # Redações reenviadas (mesmo texto, tema, prompt e modelo) reaproveitam a avaliação
+    def _chave(modelo: str) -> str:
+        return chave_avaliacao(texto_redacao, tema, comp_info["numero"], modelo, recursos.temperatura)
+
+    em_cache = await _obter_do_cache(recursos, lambda modelo: [_chave(modelo)])
+    if em_cache is not None:
+        logger.info(f"Competência {comp_info['numero']} obtida do cache.")
+        _registrar_avaliacao(recursos, comp_info["numero"], "cache", inicio)
+        return em_cache[0]
 
-        chain = PROMPT_AGENTE_COMPETENCIA | llm_estruturado
+    try:
+        # A rota aguarda a cota (RPM e TPM) do endpoint escolhido antes da requisição
+        tokens_entrada = estimar_tokens(
+            TEMPLATE_AGENTE_COMPETENCIA,
+            comp_info["criterios"],
+            comp_info.get("criterios_negativos", ""),
+            texto_redacao,
+            tema,
+        )
 
-        resultado = await chain.ainvoke({
+        resultado, modelo = await recursos.invocar("chain_competencia", {
             "competencia_numero": comp_info["numero"],
             "criterios_competencia": comp_info["criterios"],
             "criterios_negativos": comp_info.get("criterios_negativos", ""), 
             "redacao": texto_redacao,
             "tema": tema,
-            "format_instructions": parser.get_format_instructions(),
-        })
+            "format_instructions": instrucoes_formato(AvaliacaoCompetencia),
+        }, tokens_entrada, TOKENS_SAIDA_COMPETENCIA)
 
-        return resultado.dict()
+        avaliacao = resultado.dict()
+        await cache_avaliacoes.salvar(_chave(modelo), comp_info["numero"], avaliacao)
+        _registrar_avaliacao(recursos, comp_info["numero"], "llm", inicio)
+        return avaliacao
 
     except Exception as e:
-        logger.error(f"Erro ao avaliar competência {comp_info.get('numero')}: {e}")
-        # Em caso de erro, retorna uma estrutura zerada para não quebrar o fluxo
-        return {
-            "competencia": comp_info.get("numero"),
-            "nota": 0,
-            "justificativa": f"Erro sistêmico ao avaliar esta competência: {str(e)}"
-        }
+        # Falha não vira nota zero: sobe para a tarefa, que reagenda (429 em
+        # todos os endpoints) ou marca a redação com ERRO. As competências já
+        # concluídas ficam salvas para a retomada.
+        if not isinstance(e, ResourceExhausted):
+            logger.error(f"Erro ao avaliar competência {comp_info.get('numero')}: {e}")
+            _registrar_avaliacao(recursos, comp_info.get("numero"), "erro", inicio)
+        raise
 
 
-async def _gerar_feedback_geral(
-    llm: ChatGoogleGenerativeAI, 
-    avaliacoes: List[Dict[str, Any]]
-) -> str:
+async def gerar_feedback_geral(avaliacoes: List[Dict[str, Any]]) -> str:
     """
-    Função auxiliar para gerar um parágrafo de feedback consolidado.
+    Gera o parágrafo de comentário geral para o aluno a partir do resultado
+    consolidado da banca (uma chamada, pela rota de CORRETOR_FEEDBACK).
+
+    Chamado sob demanda (tarefa gerar_feedback), fora do caminho crítico da
+    correção. Erros sobem para a tarefa, que não grava um comentário inválido.
     """
+    recursos = rota_do_corretor(CORRETOR_FEEDBACK)
+    inicio = time.perf_counter()
     try:
-        prompt_comentario = ChatPromptTemplate.from_template(
-            "Com base nestas 5 avaliações de competências de uma redação, "
-            "escreva um parágrafo de comentário geral conciso, motivador e útil para o aluno. "
-            "Avaliações: {avaliacoes}"
-        )
-        chain = prompt_comentario | llm
-        
         # Serializa as avaliações para passar como contexto
-        resultado = await chain.ainvoke({"avaliacoes": json.dumps(avaliacoes, ensure_ascii=False)})
+        avaliacoes_json = json.dumps(avaliacoes, ensure_ascii=False)
+
+        resultado, _ = await recursos.invocar(
+            "chain_feedback",
+            {"avaliacoes": avaliacoes_json},
+            estimar_tokens(avaliacoes_json),
+            TOKENS_SAIDA_FEEDBACK,
+        )
+        _registrar_avaliacao(recursos, "feedback", "llm", inicio)
         return resultado.content
     except Exception as e:
-        logger.error(f"Erro ao gerar feedback geral: {e}")
-        return "Não foi possível gerar o comentário geral devido a um erro no processamento."
+        if not isinstance(e, ResourceExhausted):
+            logger.error(f"Erro ao gerar feedback geral: {e}")
+            _registrar_avaliacao(recursos, "feedback", "erro", inicio)
+        raise
+
+
+async def avaliar_todas_competencias(
+    recursos: RotaLLM,
+    texto_redacao: str,
+    tema: str,
+) -> Tuple[List[Dict[str, Any]], str]:
+    """
+    Agente Generalista: Avalia as 5 competências (e escreve um comentário
+    geral) em uma única chamada estruturada.
+
+    Args:
+        recursos: Rota do corretor entre os endpoints do LLM (ver agents/roteador.py).
+        texto_redacao: O texto da redação a ser corrigida.
+        tema: O tema da redação.
+
+    Returns:
+        Tuple: Lista com as 5 avaliações (C1 a C5) e o comentário geral
+        (None quando a avaliação vem do cache).
+
+    Raises:
+        ValueError: Se o modelo omitir alguma competência na resposta.
+    """
+    inicio = time.perf_counter()
+
+    def _chaves(modelo: str) -> Dict[int, str]:
+        return {
+            info["numero"]: chave_avaliacao(
+                texto_redacao,
+                tema,
+                info["numero"],
+                modelo,
+                recursos.temperatura,
+                VERSAO_PROMPT_COMPLETO,
+            )
+            for info in COMPETENCIAS_INFO
+        }
+
+    # Só reaproveita o cache se todas as competências estiverem lá. O comentário
+    # geral não é cacheado: o do aluno é gerado sob demanda, depois da banca.
+    em_cache = await _obter_do_cache(recursos, lambda modelo: list(_chaves(modelo).values()))
+    if em_cache is not None:
+        logger.info("Avaliação completa obtida do cache.")
+        _registrar_avaliacao(recursos, "todas", "cache", inicio)
+        return em_cache, None
+
+    try:
+        tokens_entrada = estimar_tokens(
+            TEMPLATE_AGENTE_COMPLETO, CRITERIOS_TODAS_COMPETENCIAS, texto_redacao, tema
+        )
+
+        resultado, modelo = await recursos.invocar("chain_completa", {
+            "criterios_todas_competencias": CRITERIOS_TODAS_COMPETENCIAS,
+            "redacao": texto_redacao,
+            "tema": tema,
+            "format_instructions": instrucoes_formato(AvaliacaoCompleta),
+        }, tokens_entrada, len(COMPETENCIAS_INFO) * TOKENS_SAIDA_COMPETENCIA + TOKENS_SAIDA_FEEDBACK)
+
+        por_numero = {a.competencia: a.dict() for a in resultado.competencias}
+        chaves = _chaves(modelo)
+        avaliacoes = []
+        for info in COMPETENCIAS_INFO:
+            avaliacao = por_numero.get(info["numero"])
+            if avaliacao is None:
+                raise ValueError(f"O modelo não retornou a avaliação da competência {info['numero']}.")
+            avaliacoes.append(avaliacao)
+            await cache_avaliacoes.salvar(
+                chaves[info["numero"]], info["numero"], avaliacao, VERSAO_PROMPT_COMPLETO
+            )
+
+        _registrar_avaliacao(recursos, "todas", "llm", inicio)
+        return avaliacoes, resultado.comentarios_gerais
+
+    except Exception as e:
+        # Como na avaliação por competência: a falha sobe, sem notas zeradas
+        if not isinstance(e, ResourceExhausted):
+            logger.error(f"Erro ao avaliar as competências em chamada única: {e}")
+            _registrar_avaliacao(recursos, "todas", "erro", inicio)
+        raise
 
 
 async def executar_correcao_completa_async(
     id_corretor: str, 
     texto_redacao: str, 
-    tema: str
+    tema: str,
+    ao_concluir_competencia: Optional[Callable[[str, Dict[str, Any]], Any]] = None,
+    modo: Optional[str] = None,
+    competencias: Optional[List[int]] = None,
+    avaliacoes_prontas: Optional[Dict[int, Dict[str, Any]]] = None,
 ) -> Dict[str, Any]:
     """
     Agente Orquestrador: Gerencia a correção completa da redação.
     
     Responsabilidades:
-    1. Instanciar o modelo com a temperatura adequada.
+    1. Obter a rota do corretor (endpoints do LLM na temperatura adequada).
     2. Paralelizar a avaliação das 5 competências.
-    3. Consolidar as notas e gerar feedback final.
+    3. Consolidar as notas do corretor.
+
+    Se `ao_concluir_competencia` for informado (função ou corrotina), é chamado
+    com (id_corretor, avaliação) assim que cada competência termina.
+    `modo` escolhe entre MODO_POR_COMPETENCIA e MODO_CHAMADA_UNICA; por padrão
+    usa o modo configurado para o corretor em MODOS_AVALIACAO.
+    `competencias` restringe a correção a um subconjunto (ex.: o Supervisor
+    reavaliando só as competências discrepantes); o subconjunto é avaliado
+    competência a competência.
+    `avaliacoes_prontas` ({número: avaliação}) traz competências já concluídas
+    em uma tentativa anterior, que não são avaliadas de novo.
     """
     logger.info(f"[{id_corretor}] Iniciando orquestração de correção...")
 
-    # Definição de temperatura baseada no perfil do corretor
-    # 'Corretor 1' tende a ser mais rigoroso/conservador (temperatura menor)
-    temperatura = TEMP_CORRETOR_RIGOROSO if id_corretor == "Corretor 1" else TEMP_CORRETOR_PADRAO
+    # Chamadas distribuídas entre os endpoints do corretor; clientes e chains
+    # de cada endpoint vêm do pool do processo (criados uma única vez)
+    recursos = rota_do_corretor(id_corretor)
 
-    llm = ChatGoogleGenerativeAI(
-        model=MODEL_NAME, 
-        temperature=temperatura
-    )
+    async def _notificar(avaliacao: Dict[str, Any]) -> None:
+        if ao_concluir_competencia:
+            retorno = ao_concluir_competencia(id_corretor, avaliacao)
+            if inspect.isawaitable(retorno):
+                await retorno
 
-    # Criação das tarefas assíncronas (uma para cada competência)
-    tasks = [
-        avaliar_competencia_individual(llm, texto_redacao, tema, info)
-        for info in COMPETENCIAS_INFO
-    ]
+    modo = modo or MODOS_AVALIACAO.get(id_corretor, MODO_POR_COMPETENCIA)
+    avaliar_todas = competencias is None or set(competencias) >= {
+        info["numero"] for info in COMPETENCIAS_INFO
+    }
+    alvo = [info for info in COMPETENCIAS_INFO if avaliar_todas or info["numero"] in competencias]
+    prontas = {
+        numero: avaliacao
+        for numero, avaliacao in (avaliacoes_prontas or {}).items()
+        if any(info["numero"] == numero for info in alvo)
+    }
+    faltantes = [info for info in alvo if info["numero"] not in prontas]
+    if prontas:
+        logger.info(f"[{id_corretor}] Retomando: {len(prontas)} competência(s) já avaliada(s).")
 
-    # Execução paralela (Scatter-Gather)
-    resultados_competencias = await asyncio.gather(*tasks)
+    # A chamada única só compensa quando nenhuma competência foi avaliada ainda
+    if not avaliar_todas or prontas:
+        modo = MODO_POR_COMPETENCIA
+
+    if modo == MODO_CHAMADA_UNICA:
+        # Uma só requisição com as 5 competências e o comentário geral
+        resultados_competencias, comentario_geral = await avaliar_todas_competencias(
+            recursos, texto_redacao, tema
+        )
+        for avaliacao in resultados_competencias:
+            await _notificar(avaliacao)
+    else:
+        async def _avaliar(info: Dict[str, Any]) -> Dict[str, Any]:
+            avaliacao = await avaliar_competencia_individual(recursos, texto_redacao, tema, info)
+            await _notificar(avaliacao)
+            return avaliacao
+
+        # Criação das tarefas assíncronas (uma para cada competência ainda não avaliada)
+        tasks = [_avaliar(info) for info in faltantes]
+
+        # Execução paralela (Scatter-Gather). Espera todas terminarem antes de
+        # propagar um erro, para que as competências concluídas sejam salvas.
+        novas = await asyncio.gather(*tasks, return_exceptions=True)
+        erros = [r for r in novas if isinstance(r, BaseException)]
+        if erros:
+            raise erros[0]
+        resultados_competencias = list(prontas.values()) + list(novas)
+        # O comentário geral para o aluno não é gerado aqui (ver gerar_feedback_geral)
+        comentario_geral = None
 
     # Ordenação por número da competência para garantir consistência visual (C1 a C5)
     resultados_competencias.sort(key=lambda x: x["competencia"])
@@ -130,9 +372,6 @@ async def executar_correcao_completa_async(
     # Cálculo da nota final
     nota_final_calculada = sum(r["nota"] for r in resultados_competencias if isinstance(r.get("nota"), (int, float)))
 
-    # Geração do comentário geral (aproveita a instância do LLM já criada)
-    comentario_geral = await _gerar_feedback_geral(llm, resultados_competencias)
-
     logger.info(f"[{id_corretor}] Correção finalizada. Nota: {nota_final_calculada}")
 
     # Retorno estruturado
@@ -141,4 +380,5 @@ async def executar_correcao_completa_async(
         "nota_final": nota_final_calculada,
         "comentarios_gerais": comentario_geral,
         "id_corretor": id_corretor,
-    }
\ No newline at end of file
+        "modo_avaliacao": modo,
+    }
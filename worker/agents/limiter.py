@@ -0,0 +1,262 @@
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+try:
+    import redis
+except ImportError:  # pragma: no cover - redis faz parte do requirements.txt
+    redis = None
+
+from shared.disjuntor import DISJUNTOR_FATOR_INICIAL, obter_disjuntor
+
+# Configuração de Logs
+logger = logging.getLogger(__name__)
+
+# Cota de cada chave de API (requisições e tokens por minuto) e tamanho da rajada
+LLM_REQUISICOES_POR_MINUTO = float(os.getenv("LLM_REQUISICOES_POR_MINUTO", "10"))
+LLM_TOKENS_POR_MINUTO = float(os.getenv("LLM_TOKENS_POR_MINUTO", "250000"))
+LLM_RAJADA = int(os.getenv("LLM_RAJADA", "5"))
+
+# Redis compartilhado por todos os workers (por padrão, o mesmo do broker)
+LIMITADOR_REDIS_URL = os.getenv("LIMITADOR_REDIS_URL") or os.getenv("CELERY_BROKER_URL")
+PREFIXO_CHAVE_REDIS = "limitador_llm"
+
+# Aproximação usada para orçar tokens antes da chamada (~4 caracteres por token)
+CARACTERES_POR_TOKEN = 4
+
+# Script atômico dos token buckets de uma chamada. Usa o relógio do próprio
+# Redis para que workers em máquinas diferentes concordem sobre o tempo
+# decorrido. Um balde por chave em KEYS, com ARGV em trios (capacidade, taxa
+# em tokens/s, custo); todos são debitados na mesma execução e o retorno é a
+# maior espera entre eles.
+SCRIPT_TOKEN_BUCKET = """
+local t = redis.call('TIME')
+local agora = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local espera = 0
+for i, chave in ipairs(KEYS) do
+    local capacidade = tonumber(ARGV[3 * i - 2])
+    local taxa = tonumber(ARGV[3 * i - 1])
+    local custo = tonumber(ARGV[3 * i])
+    local estado = redis.call('HMGET', chave, 'tokens', 'ts')
+    local tokens = tonumber(estado[1]) or capacidade
+    local ts = tonumber(estado[2]) or agora
+    tokens = math.min(capacidade, tokens + math.max(0, agora - ts) * taxa) - custo
+    redis.call('HSET', chave, 'tokens', tokens, 'ts', agora)
+    redis.call('EXPIRE', chave, math.ceil(capacidade / taxa) + 60)
+    if tokens < 0 then
+        espera = math.max(espera, -tokens / taxa)
+    end
+end
+return tostring(espera)
+"""
+
+
+def extrair_espera_sugerida(erro: Exception) -> Optional[float]:
+    """Segundos sugeridos pela API em mensagens de 429 ("Please retry in Ns"), se houver."""
+    encontrado = re.search(r"Please retry in (\d+\.?\d*)", str(erro))
+    return float(encontrado.group(1)) if encontrado else None
+
+
+def estimar_tokens(*textos: str) -> int:
+    """Estimativa barata do número de tokens de um conjunto de textos."""
+    return sum(len(t or "") for t in textos) // CARACTERES_POR_TOKEN + 1
+
+
+class BaldeMemoria:
+    """
+    Token bucket local ao processo. Usado como fallback quando o Redis não
+    está disponível.
+
+    Cada reserva desconta `custo` tokens; quando o balde esvazia, o saldo fica
+    negativo e quem reservou espera apenas o tempo de reposição.
+    """
+
+    def __init__(self, capacidade: float, taxa_por_segundo: float):
+        self.capacidade = float(max(capacidade, 1))
+        self.taxa_por_segundo = taxa_por_segundo
+        self._tokens = self.capacidade
+        self._ultima_reposicao = time.monotonic()
+        # A seção crítica é síncrona (sem await), então uma trava de thread
+        # basta e não amarra o balde a um event loop específico.
+        self._trava = threading.Lock()
+
+    def reservar(self, custo: float = 1.0) -> float:
+        """Reserva `custo` tokens e retorna quantos segundos esperar antes de usá-los."""
+        with self._trava:
+            agora = time.monotonic()
+            decorrido = agora - self._ultima_reposicao
+            self._tokens = min(self.capacidade, self._tokens + decorrido * self.taxa_por_segundo)
+            self._ultima_reposicao = agora
+            self._tokens -= custo
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.taxa_por_segundo
+
+
+class BaldesRedis:
+    """
+    Token buckets compartilhados entre processos e máquinas, armazenados no
+    Redis. Os baldes de uma reserva (RPM e TPM) são debitados juntos, em uma
+    única execução atômica do script: ou todos são cobrados, ou nenhum.
+    """
+
+    def __init__(self, cliente, baldes: Dict[str, Tuple[str, float, float]]):
+        """`baldes`: {nome: (chave no Redis, capacidade, taxa em tokens/s)}."""
+        self.cliente = cliente
+        self.baldes = {
+            nome: (chave, float(max(capacidade, 1)), taxa_por_segundo)
+            for nome, (chave, capacidade, taxa_por_segundo) in baldes.items()
+        }
+        self._script = cliente.register_script(SCRIPT_TOKEN_BUCKET)
+
+    def reservar(self, custos: Dict[str, float]) -> float:
+        """Reserva `custos` ({nome: tokens}) e retorna a maior espera entre os baldes."""
+        chaves, argumentos = [], []
+        for nome, custo in custos.items():
+            chave, capacidade, taxa_por_segundo = self.baldes[nome]
+            chaves.append(chave)
+            argumentos.extend((capacidade, taxa_por_segundo, custo))
+        return float(self._script(keys=chaves, args=argumentos))
+
+
+class LimitadorLLM:
+    """
+    Limitador de uma chave de API: orça requisições por minuto (RPM) e tokens
+    por minuto (TPM) ao mesmo tempo.
+
+    Usa baldes no Redis para que todas as réplicas do worker dividam a mesma
+    cota; se o Redis falhar, cai para baldes em memória sem interromper a correção.
+    """
+
+    def __init__(
+        self,
+        identificador: str,
+        requisicoes_por_minuto: float = LLM_REQUISICOES_POR_MINUTO,
+        tokens_por_minuto: float = LLM_TOKENS_POR_MINUTO,
+        rajada: int = LLM_RAJADA,
+        cliente_redis=None,
+    ):
+        self.identificador = identificador
+        taxa_rpm = requisicoes_por_minuto / 60.0
+        taxa_tpm = tokens_por_minuto / 60.0
+
+        self._locais = {
+            "rpm": BaldeMemoria(rajada, taxa_rpm),
+            "tpm": BaldeMemoria(tokens_por_minuto, taxa_tpm),
+        }
+        self._cliente_redis = cliente_redis
+        self._chave_indisponivel = f"{PREFIXO_CHAVE_REDIS}:{identificador}:indisponivel"
+        self._indisponivel_ate_local = 0.0
+        self._compartilhados = None
+        if cliente_redis is not None:
+            prefixo = f"{PREFIXO_CHAVE_REDIS}:{identificador}"
+            self._compartilhados = BaldesRedis(
+                cliente_redis,
+                {
+                    "rpm": (f"{prefixo}:rpm", rajada, taxa_rpm),
+                    "tpm": (f"{prefixo}:tpm", tokens_por_minuto, taxa_tpm),
+                },
+            )
+
+    def _reservar(self, custos: Dict[str, float]) -> float:
+        # A reserva no Redis é atômica: se ela falha, nenhum balde compartilhado
+        # foi debitado e a chamada é cobrada só nos baldes locais
+        if self._compartilhados is not None:
+            try:
+                return self._compartilhados.reservar(custos)
+            except Exception as e:
+                logger.warning(f"Limitador no Redis indisponível ({e}); usando cota local.")
+        return max(self._locais[nome].reservar(custo) for nome, custo in custos.items())
+
+    def _reservar_chamada(self, tokens_estimados: int) -> float:
+        # Na retomada do disjuntor cada chamada custa 1/fator: a vazão efetiva
+        # sobe aos poucos até a cota cheia
+        fator = max(obter_disjuntor().fator_taxa(), DISJUNTOR_FATOR_INICIAL)
+        return self._reservar({"rpm": 1.0 / fator, "tpm": float(tokens_estimados) / fator})
+
+    async def adquirir(self, tokens_estimados: int = 0) -> None:
+        """Aguarda (sem bloquear o event loop) até haver cota de RPM e TPM para uma chamada."""
+        espera = await asyncio.to_thread(self._reservar_chamada, tokens_estimados)
+        if espera > 0:
+            logger.info(f"Limitador de taxa: aguardando {espera:.1f}s pela cota do LLM.")
+            await asyncio.sleep(espera)
+
+    async def espera_estimada(self) -> float:
+        """Quanto a próxima chamada esperaria nesta chave, sem reservar cota."""
+        return await asyncio.to_thread(self._reservar, {"rpm": 0.0, "tpm": 0.0})
+
+    def marcar_indisponivel(self, segundos: float) -> None:
+        """Tira a chave de rotação por `segundos` em todos os workers (ex.: após um 429)."""
+        self._indisponivel_ate_local = time.monotonic() + segundos
+        if self._cliente_redis is not None:
+            try:
+                self._cliente_redis.set(
+                    self._chave_indisponivel, "1", px=max(1, int(segundos * 1000))
+                )
+            except Exception as e:
+                logger.warning(f"Falha ao registrar indisponibilidade no Redis: {e}")
+
+    def segundos_indisponivel(self) -> float:
+        """Tempo restante fora de rotação (0 = disponível)."""
+        restante_local = max(0.0, self._indisponivel_ate_local - time.monotonic())
+        if self._cliente_redis is not None:
+            try:
+                pttl = self._cliente_redis.pttl(self._chave_indisponivel)
+                return max(restante_local, pttl / 1000.0 if pttl and pttl > 0 else 0.0)
+            except Exception:
+                pass
+        return restante_local
+
+
+_cliente_redis = None
+_limitadores: Dict[str, LimitadorLLM] = {}
+_trava_registro = threading.Lock()
+
+
+def _obter_cliente_redis():
+    global _cliente_redis
+    if _cliente_redis is None and redis is not None and LIMITADOR_REDIS_URL:
+        _cliente_redis = redis.Redis.from_url(
+            LIMITADOR_REDIS_URL, socket_timeout=2, socket_connect_timeout=2
+        )
+    return _cliente_redis
+
+
+def identificar_chave(api_key: str) -> str:
+    """Identificador estável de uma chave de API, sem expor a chave."""
+    return hashlib.sha256(api_key.encode()).hexdigest()[:16]
+
+
+def obter_limitador(
+    api_key: Optional[str] = None,
+    requisicoes_por_minuto: Optional[float] = None,
+    tokens_por_minuto: Optional[float] = None,
+    modelo: Optional[str] = None,
+) -> LimitadorLLM:
+    """
+    Retorna o limitador do endpoint (chave de API, modelo) informado (padrão:
+    GOOGLE_API_KEY). A cota do LLM é por modelo em cada chave, então cada par
+    tem baldes e estado de saúde próprios: um 429 em um modelo não tira o
+    outro de rotação.
+
+    A chave nunca vai para o Redis em texto puro; o bucket é identificado por
+    um prefixo do seu hash. Cotas não informadas usam os padrões do ambiente.
+    """
+    api_key = api_key if api_key is not None else os.getenv("GOOGLE_API_KEY", "")
+    identificador = identificar_chave(api_key)
+    if modelo:
+        identificador = f"{identificador}:{modelo}"
+    with _trava_registro:
+        if identificador not in _limitadores:
+            _limitadores[identificador] = LimitadorLLM(
+                identificador,
+                requisicoes_por_minuto=requisicoes_por_minuto or LLM_REQUISICOES_POR_MINUTO,
+                tokens_por_minuto=tokens_por_minuto or LLM_TOKENS_POR_MINUTO,
+                cliente_redis=_obter_cliente_redis(),
+            )
+        return _limitadores[identificador]
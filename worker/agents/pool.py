@@ -0,0 +1,128 @@
+import logging
+import os
+import threading
+from functools import lru_cache
+from typing import Dict, Optional, Tuple, Type
+
+from pydantic import BaseModel
+
+from .prompts import (
+    TEMPLATE_AGENTE_COMPETENCIA,
+    TEMPLATE_AGENTE_COMPLETO,
+    TEMPLATE_FEEDBACK_GERAL,
+    montar_criterios_todas_competencias,
+)
+from .limiter import identificar_chave
+from .provedores import ProvedorLLM, obter_provedor
+from shared.schemas import AvaliacaoCompetencia, AvaliacaoCompleta
+
+# Configuração de Logs
+logger = logging.getLogger(__name__)
+
+# Partes estáticas dos prompts, geradas uma única vez por processo. As que
+# dependem do langchain (caro de importar) só são montadas no primeiro uso,
+# para o worker e o beat subirem sem carregá-lo.
+CRITERIOS_TODAS_COMPETENCIAS = montar_criterios_todas_competencias()
+
+
+@lru_cache(maxsize=None)
+def instrucoes_formato(schema: Type[BaseModel]) -> str:
+    """Instruções de formato JSON do schema, inseridas nos prompts de avaliação."""
+    from langchain_core.output_parsers import JsonOutputParser
+
+    return JsonOutputParser(pydantic_object=schema).get_format_instructions()
+
+
+@lru_cache(maxsize=None)
+def _prompts():
+    from langchain_core.prompts import ChatPromptTemplate
+
+    return (
+        ChatPromptTemplate.from_template(TEMPLATE_AGENTE_COMPETENCIA),
+        ChatPromptTemplate.from_template(TEMPLATE_AGENTE_COMPLETO),
+        ChatPromptTemplate.from_template(TEMPLATE_FEEDBACK_GERAL),
+    )
+
+
+class RecursosModelo:
+    """
+    Cliente do LLM e chains já montadas para um par (modelo, temperatura) em
+    uma chave de API, criados pelo provedor configurado (ver agents/provedores.py).
+
+    Criado uma vez por processo e reutilizado por todas as correções, o que
+    mantém a conexão com a API aberta e tira do caminho crítico a construção
+    do cliente, do parser e das chains estruturadas.
+    """
+
+    def __init__(
+        self,
+        modelo: str,
+        temperatura: float,
+        provedor: ProvedorLLM,
+        api_key: Optional[str] = None,
+    ):
+        self.modelo = modelo
+        self.temperatura = temperatura
+        self.provedor = provedor
+        self.cliente = provedor.criar_cliente(modelo, temperatura, api_key)
+        prompt_competencia, prompt_completo, prompt_feedback = _prompts()
+        self.chain_competencia = prompt_competencia | provedor.saida_estruturada(
+            self.cliente, AvaliacaoCompetencia
+        )
+        self.chain_completa = prompt_completo | provedor.saida_estruturada(
+            self.cliente, AvaliacaoCompleta
+        )
+        self.chain_feedback = prompt_feedback | provedor.saida_texto(self.cliente)
+
+
+_pool: Dict[Tuple[str, float, str], RecursosModelo] = {}
+_pid_pool = os.getpid()
+_trava = threading.Lock()
+
+
+def recursos_prontos(
+    modelo: str, temperatura: float, api_key: Optional[str] = None
+) -> Optional[RecursosModelo]:
+    """Recursos já criados neste processo para a combinação, ou None (não cria nem trava)."""
+    if _pid_pool != os.getpid():
+        return None
+    return _pool.get((modelo, temperatura, identificar_chave(api_key or "")))
+
+
+def obter_recursos(
+    modelo: str, temperatura: float, api_key: Optional[str] = None
+) -> RecursosModelo:
+    """
+    Retorna (criando na primeira vez) os recursos do par (modelo, temperatura)
+    na chave de API informada (padrão: GOOGLE_API_KEY).
+
+    A criação (cliente, chains e, na primeira vez, a importação do langchain)
+    acontece fora da trava, para não segurar quem só busca recursos prontos;
+    se duas threads criarem a mesma combinação, fica a primeira gravada.
+    """
+    global _pid_pool
+    chave = (modelo, temperatura, identificar_chave(api_key or ""))
+    with _trava:
+        # Clientes de rede não sobrevivem a um fork: o processo filho recria o pool
+        if _pid_pool != os.getpid():
+            _pool.clear()
+            _pid_pool = os.getpid()
+        recursos = _pool.get(chave)
+    if recursos is not None:
+        return recursos
+
+    novos = RecursosModelo(modelo, temperatura, obter_provedor(), api_key)
+    with _trava:
+        return _pool.setdefault(chave, novos)
+
+
+def aquecer_pool(combinacoes) -> None:
+    """
+    Cria antecipadamente os recursos das combinações informadas:
+    (modelo, temperatura) ou (modelo, temperatura, api_key).
+    """
+    instrucoes_formato(AvaliacaoCompetencia)
+    instrucoes_formato(AvaliacaoCompleta)
+    for combinacao in combinacoes:
+        obter_recursos(*combinacao)
+    logger.info(f"Pool de modelos pronto: {sorted(_pool)}")
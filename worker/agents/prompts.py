@@ -1,8 +1,12 @@
+import hashlib
+import json
 from typing import List, Dict, Any
-from langchain_core.prompts import ChatPromptTemplate
+
+# Os prompts ficam como texto puro: os ChatPromptTemplate são montados junto
+# com o pool de modelos (agents/pool.py), fora do caminho de importação.
 
 # 1. Prompt com Persona Rigorosa e Ordem de Pensamento
-PROMPT_AGENTE_COMPETENCIA = ChatPromptTemplate.from_template(
+TEMPLATE_AGENTE_COMPETENCIA = (
     """Você é um corretor SÊNIOR da BANCA OFICIAL DO ENEM (INEP), conhecido por ser EXTREMAMENTE RIGOROSO, técnico e imparcial.
 Sua função NÃO é elogiar o aluno, mas sim auditar o texto em busca de falhas, lacunas e desvios conforme a Grade Oficial.
 
@@ -118,4 +122,67 @@ COMPETENCIAS_INFO: List[Dict[str, Any]] = [
         - 0 pontos: Ausência de proposta de intervenção.
         """.strip(),
     },
-]
\ No newline at end of file
+]
+
+
+# 3. Prompt do modo "chamada única": avalia as 5 competências (e o comentário
+# geral) em uma só requisição, trocando um pouco de qualidade por ~6x menos chamadas.
+TEMPLATE_AGENTE_COMPLETO = (
+    """Você é um corretor SÊNIOR da BANCA OFICIAL DO ENEM (INEP), conhecido por ser EXTREMAMENTE RIGOROSO, técnico e imparcial.
+Sua função NÃO é elogiar o aluno, mas sim auditar o texto em busca de falhas, lacunas e desvios conforme a Grade Oficial.
+
+Você deve avaliar TODAS as 5 competências, cada uma de forma independente das demais.
+
+{criterios_todas_competencias}
+
+=== REDAÇÃO DO ALUNO ===
+{redacao}
+=======================
+
+Tema: {tema}
+
+=== INSTRUÇÕES DE RACIOCÍNIO ===
+1. Para cada competência, primeiro procure evidências de falhas descritas nos "Anti-Critérios".
+2. Se encontrar falhas graves, a nota daquela competência cai para o nível correspondente imediatamente.
+3. Texto "bonito" ou "bem formatado" NÃO garante nota 200. O conteúdo precisa ser profundo.
+
+=== INSTRUÇÕES DE SAÍDA ===
+Retorne sua análise estritamente no formato JSON.
+O campo "competencias" deve ter exatamente 5 itens (competências 1 a 5), cada um com "analise_critica" (string) apontando os erros ANTES da "nota" (int).
+O campo "comentarios_gerais" deve trazer um parágrafo conciso, motivador e útil para o aluno.
+{format_instructions}
+"""
+)
+
+
+# Prompt do comentário geral a partir das avaliações das competências
+TEMPLATE_FEEDBACK_GERAL = (
+    "Com base nestas 5 avaliações de competências de uma redação, "
+    "escreva um parágrafo de comentário geral conciso, motivador e útil para o aluno. "
+    "Avaliações: {avaliacoes}"
+)
+
+
+def montar_criterios_todas_competencias() -> str:
+    """Concatena anti-critérios e critérios das 5 competências para o prompt de chamada única."""
+    blocos = []
+    for info in COMPETENCIAS_INFO:
+        blocos.append(
+            f"=== COMPETÊNCIA {info['numero']} ===\n"
+            f"ANTI-CRITÉRIOS (verifique ativamente):\n{info['criterios_negativos']}\n"
+            f"CRITÉRIOS DE PONTUAÇÃO:\n{info['criterios']}"
+        )
+    return "\n\n".join(blocos)
+
+
+def _versao(*partes: str) -> str:
+    return hashlib.sha256("".join(partes).encode("utf-8")).hexdigest()[:16]
+
+
+_CRITERIOS_JSON = json.dumps(COMPETENCIAS_INFO, ensure_ascii=False, sort_keys=True)
+
+# 4. Versões dos prompts: mudam automaticamente quando o template ou os critérios
+# são alterados, invalidando as entradas antigas do cache de avaliações.
+VERSAO_PROMPT: str = _versao(TEMPLATE_AGENTE_COMPETENCIA, _CRITERIOS_JSON)
+VERSAO_PROMPT_COMPLETO: str = _versao(TEMPLATE_AGENTE_COMPLETO, _CRITERIOS_JSON)
+VERSOES_PROMPT_ATUAIS = (VERSAO_PROMPT, VERSAO_PROMPT_COMPLETO)
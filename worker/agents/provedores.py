@@ -0,0 +1,254 @@
+import asyncio
+import logging
+import math
+import os
+import random
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import TYPE_CHECKING, Any, Dict, Optional, Type
+
+from google.api_core.exceptions import ResourceExhausted
+from pydantic import BaseModel
+
+from shared.conteudo import hash_conteudo
+from shared.schemas import AvaliacaoCompetencia, AvaliacaoCompleta
+from .limiter import estimar_tokens
+
+# langchain só é importado quando o primeiro cliente é criado (ver agents/pool.py)
+if TYPE_CHECKING:
+    from langchain_core.runnables import Runnable
+
+# Configuração de Logs
+logger = logging.getLogger(__name__)
+
+# Backend usado pelos agentes: "gemini" (padrão) ou "falso" (local, sem cota)
+LLM_PROVEDOR = os.getenv("LLM_PROVEDOR", "gemini")
+
+
+class ProvedorLLM(ABC):
+    """
+    Interface dos backends de LLM usados pelos agentes.
+
+    Um provedor cria um cliente por (modelo, temperatura, chave de API) e, a partir dele, os
+    Runnables que entram nas chains: um com saída estruturada e outro com saída
+    em texto (retorna um AIMessage). A saída estruturada segue o formato do
+    `with_structured_output(include_raw=True)` do langchain, um dict com
+    "parsed" (instância do schema Pydantic), "raw" (o AIMessage, com o
+    usage_metadata da chamada) e "parsing_error".
+    """
+
+    nome = "base"
+
+    @abstractmethod
+    def criar_cliente(self, modelo: str, temperatura: float, api_key: Optional[str] = None) -> Any:
+        ...
+
+    @abstractmethod
+    def saida_estruturada(self, cliente: Any, schema: Type[BaseModel]) -> "Runnable":
+        ...
+
+    @abstractmethod
+    def saida_texto(self, cliente: Any) -> "Runnable":
+        ...
+
+
+class ProvedorGemini(ProvedorLLM):
+    """Google Gemini via langchain_google_genai (padrão: GOOGLE_API_KEY do ambiente)."""
+
+    nome = "gemini"
+
+    def criar_cliente(self, modelo: str, temperatura: float, api_key: Optional[str] = None) -> Any:
+        from langchain_google_genai import ChatGoogleGenerativeAI
+
+        if api_key:
+            return ChatGoogleGenerativeAI(
+                model=modelo, temperature=temperatura, google_api_key=api_key
+            )
+        return ChatGoogleGenerativeAI(model=modelo, temperature=temperatura)
+
+    def saida_estruturada(self, cliente: Any, schema: Type[BaseModel]) -> "Runnable":
+        # with_structured_output força o modelo a retornar JSON estrito; include_raw
+        # mantém a mensagem original, que traz a contagem de tokens
+        return cliente.with_structured_output(schema, include_raw=True)
+
+    def saida_texto(self, cliente: Any) -> "Runnable":
+        return cliente
+
+
+def _ler_distribuicao(especificacao: str):
+    """
+    Interpreta a distribuição de latência do backend falso, em segundos:
+    "fixa:1.5", "uniforme:0.5,3" ou "lognormal:1.2,0.5" (mediana, sigma).
+    """
+    tipo, _, parametros = especificacao.partition(":")
+    valores = [float(v) for v in parametros.split(",") if v]
+    if tipo == "fixa":
+        return lambda rng: valores[0]
+    if tipo == "uniforme":
+        return lambda rng: rng.uniform(valores[0], valores[1])
+    if tipo == "lognormal":
+        return lambda rng: rng.lognormvariate(math.log(valores[0]), valores[1])
+    raise ValueError(f"Distribuição de latência desconhecida: {especificacao}")
+
+
+class ProvedorFalso(ProvedorLLM):
+    """
+    Backend local e determinístico para medir a vazão do pipeline sem gastar cota.
+
+    Configuração por variáveis de ambiente:
+        FAKE_LLM_LATENCIA: distribuição da latência (ver `_ler_distribuicao`).
+        FAKE_LLM_TOKENS_SAIDA: tokens de saída informados por chamada.
+        FAKE_LLM_TAXA_429: probabilidade de responder com ResourceExhausted.
+        FAKE_LLM_ESPERA_429: segundos anunciados em "Please retry in Ns".
+        FAKE_LLM_RPM: cota simulada de requisições por minuto (0 = sem cota).
+        FAKE_LLM_SEMENTE: semente das notas (mesma entrada + semente = mesma nota).
+    """
+
+    nome = "falso"
+    NOTAS = (0, 40, 80, 120, 160, 200)
+    PESOS_NOTAS = (1, 2, 6, 14, 12, 5)
+    CHAVE_CONTADOR = "fake_llm:chamadas"
+
+    def __init__(self):
+        self.latencia = _ler_distribuicao(os.getenv("FAKE_LLM_LATENCIA", "lognormal:1.5,0.4"))
+        self.tokens_saida = int(os.getenv("FAKE_LLM_TOKENS_SAIDA", "400"))
+        self.taxa_429 = float(os.getenv("FAKE_LLM_TAXA_429", "0"))
+        self.espera_429 = float(os.getenv("FAKE_LLM_ESPERA_429", "5"))
+        self.rpm = int(os.getenv("FAKE_LLM_RPM", "0"))
+        self.semente = os.getenv("FAKE_LLM_SEMENTE", "0")
+        self._rng = random.Random(self.semente)
+        self._chamadas_recentes = deque()
+        self._trava = threading.Lock()
+        self._redis = self._conectar_contador()
+
+    @staticmethod
+    def _conectar_contador():
+        url = os.getenv("LIMITADOR_REDIS_URL") or os.getenv("CELERY_BROKER_URL")
+        if not url:
+            return None
+        try:
+            import redis
+
+            return redis.Redis.from_url(url, socket_timeout=1, socket_connect_timeout=1)
+        except Exception:
+            return None
+
+    def _contar_chamada(self) -> None:
+        """Conta a chamada no Redis, para o benchmark medir chamadas por redação."""
+        if self._redis is not None:
+            try:
+                self._redis.incr(self.CHAVE_CONTADOR)
+            except Exception:
+                pass
+
+    def _talvez_falhar(self) -> None:
+        with self._trava:
+            agora = time.monotonic()
+            if self.rpm:
+                while self._chamadas_recentes and agora - self._chamadas_recentes[0] > 60:
+                    self._chamadas_recentes.popleft()
+                if len(self._chamadas_recentes) >= self.rpm:
+                    espera = 60 - (agora - self._chamadas_recentes[0])
+                    raise ResourceExhausted(f"429 Quota exceeded (simulada). Please retry in {espera:.1f}s.")
+                self._chamadas_recentes.append(agora)
+            if self.taxa_429 and self._rng.random() < self.taxa_429:
+                raise ResourceExhausted(
+                    f"429 Resource has been exhausted (simulado). Please retry in {self.espera_429:.0f}s."
+                )
+
+    async def _simular_chamada(self) -> None:
+        self._contar_chamada()
+        await asyncio.sleep(max(0.0, self.latencia(self._rng)))
+        self._talvez_falhar()
+
+    def _nota(self, texto_prompt: str, temperatura: float, competencia: int) -> int:
+        rng = random.Random(hash_conteudo(self.semente, texto_prompt, temperatura, competencia))
+        return rng.choices(self.NOTAS, weights=self.PESOS_NOTAS)[0]
+
+    def _avaliacao(self, texto_prompt: str, temperatura: float, competencia: int) -> Dict[str, Any]:
+        nota = self._nota(texto_prompt, temperatura, competencia)
+        return {
+            "competencia": competencia,
+            "analise_critica": f"Análise simulada da competência {competencia}.",
+            "nota": nota,
+            "justificativa": f"Nota {nota} atribuída pelo backend falso.",
+        }
+
+    def _mensagem(self, texto_prompt: str, conteudo: str):
+        """AIMessage com o uso de tokens: entrada estimada do prompt, saída de FAKE_LLM_TOKENS_SAIDA."""
+        from langchain_core.messages import AIMessage
+
+        tokens_entrada = estimar_tokens(texto_prompt)
+        return AIMessage(
+            content=conteudo,
+            usage_metadata={
+                "input_tokens": tokens_entrada,
+                "output_tokens": self.tokens_saida,
+                "total_tokens": tokens_entrada + self.tokens_saida,
+            },
+        )
+
+    def criar_cliente(self, modelo: str, temperatura: float, api_key: Optional[str] = None) -> Any:
+        return {"modelo": modelo, "temperatura": temperatura}
+
+    def saida_estruturada(self, cliente: Any, schema: Type[BaseModel]) -> "Runnable":
+        from langchain_core.runnables import RunnableLambda
+
+        temperatura = cliente["temperatura"]
+
+        async def _responder(entrada) -> Dict[str, Any]:
+            texto_prompt = entrada.to_string()
+            await self._simular_chamada()
+            if schema is AvaliacaoCompleta:
+                avaliacao = AvaliacaoCompleta(
+                    competencias=[
+                        AvaliacaoCompetencia(**self._avaliacao(texto_prompt, temperatura, n))
+                        for n in range(1, 6)
+                    ],
+                    comentarios_gerais="Comentário geral simulado.",
+                )
+            else:
+                encontrada = re.search(r"Compet[êe]ncia (\d)", texto_prompt)
+                competencia = int(encontrada.group(1)) if encontrada else 1
+                avaliacao = schema(**self._avaliacao(texto_prompt, temperatura, competencia))
+            return {
+                "raw": self._mensagem(texto_prompt, avaliacao.json()),
+                "parsed": avaliacao,
+                "parsing_error": None,
+            }
+
+        return RunnableLambda(_responder)
+
+    def saida_texto(self, cliente: Any) -> "Runnable":
+        from langchain_core.runnables import RunnableLambda
+
+        async def _responder(entrada):
+            texto_prompt = entrada.to_string()
+            await self._simular_chamada()
+            return self._mensagem(texto_prompt, "Comentário geral simulado pelo backend falso.")
+
+        return RunnableLambda(_responder)
+
+
+PROVEDORES = {
+    ProvedorGemini.nome: ProvedorGemini,
+    ProvedorFalso.nome: ProvedorFalso,
+}
+
+_provedor = None
+
+
+def obter_provedor() -> ProvedorLLM:
+    """Provedor configurado em LLM_PROVEDOR (instância única por processo)."""
+    global _provedor
+    if _provedor is None:
+        if LLM_PROVEDOR not in PROVEDORES:
+            raise ValueError(
+                f"LLM_PROVEDOR inválido: {LLM_PROVEDOR!r} (opções: {', '.join(PROVEDORES)})"
+            )
+        _provedor = PROVEDORES[LLM_PROVEDOR]()
+        logger.info(f"Provedor de LLM: {_provedor.nome}")
+    return _provedor
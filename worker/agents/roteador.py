@@ -0,0 +1,255 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from google.api_core.exceptions import ResourceExhausted
+
+from .limiter import (
+    LLM_REQUISICOES_POR_MINUTO,
+    LimitadorLLM,
+    extrair_espera_sugerida,
+    obter_limitador,
+)
+from .pool import RecursosModelo, obter_recursos, recursos_prontos
+from .telemetria import registrar_chamada_llm, registrar_espera_cota, registrar_falha_llm
+
+# Configuração de Logs
+logger = logging.getLogger(__name__)
+
+# Endpoints (chave de API + modelo) disponíveis para os corretores. Lista JSON:
+#   [{"nome": "principal", "api_key_env": "GOOGLE_API_KEY", "modelo": "models/gemini-flash-latest",
+#     "rpm": 10, "tpm": 250000, "corretores": ["Corretor 1", "Corretor 2", "Corretor Supervisor"]}]
+# Só "api_key_env" é obrigatório; sem "corretores", o endpoint atende todos.
+# Sem LLM_ENDPOINTS, usa um único endpoint com GOOGLE_API_KEY e o modelo padrão.
+LLM_ENDPOINTS = os.getenv("LLM_ENDPOINTS")
+
+# Tempo fora de rotação após um 429 quando a API não sugere uma espera
+ROTEADOR_ESPERA_PADRAO_429 = float(os.getenv("ROTEADOR_ESPERA_PADRAO_429", "60"))
+# Espera máxima, somada ao longo de uma chamada, por um endpoint voltar à
+# rotação; acima disso a chamada desiste e o 429 sobe para a tarefa (que abre
+# o disjuntor e é reagendada pelo Celery)
+ROTEADOR_ESPERA_MAXIMA = float(os.getenv("ROTEADOR_ESPERA_MAXIMA", "30"))
+# 429s aceitos em uma chamada antes de desistir, mesmo que cada um sugira
+# uma espera curta
+ROTEADOR_MAX_TENTATIVAS = int(os.getenv("ROTEADOR_MAX_TENTATIVAS", "5"))
+
+
+class EndpointLLM:
+    """
+    Uma chave de API com um modelo: tem cota própria (limitador) e estado de
+    saúde próprio (fora de rotação após um 429, compartilhado entre workers).
+    """
+
+    def __init__(
+        self,
+        nome: str,
+        api_key: str,
+        modelo: str,
+        corretores: Optional[List[str]] = None,
+        requisicoes_por_minuto: Optional[float] = None,
+        tokens_por_minuto: Optional[float] = None,
+    ):
+        self.nome = nome
+        self.api_key = api_key
+        self.modelo = modelo
+        self.corretores = set(corretores) if corretores else None
+        self.limitador: LimitadorLLM = obter_limitador(
+            api_key, requisicoes_por_minuto, tokens_por_minuto, modelo
+        )
+
+    def atende(self, id_corretor: str) -> bool:
+        return self.corretores is None or id_corretor in self.corretores
+
+    def recursos(self, temperatura: float) -> RecursosModelo:
+        return obter_recursos(self.modelo, temperatura, self.api_key)
+
+    async def recursos_sem_bloquear(self, temperatura: float) -> RecursosModelo:
+        """
+        Recursos do pool para uso no event loop: se ainda não existirem, são
+        criados em uma thread, sem parar as demais correções do loop.
+        """
+        recursos = recursos_prontos(self.modelo, temperatura, self.api_key)
+        if recursos is None:
+            recursos = await asyncio.to_thread(self.recursos, temperatura)
+        return recursos
+
+    def __repr__(self) -> str:
+        return f"EndpointLLM({self.nome!r}, {self.modelo!r})"
+
+
+def carregar_endpoints(modelo_padrao: str) -> List[EndpointLLM]:
+    """Lê LLM_ENDPOINTS (ou monta o endpoint padrão a partir de GOOGLE_API_KEY)."""
+    if not LLM_ENDPOINTS:
+        return [EndpointLLM("padrao", os.getenv("GOOGLE_API_KEY", ""), modelo_padrao)]
+
+    endpoints = []
+    for posicao, item in enumerate(json.loads(LLM_ENDPOINTS)):
+        variavel = item.get("api_key_env", "GOOGLE_API_KEY")
+        api_key = os.getenv(variavel)
+        if not api_key:
+            logger.warning(f"Endpoint ignorado: variável {variavel} não definida.")
+            continue
+        endpoints.append(
+            EndpointLLM(
+                item.get("nome", f"endpoint-{posicao}"),
+                api_key,
+                item.get("modelo", modelo_padrao),
+                item.get("corretores"),
+                item.get("rpm"),
+                item.get("tpm"),
+            )
+        )
+    if not endpoints:
+        raise ValueError("LLM_ENDPOINTS não define nenhum endpoint com chave de API válida.")
+    return endpoints
+
+
+def requisicoes_por_minuto_totais() -> float:
+    """Soma das cotas de RPM de todos os endpoints configurados."""
+    if not LLM_ENDPOINTS:
+        return LLM_REQUISICOES_POR_MINUTO
+    return sum(
+        item.get("rpm") or LLM_REQUISICOES_POR_MINUTO
+        for item in json.loads(LLM_ENDPOINTS)
+        if os.getenv(item.get("api_key_env", "GOOGLE_API_KEY"))
+    )
+
+
+def _desembrulhar(resposta: Any) -> Tuple[Any, Any]:
+    """
+    (resultado, mensagem do modelo) de uma chain: as de saída estruturada
+    devolvem {"raw", "parsed", "parsing_error"} (ver ProvedorLLM); as de texto,
+    o próprio AIMessage.
+    """
+    if isinstance(resposta, dict) and "parsed" in resposta:
+        if resposta.get("parsing_error") is not None:
+            raise resposta["parsing_error"]
+        if resposta["parsed"] is None:
+            raise ValueError("O LLM não retornou a saída estruturada esperada.")
+        return resposta["parsed"], resposta.get("raw")
+    return resposta, resposta
+
+
+class RotaLLM:
+    """
+    Distribui as chamadas de um corretor entre os endpoints que o atendem.
+
+    Cada chamada vai para o endpoint disponível com a menor espera estimada
+    pela cota. Um endpoint que responde 429 sai de rotação pelo tempo sugerido
+    pela API e a chamada é refeita em outro; o ResourceExhausted sobe para a
+    tarefa depois de ROTEADOR_MAX_TENTATIVAS respostas 429 ou quando a espera
+    por um endpoint de volta à rotação passaria de ROTEADOR_ESPERA_MAXIMA.
+    """
+
+    def __init__(self, id_corretor: str, endpoints: List[EndpointLLM], temperatura: float):
+        self.id_corretor = id_corretor
+        self.endpoints = endpoints
+        self.temperatura = temperatura
+        # Modelos da rota: uma avaliação em cache gerada por qualquer um deles
+        # vale para o corretor (a chave do cache leva o modelo que respondeu)
+        self.modelos = sorted({e.modelo for e in endpoints})
+
+    async def _escolher(self) -> Tuple[Optional[EndpointLLM], float]:
+        """Endpoint disponível com menor espera, ou (None, tempo até o próximo voltar)."""
+        indisponivel = await asyncio.gather(
+            *(asyncio.to_thread(e.limitador.segundos_indisponivel) for e in self.endpoints)
+        )
+        candidatos = [e for e, restante in zip(self.endpoints, indisponivel) if restante <= 0]
+        if not candidatos:
+            return None, min(indisponivel)
+        if len(candidatos) == 1:
+            return candidatos[0], 0.0
+        esperas = await asyncio.gather(*(e.limitador.espera_estimada() for e in candidatos))
+        _, melhor = min(zip(esperas, range(len(candidatos))))
+        return candidatos[melhor], 0.0
+
+    async def invocar(
+        self,
+        nome_chain: str,
+        entrada: Dict[str, Any],
+        tokens_entrada: int,
+        tokens_saida: int,
+    ) -> Tuple[Any, str]:
+        """
+        Executa a chain `nome_chain` de RecursosModelo em um endpoint saudável e
+        retorna (resultado, modelo do endpoint que respondeu).
+        `tokens_entrada` e `tokens_saida` (máximo esperado) orçam a cota de TPM.
+        """
+        falhas_cota = 0
+        esperado = 0.0
+        while True:
+            endpoint, espera = await self._escolher()
+            if endpoint is None:
+                if esperado + espera > ROTEADOR_ESPERA_MAXIMA:
+                    raise ResourceExhausted(
+                        f"Todos os endpoints do LLM estão sem cota. Please retry in {espera:.0f}s."
+                    )
+                logger.info(f"Todos os endpoints fora de rotação; aguardando {espera:.1f}s.")
+                await asyncio.sleep(espera)
+                esperado += espera
+                continue
+
+            inicio = time.perf_counter()
+            await endpoint.limitador.adquirir(tokens_entrada + tokens_saida)
+            registrar_espera_cota(self.id_corretor, endpoint.nome, time.perf_counter() - inicio)
+
+            chain = getattr(await endpoint.recursos_sem_bloquear(self.temperatura), nome_chain)
+            inicio = time.perf_counter()
+            try:
+                resultado, mensagem = _desembrulhar(await chain.ainvoke(entrada))
+            except ResourceExhausted as e:
+                registrar_falha_llm(self.id_corretor, endpoint.nome, nome_chain, "cota")
+                segundos = extrair_espera_sugerida(e) or ROTEADOR_ESPERA_PADRAO_429
+                await asyncio.to_thread(endpoint.limitador.marcar_indisponivel, segundos)
+                logger.warning(
+                    f"Endpoint {endpoint.nome} sem cota; fora de rotação por {segundos:.0f}s."
+                )
+                falhas_cota += 1
+                if falhas_cota >= ROTEADOR_MAX_TENTATIVAS:
+                    raise
+                continue
+            except Exception:
+                registrar_falha_llm(self.id_corretor, endpoint.nome, nome_chain, "erro")
+                raise
+
+            registrar_chamada_llm(
+                self.id_corretor,
+                endpoint.nome,
+                nome_chain,
+                time.perf_counter() - inicio,
+                resultado,
+                tokens_entrada,
+                getattr(mensagem, "usage_metadata", None),
+            )
+            return resultado, endpoint.modelo
+
+
+_endpoints: Optional[List[EndpointLLM]] = None
+_rotas: Dict[Tuple[str, float], RotaLLM] = {}
+_trava = threading.Lock()
+
+
+def obter_endpoints(modelo_padrao: str) -> List[EndpointLLM]:
+    global _endpoints
+    with _trava:
+        if _endpoints is None:
+            _endpoints = carregar_endpoints(modelo_padrao)
+            logger.info(f"Endpoints do LLM: {_endpoints}")
+        return _endpoints
+
+
+def obter_rota(id_corretor: str, temperatura: float, modelo_padrao: str) -> RotaLLM:
+    """Rota (endpoints que atendem o corretor) na temperatura informada."""
+    endpoints = obter_endpoints(modelo_padrao)
+    with _trava:
+        chave = (id_corretor, temperatura)
+        if chave not in _rotas:
+            atendem = [e for e in endpoints if e.atende(id_corretor)]
+            if not atendem:
+                raise ValueError(f"Nenhum endpoint do LLM configurado para {id_corretor}.")
+            _rotas[chave] = RotaLLM(id_corretor, atendem, temperatura)
+        return _rotas[chave]
@@ -0,0 +1,178 @@
+import contextvars
+import logging
+import os
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+from prometheus_client import Counter, Histogram, start_http_server
+
+from .limiter import estimar_tokens
+
+# Configuração de Logs
+logger = logging.getLogger(__name__)
+
+# Porta do /metrics do worker. O registro é por processo: funciona com o pool
+# de threads (um processo por worker); com prefork, cada filho teria o seu.
+METRICAS_PORTA = int(os.getenv("METRICAS_PORTA", "9100"))
+
+BUCKETS_LLM = (0.25, 0.5, 1, 2, 4, 8, 15, 30, 60, 120)
+BUCKETS_ETAPA = (0.05, 0.25, 1, 5, 15, 30, 60, 120, 300, 900, 3600)
+
+# Chamadas ao LLM (por endpoint e chain)
+LLM_CHAMADAS = Counter(
+    "llm_chamadas_total",
+    "Chamadas ao LLM por corretor, endpoint, chain e resultado (ok, cota, erro).",
+    ["corretor", "endpoint", "chain", "resultado"],
+)
+LLM_LATENCIA = Histogram(
+    "llm_latencia_segundos",
+    "Duração de cada chamada ao LLM, sem contar a espera pela cota.",
+    ["corretor", "endpoint", "chain"],
+    buckets=BUCKETS_LLM,
+)
+LLM_ESPERA_COTA = Histogram(
+    "llm_espera_cota_segundos",
+    "Tempo parado no limitador de taxa antes de cada chamada.",
+    ["corretor", "endpoint"],
+    buckets=BUCKETS_LLM,
+)
+LLM_TOKENS = Counter(
+    "llm_tokens_total",
+    "Tokens de entrada e saída (do provedor, ou estimados quando ele não informa).",
+    ["corretor", "endpoint", "tipo"],
+)
+
+# Avaliações (por competência e corretor), incluindo as servidas pelo cache
+AVALIACOES = Counter(
+    "correcao_avaliacoes_total",
+    "Avaliações por corretor, competência e origem (cache, llm, erro).",
+    ["corretor", "competencia", "origem"],
+)
+AVALIACAO_DURACAO = Histogram(
+    "correcao_avaliacao_segundos",
+    "Duração de cada avaliação (competência, 'todas' ou 'feedback'), com esperas.",
+    ["corretor", "competencia"],
+    buckets=BUCKETS_LLM,
+)
+
+# Etapas da tarefa correct_essay
+ETAPA_DURACAO = Histogram(
+    "correcao_etapa_segundos",
+    "Duração de cada etapa da correção (fila, triagem, banca, corretores, gravação, total).",
+    ["etapa"],
+    buckets=BUCKETS_ETAPA,
+)
+REDACOES = Counter(
+    "correcao_redacoes_total",
+    "Redações finalizadas pelo worker, por resultado (concluida, triagem, erro).",
+    ["resultado"],
+)
+REAGENDAMENTOS = Counter(
+    "correcao_reagendamentos_total",
+    "Tarefas reagendadas ou redespachadas, por motivo (cota, disjuntor, lease_expirado, pendente_orfa).",
+    ["motivo"],
+)
+
+# Consultas ao cache de avaliações (agents/cache.py), pela camada que respondeu
+CACHE_CONSULTAS = Counter(
+    "cache_avaliacoes_consultas_total",
+    "Consultas ao cache de avaliações por resultado (memoria, banco, falta).",
+    ["resultado"],
+)
+
+LOTE_DESPACHADAS = Counter(
+    "correcao_lote_despachadas_total",
+    "Redações de lote enviadas à fila pelo despacho justo, por origem.",
+    ["origem"],
+)
+
+# Contadores da redação em andamento. As corrotinas da banca herdam o
+# contexto da tarefa, então todas as chamadas de uma correção somam no mesmo dict.
+_telemetria_redacao: contextvars.ContextVar[Optional[Dict[str, Any]]] = contextvars.ContextVar(
+    "telemetria_redacao", default=None
+)
+
+
+def iniciar_telemetria_redacao() -> Dict[str, Any]:
+    """Abre os contadores de chamadas e tokens da correção atual (no event loop)."""
+    contadores = {"chamadas_llm": 0, "tokens_entrada": 0, "tokens_saida": 0, "espera_cota_s": 0.0}
+    _telemetria_redacao.set(contadores)
+    return contadores
+
+
+def _somar_na_redacao(**valores) -> None:
+    contadores = _telemetria_redacao.get()
+    if contadores is not None:
+        for nome, valor in valores.items():
+            contadores[nome] += valor
+
+
+def registrar_espera_cota(corretor: str, endpoint: str, segundos: float) -> None:
+    LLM_ESPERA_COTA.labels(corretor, endpoint).observe(segundos)
+    _somar_na_redacao(espera_cota_s=segundos)
+
+
+def registrar_chamada_llm(
+    corretor: str,
+    endpoint: str,
+    chain: str,
+    segundos: float,
+    resultado: Any,
+    tokens_entrada_estimados: int,
+    uso: Optional[Dict[str, int]] = None,
+) -> None:
+    """
+    Registra uma chamada bem-sucedida, com os tokens informados pelo provedor
+    (`uso` ou o usage_metadata do resultado) se houver; senão, estimados.
+    """
+    uso = uso or getattr(resultado, "usage_metadata", None) or {}
+    tokens_entrada = uso.get("input_tokens") or tokens_entrada_estimados
+    tokens_saida = uso.get("output_tokens")
+    if tokens_saida is None:
+        if hasattr(resultado, "json"):
+            conteudo = resultado.json()
+        else:
+            conteudo = getattr(resultado, "content", resultado)
+        tokens_saida = estimar_tokens(str(conteudo))
+
+    LLM_CHAMADAS.labels(corretor, endpoint, chain, "ok").inc()
+    LLM_LATENCIA.labels(corretor, endpoint, chain).observe(segundos)
+    LLM_TOKENS.labels(corretor, endpoint, "entrada").inc(tokens_entrada)
+    LLM_TOKENS.labels(corretor, endpoint, "saida").inc(tokens_saida)
+    _somar_na_redacao(chamadas_llm=1, tokens_entrada=tokens_entrada, tokens_saida=tokens_saida)
+
+
+def registrar_falha_llm(corretor: str, endpoint: str, chain: str, resultado: str) -> None:
+    LLM_CHAMADAS.labels(corretor, endpoint, chain, resultado).inc()
+    _somar_na_redacao(chamadas_llm=1)
+
+
+@contextmanager
+def medir(
+    histograma: Histogram,
+    tempos: Optional[Dict[str, Any]] = None,
+    nome: Optional[str] = None,
+    **rotulos,
+):
+    """
+    Mede a duração do bloco no histograma (com os rótulos informados) e,
+    se `tempos` for informado, guarda os segundos em `tempos[nome]`.
+    """
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        duracao = time.perf_counter() - inicio
+        histograma.labels(**rotulos).observe(duracao)
+        if tempos is not None:
+            tempos[nome] = round(duracao, 3)
+
+
+def iniciar_servidor_metricas() -> None:
+    """Sobe o /metrics do worker (chamado uma vez, na subida do processo principal)."""
+    try:
+        start_http_server(METRICAS_PORTA)
+        logger.info(f"Métricas do worker em :{METRICAS_PORTA}/metrics")
+    except OSError as e:
+        logger.warning(f"Não foi possível expor as métricas na porta {METRICAS_PORTA}: {e}")
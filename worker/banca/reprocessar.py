@@ -0,0 +1,265 @@
+"""
+Reconsolidação em lote das correções armazenadas, sem chamar o LLM.
+
+Quando os limites de discrepância ou a regra de consenso mudam, as notas dos
+corretores já gravadas em notas_competencia bastam para recalcular o resultado
+final. As notas são lidas em streaming (cursor do lado do servidor, em uma
+sessão só de leitura), montadas em matrizes NumPy (redações x corretores x
+competências) e as regras de banca/rules.py são aplicadas de forma vetorizada.
+Com --aplicar, cada lote é gravado e confirmado por uma segunda sessão: o
+commit não pode fechar o cursor que ainda está sendo lido.
+
+Uso (dentro do container do worker):
+
+    python -m banca.reprocessar                         # só relatório
+    python -m banca.reprocessar --limite-total 120 --aplicar
+"""
+import argparse
+import itertools
+import json
+import time
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+from sqlalchemy import select, text
+
+from shared.models import SessionLocal, NotaCompetencia
+from shared.resultados import CORRETOR_FINAL, CODIGOS_CORRETOR
+from .rules import (
+    LIMITE_DISCREPANCIA_TOTAL,
+    LIMITE_DISCREPANCIA_COMPETENCIA,
+    FONTE_MEDIA,
+    fonte_consenso,
+    justificativa_media,
+    justificativa_consenso,
+)
+
+NUMERO_COMPETENCIAS = 5
+# Eixo dos corretores nas matrizes: 0 = nota final gravada, 1..3 = C1, C2, Supervisor
+NUMERO_CORRETORES = max(CODIGOS_CORRETOR.values()) + 1
+REDACOES_POR_LOTE = 50_000
+
+
+def _montar_matriz(linhas: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Converte linhas (redacao_id, corretor, competencia, nota) em
+    (ids, notas[redação, corretor, competência]); notas ausentes ficam NaN.
+    """
+    ids, posicao = np.unique(linhas[:, 0].astype(np.int64), return_inverse=True)
+    notas = np.full((len(ids), NUMERO_CORRETORES, NUMERO_COMPETENCIAS), np.nan)
+    notas[posicao, linhas[:, 1].astype(np.intp), linhas[:, 2].astype(np.intp) - 1] = linhas[:, 3]
+    return ids, notas
+
+
+def ler_notas(db, redacoes_por_lote: int = REDACOES_POR_LOTE) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Lê notas_competencia em streaming, ordenada por redação, e devolve lotes
+    (ids, notas). As linhas da última redação de cada bloco esperam o bloco
+    seguinte, para que nenhuma redação seja dividida entre dois lotes.
+    """
+    linhas_por_bloco = redacoes_por_lote * NUMERO_CORRETORES * NUMERO_COMPETENCIAS
+    resultado = db.execute(
+        select(
+            NotaCompetencia.redacao_id,
+            NotaCompetencia.corretor,
+            NotaCompetencia.competencia,
+            NotaCompetencia.nota,
+        )
+        .order_by(NotaCompetencia.redacao_id)
+        .execution_options(stream_results=True, yield_per=linhas_por_bloco)
+    )
+    pendentes = np.empty((0, 4))
+    for bloco in resultado.partitions():
+        # Uma única passada em C sobre os valores do bloco, sem montar tuplas em Python
+        valores = np.fromiter(itertools.chain.from_iterable(bloco), dtype=np.float64, count=4 * len(bloco))
+        linhas = np.concatenate([pendentes, valores.reshape(-1, 4)])
+        ultima = linhas[-1, 0]
+        completas = linhas[:, 0] != ultima
+        pendentes = linhas[~completas]
+        if completas.any():
+            yield _montar_matriz(linhas[completas])
+    if len(pendentes):
+        yield _montar_matriz(pendentes)
+
+
+def reconsolidar(
+    notas: np.ndarray,
+    limite_total: float = LIMITE_DISCREPANCIA_TOTAL,
+    limite_competencia: float = LIMITE_DISCREPANCIA_COMPETENCIA,
+) -> Dict[str, np.ndarray]:
+    """
+    Versão vetorizada de verificar_discrepancia + calcular_nota_consolidada /
+    resolver_discrepancia_com_supervisor (banca/rules.py) para N redações.
+
+    Onde há discrepância e nota do Supervisor, vale a média das duas notas
+    mais próximas (com os mesmos desempates das regras); nas demais
+    competências, a média dos Corretores 1 e 2. Competências discrepantes sem
+    nota do Supervisor são sinalizadas em `falta_supervisor`.
+    """
+    c1, c2, c3 = notas[:, 1], notas[:, 2], notas[:, 3]
+    validas = ~np.isnan(c1).any(axis=1) & ~np.isnan(c2).any(axis=1)
+
+    # Comparações com NaN (notas ausentes) resultam em False, como desejado
+    with np.errstate(invalid="ignore"):
+        discrepancia_total = np.abs(c1.sum(axis=1) - c2.sum(axis=1)) > limite_total
+        discrepantes = (np.abs(c1 - c2) > limite_competencia) | discrepancia_total[:, None]
+
+        d12, d13, d23 = np.abs(c1 - c2), np.abs(c1 - c3), np.abs(c2 - c3)
+        usa_13 = (d13 <= d12) & (d13 <= d23)
+        usa_23 = ~usa_13 & (d23 <= d12) & (d23 <= d13)
+
+    media = (c1 + c2) / 2
+    consenso = np.where(usa_13, (c1 + c3) / 2, np.where(usa_23, (c2 + c3) / 2, media))
+
+    tem_supervisor = ~np.isnan(c3)
+    usa_consenso = discrepantes & tem_supervisor
+    final = np.where(usa_consenso, consenso, media)
+    return {
+        "validas": validas,
+        "final": final,
+        "nota_final": final.sum(axis=1),
+        "discrepantes": discrepantes,
+        "usa_consenso": usa_consenso,
+        "falta_supervisor": discrepantes & ~tem_supervisor,
+    }
+
+
+def _numero(valor: float):
+    """Notas inteiras voltam como int, como no resultado original."""
+    return int(valor) if float(valor).is_integer() else float(valor)
+
+
+def _resumo_competencias(notas: np.ndarray, final: np.ndarray, usa_consenso: np.ndarray) -> List[Dict]:
+    competencias = []
+    for indice in range(NUMERO_COMPETENCIAS):
+        numero = indice + 1
+        s1, s2, s3 = (
+            None if np.isnan(notas[c, indice]) else _numero(notas[c, indice]) for c in (1, 2, 3)
+        )
+        nota = _numero(final[indice])
+        justificativa = (
+            justificativa_consenso(numero, s1, s2, s3, nota)
+            if usa_consenso[indice]
+            else justificativa_media(numero, s1, s2)
+        )
+        competencias.append({"competencia": numero, "nota": nota, "justificativa": justificativa})
+    return competencias
+
+
+def gravar(db, ids: np.ndarray, notas: np.ndarray, calculo: Dict[str, np.ndarray], alteradas: np.ndarray) -> None:
+    """Grava em bloco (via unnest) as notas finais e o resumo das redações alteradas."""
+    indices = np.flatnonzero(alteradas)
+    if not len(indices):
+        return
+
+    lista_ids, notas_finais, fontes, competencias_json = [], [], [], []
+    for i in indices:
+        consenso = calculo["usa_consenso"][i]
+        competencias = _resumo_competencias(notas[i], calculo["final"][i], consenso)
+        reavaliadas = [n + 1 for n in np.flatnonzero(consenso)]
+        lista_ids.append(int(ids[i]))
+        notas_finais.append(_numero(calculo["nota_final"][i]))
+        fontes.append(fonte_consenso(reavaliadas, NUMERO_COMPETENCIAS) if reavaliadas else FONTE_MEDIA)
+        competencias_json.append(json.dumps(competencias, ensure_ascii=False))
+
+    # Acopladas (redacao_principal_id) recebem o mesmo resumo da principal
+    db.execute(
+        text(
+            """
+            UPDATE redacoes AS r
+            SET nota_final = v.nota_final,
+                fonte_resultado = v.fonte,
+                resultado_json = (
+                    r.resultado_json::jsonb
+                    || jsonb_build_object(
+                        'nota_final', v.nota_final,
+                        'fonte_resultado', v.fonte,
+                        'competencias', v.competencias::jsonb
+                    )
+                )::json
+            FROM unnest(:ids, :notas_finais, :fontes, :competencias)
+                AS v(id, nota_final, fonte, competencias)
+            WHERE r.id = v.id OR r.redacao_principal_id = v.id
+            """
+        ),
+        {"ids": lista_ids, "notas_finais": notas_finais, "fontes": fontes, "competencias": competencias_json},
+    )
+
+    finais = calculo["final"][indices]
+    db.execute(
+        text(
+            """
+            UPDATE notas_competencia AS n
+            SET nota = v.nota
+            FROM unnest(:ids, :competencias, :notas) AS v(redacao_id, competencia, nota)
+            WHERE n.redacao_id = v.redacao_id
+              AND n.corretor = :corretor_final
+              AND n.competencia = v.competencia
+            """
+        ),
+        {
+            "ids": np.repeat(ids[indices], NUMERO_COMPETENCIAS).tolist(),
+            "competencias": np.tile(np.arange(1, NUMERO_COMPETENCIAS + 1), len(indices)).tolist(),
+            "notas": finais.ravel().tolist(),
+            "corretor_final": CORRETOR_FINAL,
+        },
+    )
+
+
+def reprocessar(
+    limite_total: float = LIMITE_DISCREPANCIA_TOTAL,
+    limite_competencia: float = LIMITE_DISCREPANCIA_COMPETENCIA,
+    aplicar: bool = False,
+) -> Dict[str, float]:
+    """
+    Reconsolida todas as correções armazenadas com os limites informados.
+
+    Redações que passariam a exigir o Supervisor em alguma competência não são
+    regravadas (dependem de uma nova chamada ao LLM); só entram no relatório.
+    """
+    inicio = time.perf_counter()
+    relatorio = dict.fromkeys(
+        ("analisadas", "alteradas", "precisariam_supervisor", "supervisor_dispensavel"), 0
+    )
+    leitura = SessionLocal()
+    escrita = SessionLocal() if aplicar else None
+    try:
+        for ids, notas in ler_notas(leitura):
+            calculo = reconsolidar(notas, limite_total, limite_competencia)
+            validas = calculo["validas"]
+            falta_supervisor = calculo["falta_supervisor"].any(axis=1) & validas
+            tem_supervisor = ~np.isnan(notas[:, 3]).all(axis=1)
+            with np.errstate(invalid="ignore"):
+                diferentes = (np.abs(calculo["final"] - notas[:, CORRETOR_FINAL]) > 1e-9).any(axis=1)
+            alteradas = validas & ~falta_supervisor & diferentes
+
+            relatorio["analisadas"] += int(validas.sum())
+            relatorio["alteradas"] += int(alteradas.sum())
+            relatorio["precisariam_supervisor"] += int(falta_supervisor.sum())
+            relatorio["supervisor_dispensavel"] += int(
+                (validas & tem_supervisor & ~calculo["discrepantes"].any(axis=1)).sum()
+            )
+            if escrita is not None:
+                gravar(escrita, ids, notas, calculo, alteradas)
+                escrita.commit()
+    finally:
+        if escrita is not None:
+            escrita.close()
+        leitura.close()
+    relatorio["segundos"] = round(time.perf_counter() - inicio, 2)
+    return relatorio
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reconsolida as correções armazenadas sem chamar o LLM.")
+    parser.add_argument("--limite-total", type=float, default=LIMITE_DISCREPANCIA_TOTAL)
+    parser.add_argument("--limite-competencia", type=float, default=LIMITE_DISCREPANCIA_COMPETENCIA)
+    parser.add_argument("--aplicar", action="store_true", help="Grava os resultados (padrão: só relatório).")
+    args = parser.parse_args()
+
+    relatorio = reprocessar(args.limite_total, args.limite_competencia, args.aplicar)
+    print(f"Redações analisadas: {relatorio['analisadas']}")
+    print(f"Resultado alterado: {relatorio['alteradas']}" + ("" if args.aplicar else " (não gravado)"))
+    print(f"Passariam a precisar do Supervisor: {relatorio['precisariam_supervisor']}")
+    print(f"Com Supervisor que deixaria de ser necessário: {relatorio['supervisor_dispensavel']}")
+    print(f"Tempo: {relatorio['segundos']}s")
@@ -1,18 +1,58 @@
-from typing import Dict, Any
+from typing import Dict, Any, List
 
+# Limites de discrepância da banca (diferença máxima aceita entre os corretores)
+LIMITE_DISCREPANCIA_TOTAL = 100
+LIMITE_DISCREPANCIA_COMPETENCIA = 80
 
-def verificar_discrepancia(c1: Dict[str, Any], c2: Dict[str, Any]) -> bool:
-    """Verifica se há discrepância total ou por competência."""
-    if abs(c1["nota_final"] - c2["nota_final"]) > 100:
+FONTE_MEDIA = "Média dos Corretores 1 e 2"
+
+
+def verificar_discrepancia(c1: Dict[str, Any], c2: Dict[str, Any]) -> List[int]:
+    """
+    Retorna as competências em que os corretores divergem (lista vazia = sem discrepância).
+
+    Uma discrepância na nota total exige a reavaliação da redação inteira, então
+    nesse caso todas as competências são retornadas.
+    """
+    if abs(c1["nota_final"] - c2["nota_final"]) > LIMITE_DISCREPANCIA_TOTAL:
         print(f"Discrepância TOTAL detectada: {c1['nota_final']} vs {c2['nota_final']}")
-        return True
+        return [comp["competencia"] for comp in c1["competencias"]]
+
+    discrepantes = []
     for comp1, comp2 in zip(c1["competencias"], c2["competencias"]):
-        if abs(comp1["nota"] - comp2["nota"]) > 80:
+        if abs(comp1["nota"] - comp2["nota"]) > LIMITE_DISCREPANCIA_COMPETENCIA:
             print(
                 f"Discrepância na Competência {comp1['competencia']} detectada: {comp1['nota']} vs {comp2['nota']}"
             )
-            return True
-    return False
+            discrepantes.append(comp1["competencia"])
+    return discrepantes
+
+
+def justificativa_media(numero: int, s1, s2) -> str:
+    # As justificativas completas de cada corretor ficam em `detalhes`
+    return f"[Média C{numero}] Notas dos Corretores 1 e 2: ({s1}, {s2})."
+
+
+def justificativa_consenso(numero: int, s1, s2, s3, nota_consenso) -> str:
+    return f"[Consenso C{numero}] Notas da banca: ({s1}, {s2}, {s3}). Nota final da competência: {nota_consenso}."
+
+
+def fonte_consenso(reavaliadas: List[int], total_competencias: int) -> str:
+    """Descrição da fonte do resultado quando o Supervisor reavaliou `reavaliadas`."""
+    if len(reavaliadas) == total_competencias:
+        return "Consenso da Banca (média das 2 notas mais próximas)"
+    return (
+        "Consenso da Banca (média das 2 notas mais próximas) nas competências "
+        f"{', '.join(f'C{n}' for n in reavaliadas)}; média dos Corretores 1 e 2 nas demais"
+    )
+
+
+def _media_competencia(comp1: Dict[str, Any], comp2: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "competencia": comp1["competencia"],
+        "nota": (comp1["nota"] + comp2["nota"]) / 2,
+        "justificativa": justificativa_media(comp1["competencia"], comp1["nota"], comp2["nota"]),
+    }
 
 
 def calcular_nota_consolidada(c1: Dict[str, Any], c2: Dict[str, Any]) -> Dict[str, Any]:
@@ -22,20 +62,12 @@ def calcular_nota_consolidada(c1: Dict[str, Any], c2: Dict[str, Any]) -> Dict[st
     correcao_final = {
         "competencias": [],
         "nota_final": 0,
-        "fonte_resultado": "Média dos Corretores 1 e 2",
+        "fonte_resultado": FONTE_MEDIA,
         "detalhes": [c1, c2],
     }
 
     for comp1, comp2 in zip(c1["competencias"], c2["competencias"]):
-        nota_media_comp = (comp1["nota"] + comp2["nota"]) / 2
-
-        correcao_final["competencias"].append(
-            {
-                "competencia": comp1["competencia"],
-                "nota": nota_media_comp,
-                "justificativa": f"[Média C{comp1['competencia']}] Corretor 1 ({comp1['nota']}): {comp1['justificativa']} | Corretor 2 ({comp2['nota']}): {comp2['justificativa']}",
-            }
-        )
+        correcao_final["competencias"].append(_media_competencia(comp1, comp2))
 
     correcao_final["nota_final"] = sum(
         c["nota"] for c in correcao_final["competencias"]
@@ -46,22 +78,38 @@ def calcular_nota_consolidada(c1: Dict[str, Any], c2: Dict[str, Any]) -> Dict[st
 def resolver_discrepancia_com_supervisor(
     c1: Dict[str, Any], c2: Dict[str, Any], c3: Dict[str, Any]
 ) -> Dict[str, Any]:
-    """Calcula o consenso da banca pegando a média das 2 notas mais próximas."""
+    """
+    Calcula o consenso da banca pegando a média das 2 notas mais próximas.
+
+    O supervisor pode ter reavaliado só as competências discrepantes: o consenso
+    é aplicado onde existe uma terceira nota e, nas demais, vale a média dos
+    Corretores 1 e 2.
+    """
     print(
         "--- DISCREPÂNCIA DETECTADA! Resolvendo com base nas duas notas mais próximas por competência. ---"
     )
 
+    notas_supervisor = {comp["competencia"]: comp["nota"] for comp in c3["competencias"]}
+    reavaliadas = sorted(
+        comp["competencia"] for comp in c1["competencias"] if comp["competencia"] in notas_supervisor
+    )
+
     correcao_final = {
         "competencias": [],
         "nota_final": 0,
-        "fonte_resultado": "Consenso da Banca (média das 2 notas mais próximas)",
+        "fonte_resultado": fonte_consenso(reavaliadas, len(c1["competencias"])),
         "detalhes": [c1, c2, c3],
     }
 
-    for i in range(5):
-        s1 = c1["competencias"][i]["nota"]
-        s2 = c2["competencias"][i]["nota"]
-        s3 = c3["competencias"][i]["nota"]
+    for comp1, comp2 in zip(c1["competencias"], c2["competencias"]):
+        numero = comp1["competencia"]
+        if numero not in notas_supervisor:
+            correcao_final["competencias"].append(_media_competencia(comp1, comp2))
+            continue
+
+        s1 = comp1["nota"]
+        s2 = comp2["nota"]
+        s3 = notas_supervisor[numero]
 
         diff13 = abs(s1 - s3)
         diff23 = abs(s2 - s3)
@@ -78,9 +126,9 @@ def resolver_discrepancia_com_supervisor(
 
         correcao_final["competencias"].append(
             {
-                "competencia": i + 1,
+                "competencia": numero,
                 "nota": nota_consenso,
-                "justificativa": f"[Consenso C{i+1}] Notas da banca: ({s1}, {s2}, {s3}). Nota final da competência: {nota_consenso}.",
+                "justificativa": justificativa_consenso(numero, s1, s2, s3, nota_consenso),
             }
         )
 
@@ -0,0 +1,114 @@
+import math
+import re
+import unicodedata
+from typing import Dict, Any, Iterable, List, Optional, Set, Tuple
+
+# Critérios de nota zero automática do ENEM verificados localmente, antes da banca
+MINIMO_LINHAS = 7  # "Texto insuficiente": até 7 linhas
+CARACTERES_POR_LINHA = 70  # Largura aproximada de uma linha da folha de redação
+MINIMO_PROPORCAO_PORTUGUES = 0.15  # Fração mínima de palavras funcionais do português
+TAMANHO_NGRAMA = 5  # Trechos de 5 palavras seguidas contam como cópia
+
+NUMERO_COMPETENCIAS = 5
+
+# Palavras funcionais frequentes no português (artigos, preposições, pronomes...)
+PALAVRAS_FUNCIONAIS_PT = frozenset(
+    """
+    a à às ao aos as o os um uma uns umas de do da dos das em no na nos nas num numa
+    por pelo pela pelos pelas para com sem sob sobre entre até após desde contra
+    e ou mas porém contudo todavia entretanto pois porque que se como quando onde
+    não nem já também só ainda muito mais menos tão bem
+    é são foi foram ser está estão estar era eram há tem têm ter seja sejam será
+    eu tu ele ela nós eles elas você vocês me te se lhe nos lhes
+    seu sua seus suas meu minha nosso nossa esse essa esses essas este esta estes estas
+    isso isto aquele aquela aqueles aquelas aquilo qual quais quem cujo cuja
+    """.split()
+)
+
+
+def _palavras(texto: str) -> List[str]:
+    """Palavras em minúsculas, sem pontuação (acentos preservados)."""
+    texto = unicodedata.normalize("NFC", texto or "").lower()
+    return re.findall(r"[^\W\d_]+", texto)
+
+
+def _ngramas(palavras: List[str], tamanho: int = TAMANHO_NGRAMA) -> Set[Tuple[str, ...]]:
+    return {tuple(palavras[i:i + tamanho]) for i in range(len(palavras) - tamanho + 1)}
+
+
+def contar_linhas(texto: str) -> int:
+    """
+    Linhas que o texto ocuparia na folha de redação: cada parágrafo ocupa
+    ao menos uma linha, e parágrafos longos quebram a cada CARACTERES_POR_LINHA.
+    """
+    paragrafos = [p.strip() for p in (texto or "").splitlines() if p.strip()]
+    return sum(math.ceil(len(p) / CARACTERES_POR_LINHA) for p in paragrafos)
+
+
+def proporcao_portugues(palavras: List[str]) -> float:
+    """Fração das palavras que são palavras funcionais do português."""
+    if not palavras:
+        return 0.0
+    return sum(1 for p in palavras if p in PALAVRAS_FUNCIONAIS_PT) / len(palavras)
+
+
+def proporcao_copiada(palavras: List[str], textos_motivadores: Iterable[str]) -> float:
+    """Fração dos trechos (n-gramas) da redação que aparecem nos textos motivadores."""
+    ngramas_redacao = _ngramas(palavras)
+    if not ngramas_redacao:
+        return 0.0
+    ngramas_motivadores = set()
+    for texto in textos_motivadores:
+        ngramas_motivadores |= _ngramas(_palavras(texto))
+    return len(ngramas_redacao & ngramas_motivadores) / len(ngramas_redacao)
+
+
+def _resultado_zero(motivo: str, metricas: Dict[str, Any]) -> Dict[str, Any]:
+    """Resultado no mesmo formato de `calcular_nota_consolidada`, com nota zero."""
+    print(f"--- TRIAGEM: nota zero ({motivo}). Banca não acionada. ---")
+    return {
+        "competencias": [
+            {
+                "competencia": numero,
+                "nota": 0,
+                "justificativa": f"[Triagem] Redação anulada: {motivo}.",
+            }
+            for numero in range(1, NUMERO_COMPETENCIAS + 1)
+        ],
+        "nota_final": 0,
+        "fonte_resultado": f"Triagem automática ({motivo})",
+        "detalhes": [],
+        "triagem": {"motivo": motivo, **metricas},
+    }
+
+
+def triar_redacao(
+    texto_redacao: str, textos_motivadores: Iterable[str] = ()
+) -> Optional[Dict[str, Any]]:
+    """
+    Verifica os critérios de nota zero que não dependem do LLM.
+
+    Retorna o resultado final (nota zero) se a redação for anulada, ou None se
+    ela deve seguir para a banca.
+    """
+    palavras = _palavras(texto_redacao)
+    if not palavras:
+        return _resultado_zero("redação em branco", {"linhas": 0, "palavras": 0})
+
+    linhas = contar_linhas(texto_redacao)
+    metricas = {"linhas": linhas, "palavras": len(palavras)}
+    if linhas <= MINIMO_LINHAS:
+        return _resultado_zero(f"texto insuficiente, com até {MINIMO_LINHAS} linhas", metricas)
+
+    metricas["proporcao_portugues"] = round(proporcao_portugues(palavras), 3)
+    if metricas["proporcao_portugues"] < MINIMO_PROPORCAO_PORTUGUES:
+        return _resultado_zero("texto não redigido em língua portuguesa", metricas)
+
+    # Trechos copiados dos textos motivadores são desconsiderados; se o que
+    # sobra não passa do mínimo de linhas, a redação é anulada
+    copiada = proporcao_copiada(palavras, textos_motivadores)
+    metricas["proporcao_copiada"] = round(copiada, 3)
+    if copiada > 0 and linhas * (1 - copiada) <= MINIMO_LINHAS:
+        return _resultado_zero("cópia dos textos motivadores", metricas)
+
+    return None
@@ -2,8 +2,21 @@ import os
 from celery import Celery
 from dotenv import load_dotenv
 
+
 load_dotenv()
 
+# Filas: correções interativas, correções de lote (alimentada aos poucos pelo
+# despacho justo, ver despacho.py) e tarefas de manutenção
+FILA_INTERATIVA = "correcoes"
+FILA_LOTE = "correcoes_lote"
+FILA_MANUTENCAO = "manutencao"
+FILAS_CORRECAO = (FILA_INTERATIVA, FILA_LOTE)
+
+# Intervalo entre varreduras de redações travadas (ver varredura.py)
+VARREDURA_INTERVALO = float(os.getenv("VARREDURA_INTERVALO", "60"))
+# Intervalo entre rodadas do despacho dos lotes (ver despacho.py)
+DESPACHO_INTERVALO = float(os.getenv("DESPACHO_INTERVALO", "5"))
+
 celery_app = Celery(
     "worker",
     broker=os.getenv("CELERY_BROKER_URL"),
@@ -11,7 +24,40 @@ celery_app = Celery(
     include=['tasks'] 
 )
 
+# O ritmo das chamadas ao LLM é controlado pelo limitador compartilhado
+# (agents/limiter.py), não por um rate limit de tarefas por worker.
+#
+# O worker roda com o pool de threads (-P threads -c N): cada tarefa bloqueia
+# sua thread enquanto a correção roda no event loop compartilhado
+# (event_loop.py), então N pode ser bem maior que o número de CPUs.
+#
+# A varredura de redações travadas (varredura.py) e o despacho dos lotes
+# (despacho.py) vão para uma fila própria, que continua sendo consumida quando
+# o disjuntor pausa as de correção; os dois são agendados pelo beat (um único
+# processo "celery beat" no deploy).
+#
+# Com queue_order_strategy=priority, o worker (-Q manutencao,correcoes,correcoes_lote)
+# só pega uma correção de lote quando não há nenhuma interativa esperando.
 celery_app.conf.update(
-    task_routes={"correct_essay": {"queue": "correcoes"}}, 
-    task_rate_limit="1/m"
+    task_routes={
+        "correct_essay": {"queue": FILA_INTERATIVA},
+        "gerar_feedback": {"queue": FILA_INTERATIVA},
+        "varrer_redacoes": {"queue": FILA_MANUTENCAO},
+        "despachar_lotes": {"queue": FILA_MANUTENCAO},
+    },
+    broker_transport_options={"queue_order_strategy": "priority"},
+    worker_prefetch_multiplier=1,
+    beat_schedule={
+        "despachar-lotes": {
+            "task": "despachar_lotes",
+            "schedule": DESPACHO_INTERVALO,
+            "options": {"expires": DESPACHO_INTERVALO},
+        },
+        "varrer-redacoes": {
+            "task": "varrer_redacoes",
+            "schedule": VARREDURA_INTERVALO,
+            # Varreduras atrasadas não se acumulam: a próxima cobre o mesmo trabalho
+            "options": {"expires": VARREDURA_INTERVALO},
+        },
+    },
 )
\ No newline at end of file
@@ -0,0 +1,67 @@
+import logging
+import os
+import random
+import threading
+from typing import Sequence
+
+from celery_app import FILAS_CORRECAO
+from shared.disjuntor import ABERTO, obter_disjuntor
+
+# Configuração de Logs
+logger = logging.getLogger(__name__)
+
+# De quanto em quanto tempo cada worker consulta o disjuntor
+CONTROLE_FILA_INTERVALO = float(os.getenv("CONTROLE_FILA_INTERVALO", "2"))
+# Espera aleatória antes de voltar a consumir, para os workers não retomarem juntos
+CONTROLE_FILA_JITTER = float(os.getenv("CONTROLE_FILA_JITTER", "5"))
+
+
+class ControleFila(threading.Thread):
+    """
+    Pausa o consumo das filas de correção (interativa e de lote) deste worker
+    enquanto o disjuntor do LLM estiver aberto e o retoma (com jitter) quando
+    ele fechar.
+
+    Usa os comandos de controle do próprio Celery (cancel_consumer/add_consumer)
+    endereçados apenas a este worker.
+    """
+
+    def __init__(self, app, hostname: str, filas: Sequence[str] = FILAS_CORRECAO):
+        super().__init__(name="controle-fila", daemon=True)
+        self.app = app
+        self.hostname = hostname
+        self.filas = tuple(filas)
+        self.consumindo = True
+        self._parar = threading.Event()
+
+    def _pausar(self) -> None:
+        for fila in self.filas:
+            self.app.control.cancel_consumer(fila, destination=[self.hostname])
+        self.consumindo = False
+        logger.warning(f"Disjuntor aberto: {self.hostname} parou de consumir {self.filas}.")
+
+    def _retomar(self) -> None:
+        # Ainda fechado depois do jitter? Só então volta a consumir
+        if self._parar.wait(random.uniform(0, CONTROLE_FILA_JITTER)):
+            return
+        if obter_disjuntor().estado()["estado"] == ABERTO:
+            return
+        for fila in self.filas:
+            self.app.control.add_consumer(fila, destination=[self.hostname])
+        self.consumindo = True
+        logger.info(f"Disjuntor fechado: {self.hostname} voltou a consumir {self.filas}.")
+
+    def run(self) -> None:
+        disjuntor = obter_disjuntor()
+        while not self._parar.wait(CONTROLE_FILA_INTERVALO):
+            try:
+                aberto = disjuntor.estado()["estado"] == ABERTO
+                if aberto and self.consumindo:
+                    self._pausar()
+                elif not aberto and not self.consumindo:
+                    self._retomar()
+            except Exception as e:
+                logger.warning(f"Falha no controle da fila de correções: {e}")
+
+    def parar(self) -> None:
+        self._parar.set()
@@ -0,0 +1,220 @@
+"""
+Despacho justo das correções de lote entre origens (escolas, clientes...).
+
+Redações de lote não vão direto para o broker: ficam PENDENTE com
+despachado_em NULL e, a cada DESPACHO_INTERVALO segundos (tarefa
+despachar_lotes, agendada pelo beat), a fila correcoes_lote é completada até
+DESPACHO_FILA_ALVO mensagens. As vagas são repartidas entre as origens com
+redações esperando por deficit round robin, com os pesos de DESPACHO_PESOS.
+
+Como a fila de lote fica rasa, uma origem que sobe 20 mil redações de uma vez
+não passa à frente das demais, e as submissões interativas (fila própria,
+consumida antes da de lote) nunca esperam atrás de um lote. O ritmo de todas
+continua limitado pela cota compartilhada do LLM (agents/limiter.py).
+"""
+import json
+import logging
+import os
+from contextlib import contextmanager
+from typing import Dict, Iterator, List
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from shared.models import Redacao
+
+try:
+    import redis
+except ImportError:  # pragma: no cover - redis faz parte do requirements.txt
+    redis = None
+
+# Configuração de Logs
+logger = logging.getLogger(__name__)
+
+# Mensagens mantidas na fila de lote. Baixo o bastante para uma origem nova ser
+# atendida em poucas rodadas, alto o bastante para os workers não ficarem ociosos.
+DESPACHO_FILA_ALVO = int(os.getenv("DESPACHO_FILA_ALVO", "20"))
+# Peso de cada origem no rodízio, em JSON ({"escola-a": 2}); as demais valem 1
+DESPACHO_PESOS: Dict[str, float] = json.loads(os.getenv("DESPACHO_PESOS") or "{}")
+PESO_MINIMO = 0.01
+
+# Créditos (deficits) das origens entre uma rodada e outra, compartilhados
+# entre os workers que executam o despacho
+DESPACHO_REDIS_URL = os.getenv("DESPACHO_REDIS_URL") or os.getenv("CELERY_BROKER_URL")
+CHAVE_DEFICITS = "despacho:deficits"
+# Um despacho por vez entre todos os workers; a trava expira sozinha se o
+# worker que a segura morrer no meio do despacho
+CHAVE_TRAVA = "despacho:trava"
+DESPACHO_TRAVA_SEGUNDOS = int(os.getenv("DESPACHO_TRAVA_SEGUNDOS", "60"))
+
+_cliente = None
+
+
+def _obter_cliente():
+    global _cliente
+    if _cliente is None and redis is not None and DESPACHO_REDIS_URL:
+        _cliente = redis.Redis.from_url(DESPACHO_REDIS_URL, socket_timeout=2, socket_connect_timeout=2)
+    return _cliente
+
+
+def _adquirir_trava():
+    """Devolve (adquirida, trava). Sem Redis o despacho segue sem trava (trava None)."""
+    try:
+        cliente = _obter_cliente()
+        if cliente is None:
+            return True, None
+        trava = cliente.lock(CHAVE_TRAVA, timeout=DESPACHO_TRAVA_SEGUNDOS)
+        if not trava.acquire(blocking=False):
+            return False, None
+        return True, trava
+    except Exception as e:
+        logger.warning(f"Falha ao travar o despacho (seguindo sem trava): {e}")
+        return True, None
+
+
+@contextmanager
+def trava_despacho() -> Iterator[bool]:
+    """
+    Serializa os despachos: despachar_lotes é disparado pelo beat e pela API,
+    e duas execuções simultâneas leriam a mesma profundidade de fila e os
+    mesmos créditos, enchendo a fila além do alvo e sobrescrevendo os
+    créditos uma da outra. Entrega False se outro despacho está em andamento;
+    as redações que ele não pegar ficam para a próxima rodada do beat.
+    """
+    adquirida, trava = _adquirir_trava()
+    try:
+        yield adquirida
+    finally:
+        if trava is not None:
+            try:
+                trava.release()
+            except Exception as e:
+                logger.warning(f"Falha ao liberar a trava do despacho: {e}")
+
+
+def _carregar_deficits() -> Dict[str, float]:
+    try:
+        cliente = _obter_cliente()
+        if cliente is None:
+            return {}
+        return {origem.decode(): float(valor) for origem, valor in cliente.hgetall(CHAVE_DEFICITS).items()}
+    except Exception as e:
+        logger.warning(f"Falha ao ler os créditos do despacho (recomeçando do zero): {e}")
+        return {}
+
+
+def _salvar_deficits(deficits: Dict[str, float]) -> None:
+    try:
+        cliente = _obter_cliente()
+        if cliente is None:
+            return
+        with cliente.pipeline() as pipe:
+            pipe.delete(CHAVE_DEFICITS)
+            if deficits:
+                pipe.hset(CHAVE_DEFICITS, mapping=deficits)
+            pipe.execute()
+    except Exception as e:
+        logger.warning(f"Falha ao gravar os créditos do despacho: {e}")
+
+
+def distribuir_vagas(
+    pendentes: Dict[str, int],
+    vagas: int,
+    deficits: Dict[str, float],
+    pesos: Dict[str, float] = DESPACHO_PESOS,
+) -> Dict[str, int]:
+    """
+    Deficit round robin. A cada rodada, toda origem com redações esperando
+    ganha `peso` de crédito e despacha tantas quanto o crédito inteiro
+    permitir, das mais credoras para as menos credoras. O crédito não usado
+    fica em `deficits` (atualizado no lugar) para a próxima rodada ou o
+    próximo despacho; origens sem redações esperando perdem o crédito.
+    """
+    restantes = {origem: n for origem, n in pendentes.items() if n > 0}
+    for origem in list(deficits):
+        if origem not in restantes:
+            del deficits[origem]
+
+    alocadas: Dict[str, int] = {}
+    while vagas > 0 and restantes:
+        for origem in restantes:
+            peso = max(float(pesos.get(origem, 1)), PESO_MINIMO)
+            deficits[origem] = deficits.get(origem, 0.0) + peso
+        for origem in sorted(restantes, key=lambda o: -deficits[o]):
+            quantidade = min(int(deficits[origem]), restantes[origem], vagas)
+            if quantidade <= 0:
+                continue
+            alocadas[origem] = alocadas.get(origem, 0) + quantidade
+            deficits[origem] -= quantidade
+            restantes[origem] -= quantidade
+            vagas -= quantidade
+            if not restantes[origem]:
+                del restantes[origem]
+                del deficits[origem]
+            if not vagas:
+                break
+    return alocadas
+
+
+def _aguardando_despacho():
+    """Filtro das redações de lote que ainda não foram enviadas ao broker (índice ix_redacoes_despacho)."""
+    return (
+        Redacao.status == "PENDENTE",
+        Redacao.despachado_em.is_(None),
+        Redacao.redacao_principal_id.is_(None),
+    )
+
+
+def selecionar_para_despacho(db: Session, vagas: int) -> Dict[str, List[int]]:
+    """
+    Marca como despachadas (e confirma) até `vagas` redações, repartidas
+    entre as origens, e devolve os ids por origem, na ordem de submissão.
+    Os créditos são lidos e gravados sem transação no Redis: chame dentro de
+    trava_despacho().
+    """
+    if vagas <= 0:
+        return {}
+    pendentes = dict(
+        db.execute(
+            select(Redacao.origem, func.count(Redacao.id))
+            .where(*_aguardando_despacho())
+            .group_by(Redacao.origem)
+        ).all()
+    )
+    if not pendentes:
+        return {}
+
+    deficits = _carregar_deficits()
+    alocadas = distribuir_vagas(pendentes, vagas, deficits)
+
+    despachadas = {}
+    for origem, quantidade in alocadas.items():
+        selecionadas = (
+            select(Redacao.id)
+            .where(*_aguardando_despacho(), Redacao.origem == origem)
+            .order_by(Redacao.id)
+            .limit(quantidade)
+            .with_for_update(skip_locked=True)
+        )
+        despachadas[origem] = (
+            db.execute(
+                update(Redacao)
+                .where(Redacao.id.in_(selecionadas))
+                .values(despachado_em=func.now())
+                .returning(Redacao.id)
+                .execution_options(synchronize_session=False)
+            )
+            .scalars()
+            .all()
+        )
+    db.commit()
+    _salvar_deficits(deficits)
+    return despachadas
+
+
+def profundidade_fila(app, fila: str) -> int:
+    """Mensagens esperando na fila do broker (declarar a fila devolve a contagem)."""
+    with app.connection_for_write() as conexao:
+        return conexao.default_channel.queue_declare(
+            queue=fila, durable=True, auto_delete=False
+        ).message_count
@@ -0,0 +1,109 @@
+import asyncio
+import logging
+import math
+import os
+import threading
+from typing import Any, Awaitable, Callable, Optional
+
+from agents.roteador import requisicoes_por_minuto_totais
+
+# Configuração de Logs
+logger = logging.getLogger(__name__)
+
+# Chamadas ao LLM de uma correção típica (2 corretores x 5 competências; o
+# comentário geral é gerado sob demanda, fora da correção)
+CHAMADAS_LLM_POR_REDACAO = 10
+# Duração esperada de uma correção quando não há espera por cota
+LATENCIA_CORRECAO_MINUTOS = float(os.getenv("LATENCIA_CORRECAO_MINUTOS", "1"))
+
+
+def _limite_padrao() -> int:
+    """
+    Correções simultâneas que a cota do LLM consegue sustentar (lei de Little):
+    vazão (redações/min = RPM somado dos endpoints / chamadas por redação) x
+    latência de uma correção. Acima disso, as correções extras só ficariam
+    paradas no limitador de taxa.
+    """
+    vazao = requisicoes_por_minuto_totais() / CHAMADAS_LLM_POR_REDACAO
+    return max(1, math.ceil(vazao * LATENCIA_CORRECAO_MINUTOS))
+
+
+MAX_CORRECOES_SIMULTANEAS = int(os.getenv("MAX_CORRECOES_SIMULTANEAS") or _limite_padrao())
+
+_loop = None
+_thread = None
+_semaforo = None
+_trava = threading.Lock()
+
+
+def _obter_loop() -> asyncio.AbstractEventLoop:
+    """
+    Event loop de vida longa, rodando em uma thread dedicada do processo.
+
+    É criado sob demanda (também depois de um fork, quando a thread do processo
+    pai não existe no filho) e compartilhado por todas as tarefas do worker.
+    """
+    global _loop, _thread, _semaforo
+    with _trava:
+        if _thread is None or not _thread.is_alive():
+            _loop = asyncio.new_event_loop()
+            _semaforo = None
+            _thread = threading.Thread(
+                target=_loop.run_forever, name="loop-correcoes", daemon=True
+            )
+            _thread.start()
+        return _loop
+
+
+async def _renovar_periodicamente(renovar: Callable[[], Any], intervalo: float) -> None:
+    while True:
+        await asyncio.sleep(intervalo)
+        try:
+            await asyncio.to_thread(renovar)
+        except Exception as e:
+            logger.warning(f"Falha ao renovar o lease durante a espera por uma vaga: {e}")
+
+
+async def _com_limite(
+    coro: Awaitable[Any], renovar: Optional[Callable[[], Any]], intervalo_renovacao: float
+) -> Any:
+    global _semaforo
+    # O semáforo é criado dentro do loop para ficar associado a ele
+    if _semaforo is None:
+        _semaforo = asyncio.Semaphore(MAX_CORRECOES_SIMULTANEAS)
+    renovacao = None
+    if renovar is not None and _semaforo.locked():
+        renovacao = asyncio.ensure_future(_renovar_periodicamente(renovar, intervalo_renovacao))
+    try:
+        await _semaforo.acquire()
+    except BaseException:
+        coro.close()
+        raise
+    finally:
+        if renovacao is not None:
+            renovacao.cancel()
+    try:
+        return await coro
+    finally:
+        _semaforo.release()
+
+
+def executar_no_loop(
+    coro: Awaitable[Any],
+    renovar: Optional[Callable[[], Any]] = None,
+    intervalo_renovacao: float = 60.0,
+) -> Any:
+    """
+    Executa a corrotina no event loop compartilhado e bloqueia a thread chamadora
+    até o resultado (ou a exceção) ficar pronto.
+
+    Substitui `asyncio.run`: com o pool de threads do Celery, dezenas de
+    `correct_essay` esperam em paralelo enquanto um único loop multiplexa todo
+    o I/O de rede, limitado a MAX_CORRECOES_SIMULTANEAS correções ativas.
+    Enquanto espera por uma vaga, `renovar` (função síncrona, chamada em uma
+    thread) é executada a cada `intervalo_renovacao` segundos, para o lease
+    da redação não vencer antes de a correção começar.
+    """
+    return asyncio.run_coroutine_threadsafe(
+        _com_limite(coro, renovar, intervalo_renovacao), _obter_loop()
+    ).result()
@@ -1,14 +1,56 @@
 import json
 import asyncio
-import re
 import math
+import os
+import random
+import threading
 import time
-from sqlalchemy.orm import Session
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional, Callable
+from celery import group
+from celery.signals import worker_ready, worker_process_init
+from sqlalchemy import or_, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session, undefer
 from google.api_core.exceptions import ResourceExhausted
 
-from celery_app import celery_app
-from shared.models import SessionLocal, Redacao
-from agents.core import executar_correcao_completa_async
+from celery_app import FILA_LOTE, celery_app
+from shared.models import (
+    SessionLocal,
+    Redacao,
+    AvaliacaoParcial,
+    TextoMotivador,
+    NotaCompetencia,
+    STATUS_EM_ANDAMENTO,
+    STATUS_FINAIS,
+)
+from shared.resultados import descomprimir_detalhes, separar_resultado
+from shared.conteudo import chave_trava
+from shared.eventos import publicar_evento
+from shared.disjuntor import DISJUNTOR_RAMPA_SEGUNDOS, obter_disjuntor
+from agents.core import (
+    executar_correcao_completa_async,
+    combinacoes_pool,
+    chamadas_llm_previstas,
+    gerar_feedback_geral,
+)
+from agents.pool import aquecer_pool
+from agents.limiter import extrair_espera_sugerida
+from agents.cache import cache_avaliacoes
+from agents.telemetria import (
+    ETAPA_DURACAO,
+    LOTE_DESPACHADAS,
+    REAGENDAMENTOS,
+    REDACOES,
+    iniciar_servidor_metricas,
+    iniciar_telemetria_redacao,
+    medir,
+)
+from event_loop import executar_no_loop
+from controle_fila import ControleFila
+from varredura import LEASE_SEGUNDOS, estender_lease, reivindicar_redacao, varrer_redacoes
+from despacho import DESPACHO_FILA_ALVO, profundidade_fila, selecionar_para_despacho, trava_despacho
+from banca.triagem import triar_redacao
 from banca.rules import (
     verificar_discrepancia,
     calcular_nota_consolidada,
@@ -16,6 +58,259 @@ from banca.rules import (
 )
 
 
+CORRETORES_INICIAIS = (("c1", "Corretor 1"), ("c2", "Corretor 2"))
+# Nome de cada corretor nas métricas e no detalhamento de tempos
+ETAPAS_CORRETOR = {
+    "Corretor 1": "corretor_1",
+    "Corretor 2": "corretor_2",
+    "Corretor Supervisor": "supervisor",
+}
+
+# Reagendamentos por falta de cota antes de desistir. Com o backoff do
+# disjuntor (até DISJUNTOR_ESPERA_MAXIMA), isso cobre horas de cota esgotada.
+MAX_TENTATIVAS_COTA = int(os.getenv("MAX_TENTATIVAS_COTA", "20"))
+
+
+@worker_ready.connect
+@worker_process_init.connect
+def _preparar_processo(**_):
+    """
+    Monta clientes do LLM e chains na subida do worker, fora do caminho das
+    correções. Roda em segundo plano para não atrasar o início do consumo: uma
+    correção que chegue antes só espera o cliente em construção (agents/pool.py).
+    """
+    threading.Thread(
+        target=aquecer_pool, args=(combinacoes_pool(),), name="aquecer-pool", daemon=True
+    ).start()
+
+
+@worker_ready.connect
+def _iniciar_controle_fila(sender=None, **_):
+    """Liga a pausa/retomada da fila de correções ao disjuntor do LLM."""
+    ControleFila(celery_app, sender.hostname).start()
+    iniciar_servidor_metricas()
+
+
+def _espera_com_jitter(segundos: float) -> int:
+    """
+    Espaça os reagendamentos ao longo da rampa de retomada do disjuntor, para
+    as tarefas não acordarem todas no mesmo instante.
+    """
+    return math.ceil(segundos + random.uniform(0, DISJUNTOR_RAMPA_SEGUNDOS))
+
+
+def _atualizar_redacao(
+    db: Session, redacao: Redacao, status: str, resultado_json=None, dono: Optional[str] = None
+) -> bool:
+    """
+    Atualiza o status (e o resultado) da redação e de todas as submissões
+    idênticas acopladas a ela.
+
+    Com `dono`, só grava se a tarefa ainda detém o lease (a linha fica travada
+    até o commit): se ele venceu e a redação foi reivindicada por outra tarefa,
+    desfaz a transação e retorna False, para a mesma redação não ser gravada
+    (e cobrada) duas vezes.
+
+    Nos status finais, toma a mesma trava consultiva usada pela API ao acoplar
+    submissões, para que nenhuma redação se acople depois que o resultado foi
+    propagado e fique PENDENTE para sempre.
+    """
+    if dono is not None:
+        dono_atual = (
+            db.query(Redacao.lease_dono).filter(Redacao.id == redacao.id).with_for_update().scalar()
+        )
+        if dono_atual != dono:
+            db.rollback()
+            print(
+                f"Redação ID: {redacao.id} não é mais desta tarefa (lease de {dono_atual}); "
+                f"status {status} descartado."
+            )
+            return False
+
+    if status not in STATUS_EM_ANDAMENTO and redacao.hash_conteudo:
+        db.execute(
+            text("SELECT pg_advisory_xact_lock(:chave)"),
+            {"chave": chave_trava(redacao.hash_conteudo)},
+        )
+
+    redacao.status = status
+    if status in STATUS_FINAIS:
+        redacao.lease_dono = redacao.lease_expira_em = None
+    valores = {Redacao.status: status}
+    if resultado_json is not None:
+        if "competencias" in resultado_json:
+            # Resultado da banca: resumo em resultado_json, notas em tabela
+            # estreita e saídas completas dos corretores comprimidas
+            resultado_json, colunas, notas = separar_resultado(resultado_json)
+            for nome, valor in colunas.items():
+                setattr(redacao, nome, valor)
+                # As acopladas leem os detalhes e as notas da principal
+                if nome != "detalhes_comprimidos":
+                    valores[getattr(Redacao, nome)] = valor
+            _gravar_notas(db, redacao.id, notas)
+        redacao.resultado_json = resultado_json
+        valores[Redacao.resultado_json] = resultado_json
+
+    acopladas = (
+        db.query(Redacao)
+        .filter(Redacao.redacao_principal_id == redacao.id)
+        .update(valores, synchronize_session=False)
+    )
+    db.commit()
+    if acopladas:
+        print(f"Status {status} propagado para {acopladas} submissões idênticas.")
+
+    # Submissões acopladas acompanham o canal da principal
+    publicar_evento(redacao.id, "status", status=status)
+    return True
+
+
+def _gravar_notas(db: Session, redacao_id: int, notas) -> None:
+    """Grava (ou sobrescreve) as notas por corretor e competência da redação."""
+    if not notas:
+        return
+    comando = insert(NotaCompetencia).values(
+        [{"redacao_id": redacao_id, **nota} for nota in notas]
+    )
+    db.execute(
+        comando.on_conflict_do_update(
+            index_elements=["redacao_id", "corretor", "competencia"],
+            set_={"nota": comando.excluded.nota},
+        )
+    )
+
+
+def _carregar_checkpoints(db: Session, redacao_id: int) -> Dict[str, Dict[int, Dict[str, Any]]]:
+    """Competências já avaliadas em tentativas anteriores, por corretor."""
+    checkpoints: Dict[str, Dict[int, Dict[str, Any]]] = {}
+    for corretor, competencia, resultado in db.query(
+        AvaliacaoParcial.corretor, AvaliacaoParcial.competencia, AvaliacaoParcial.resultado
+    ).filter(AvaliacaoParcial.redacao_id == redacao_id):
+        checkpoints.setdefault(corretor, {})[competencia] = resultado
+    return checkpoints
+
+
+def _salvar_checkpoint(redacao_id: int, corretor: str, avaliacao: Dict[str, Any], dono: str) -> None:
+    """
+    Grava (ou sobrescreve) a avaliação de uma competência assim que ela termina
+    e, na mesma transação, renova o lease da tarefa sobre a redação.
+    """
+    db = SessionLocal()
+    try:
+        comando = insert(AvaliacaoParcial).values(
+            redacao_id=redacao_id,
+            corretor=corretor,
+            competencia=avaliacao["competencia"],
+            resultado=avaliacao,
+        )
+        db.execute(
+            comando.on_conflict_do_update(
+                index_elements=["redacao_id", "corretor", "competencia"],
+                set_={"resultado": comando.excluded.resultado},
+            )
+        )
+        estender_lease(db, redacao_id, dono)
+        db.commit()
+    finally:
+        db.close()
+
+
+async def _cronometrar(tempos: Dict[str, Any], id_corretor: str, coro) -> Dict[str, Any]:
+    etapa = ETAPAS_CORRETOR[id_corretor]
+    with medir(ETAPA_DURACAO, tempos, f"{etapa}_s", etapa=etapa):
+        return await coro
+
+
+async def _executar_banca_async(
+    texto_redacao: str,
+    tema: str,
+    parciais: Dict[str, Optional[Dict[str, Any]]],
+    ao_concluir_competencia: Optional[Callable[[str, Dict[str, Any]], Any]] = None,
+    checkpoints: Optional[Dict[str, Dict[int, Dict[str, Any]]]] = None,
+    tempos: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Orquestra a banca inteira em um único event loop.
+
+    Os Corretores 1 e 2 rodam em paralelo (o ritmo das chamadas fica a cargo do
+    limitador de taxa do LLM) e o Supervisor só é acionado em caso de discrepância.
+    `parciais` é atualizado à medida que cada corretor termina, para que um retry
+    reaproveite o que já foi concluído; `checkpoints` traz as competências
+    avaliadas antes de uma interrupção, que não são pagas de novo.
+    `tempos` recebe a duração de cada corretor e os totais de chamadas,
+    tokens e espera por cota desta correção.
+    """
+    checkpoints = checkpoints or {}
+    tempos = tempos if tempos is not None else {}
+    tempos["llm"] = iniciar_telemetria_redacao()
+    pendentes = {
+        chave: id_corretor
+        for chave, id_corretor in CORRETORES_INICIAIS
+        if not parciais.get(chave)
+    }
+    for chave, id_corretor in CORRETORES_INICIAIS:
+        if chave not in pendentes:
+            print(f"Pulando {id_corretor} (resultado já existe do retry).")
+
+    if pendentes:
+        print(f"Executando {' e '.join(pendentes.values())} em paralelo...")
+        resultados = await asyncio.gather(
+            *(
+                _cronometrar(
+                    tempos,
+                    id_corretor,
+                    executar_correcao_completa_async(
+                        id_corretor,
+                        texto_redacao,
+                        tema,
+                        ao_concluir_competencia,
+                        avaliacoes_prontas=checkpoints.get(id_corretor),
+                    ),
+                )
+                for id_corretor in pendentes.values()
+            ),
+            return_exceptions=True,
+        )
+
+        erro = None
+        for chave, resultado in zip(pendentes, resultados):
+            if isinstance(resultado, BaseException):
+                erro = erro or resultado
+            else:
+                parciais[chave] = resultado
+                print(f"{pendentes[chave]} finalizado.")
+        if erro:
+            raise erro
+
+    c1, c2 = parciais["c1"], parciais["c2"]
+    discrepantes = verificar_discrepancia(c1, c2)
+    if not discrepantes:
+        return calcular_nota_consolidada(c1, c2)
+
+    if not parciais.get("c3"):
+        print(
+            f"Discrepância detectada nas competências {discrepantes}. "
+            "Executando Corretor Supervisor apenas nelas..."
+        )
+        parciais["c3"] = await _cronometrar(
+            tempos,
+            "Corretor Supervisor",
+            executar_correcao_completa_async(
+                "Corretor Supervisor",
+                texto_redacao,
+                tema,
+                ao_concluir_competencia,
+                competencias=discrepantes,
+                avaliacoes_prontas=checkpoints.get("Corretor Supervisor"),
+            ),
+        )
+        print("Corretor Supervisor finalizado.")
+    else:
+        print("Pulando Corretor Supervisor (resultado já existe do retry).")
+
+    return resolver_discrepancia_com_supervisor(c1, c2, parciais["c3"])
+
+
 @celery_app.task(name="correct_essay", bind=True)
 def correct_essay(
     self,
@@ -30,109 +325,318 @@ def correct_essay(
     db: Session = SessionLocal()
     redacao = None
 
-    c1 = json.loads(correcao_1_json) if correcao_1_json else None
-    c2 = json.loads(correcao_2_json) if correcao_2_json else None
-    c3 = json.loads(correcao_supervisor_json) if correcao_supervisor_json else None
+    # Resultados já concluídos em tentativas anteriores (checkpoint do retry)
+    parciais = {
+        "c1": json.loads(correcao_1_json) if correcao_1_json else None,
+        "c2": json.loads(correcao_2_json) if correcao_2_json else None,
+        "c3": json.loads(correcao_supervisor_json) if correcao_supervisor_json else None,
+    }
+
+    inicio = time.perf_counter()
+    # Detalhamento de tempos desta tentativa, gravado junto com o resultado
+    tempos: Dict[str, Any] = {"tentativa": self.request.retries + 1}
+
+    # Lease da redação: o id da tarefa se mantém entre os retries
+    dono = self.request.id
+
+    # Tarefas já reservadas (ou reagendadas) não chamam o LLM com o disjuntor aberto
+    restante = obter_disjuntor().segundos_restantes()
+    if restante > 0:
+        countdown_seconds = _espera_com_jitter(restante)
+        # O lease (se já houver) cobre a espera, para a varredura não redespachar
+        estender_lease(db, redacao_id, dono, countdown_seconds + LEASE_SEGUNDOS)
+        db.commit()
+        db.close()
+        REAGENDAMENTOS.labels("disjuntor").inc()
+        raise self.retry(countdown=countdown_seconds, max_retries=MAX_TENTATIVAS_COTA)
 
     try:
-        redacao = db.query(Redacao).filter(Redacao.id == redacao_id).first()
+        redacao = reivindicar_redacao(db, redacao_id, dono)
         if not redacao:
-            print(f"Erro: Redação com ID {redacao_id} não encontrada.")
+            status = db.query(Redacao.status).filter(Redacao.id == redacao_id).scalar()
+            if status is None:
+                print(f"Erro: Redação com ID {redacao_id} não encontrada.")
+            else:
+                # Mensagem duplicada (redespacho da varredura) ou redação com
+                # lease válido de outra tarefa
+                print(f"Redação ID: {redacao_id} ignorada ({status}, já reivindicada ou finalizada).")
             return
 
-        print(f"Iniciando correção da redação ID: {redacao_id}")
-        redacao.status = "PROCESSANDO"
-        db.commit()
+        # Espera na fila desde a submissão (só na primeira tentativa, para não
+        # misturar com os reagendamentos)
+        if redacao.criado_em is not None and self.request.retries == 0:
+            espera_fila = (datetime.now(timezone.utc) - redacao.criado_em).total_seconds()
+            ETAPA_DURACAO.labels(etapa="fila").observe(espera_fila)
+            tempos["fila_s"] = round(espera_fila, 3)
 
-        if not c1:
-            print("Executando Corretor 1...")
-
-            c1 = asyncio.run(
-                executar_correcao_completa_async(
-                    "Corretor 1", redacao.texto_redacao, redacao.tema
+        # Triagem local: redações anuladas pelas regras do ENEM não chegam à banca
+        with medir(ETAPA_DURACAO, tempos, "triagem_s", etapa="triagem"):
+            textos_motivadores = [
+                texto
+                for (texto,) in db.query(TextoMotivador.texto).filter(
+                    TextoMotivador.tema == redacao.tema
                 )
+            ]
+            resultado_triagem = triar_redacao(redacao.texto_redacao, textos_motivadores)
+        if resultado_triagem is not None:
+            resultado_triagem["triagem"]["chamadas_llm_economizadas"] = sum(
+                chamadas_llm_previstas(id_corretor) for _, id_corretor in CORRETORES_INICIAIS
             )
-            print("Corretor 1 finalizado. Pausando...")
-            time.sleep(15)
-        else:
-            print("Pulando Corretor 1 (resultado já existe do retry).")
+            resultado_triagem["tempos"] = tempos
+            if not _atualizar_redacao(db, redacao, "CONCLUIDO", resultado_triagem, dono):
+                return
+            REDACOES.labels("triagem").inc()
+            print(f"Redação ID: {redacao_id} anulada na triagem.")
+            return
 
-        if not c2:
-            print("Executando Corretor 2...")
+        print(f"Iniciando correção da redação ID: {redacao_id}")
+        if not _atualizar_redacao(db, redacao, "PROCESSANDO", dono=dono):
+            return
 
-            c2 = asyncio.run(
-                executar_correcao_completa_async(
-                    "Corretor 2", redacao.texto_redacao, redacao.tema
-                )
-            )
-            print("Corretor 2 finalizado.")
-        else:
-            print("Pulando Corretor 2 (resultado já existe do retry).")
+        texto_redacao, tema = redacao.texto_redacao, redacao.tema
+        checkpoints = _carregar_checkpoints(db, redacao_id)
+        # Devolve a conexão ao pool enquanto a banca aguarda o LLM
+        db.commit()
 
-        if not verificar_discrepancia(c1, c2):
-            resultado_final = calcular_nota_consolidada(c1, c2)
-        else:
-            if not c3:
-                print(
-                    "Discrepância detectada. Pausando e executando Corretor Supervisor..."
-                )
-                time.sleep(15)
+        async def _ao_concluir_competencia(id_corretor: str, avaliacao: Dict[str, Any]) -> None:
+            try:
+                await asyncio.to_thread(_salvar_checkpoint, redacao_id, id_corretor, avaliacao, dono)
+            except Exception as e:
+                print(f"Falha ao salvar checkpoint da C{avaliacao.get('competencia')} ({id_corretor}): {e}")
+            # Publicação síncrona (timeout de 2s): fora do loop compartilhado,
+            # para um Redis lento não travar as demais correções
+            await asyncio.to_thread(
+                publicar_evento,
+                redacao_id,
+                "progresso",
+                corretor=id_corretor,
+                competencia=avaliacao.get("competencia"),
+                nota=avaliacao.get("nota"),
+            )
 
-                c3 = asyncio.run(
-                    executar_correcao_completa_async(
-                        "Corretor Supervisor", redacao.texto_redacao, redacao.tema
-                    )
-                )
-                print("Corretor Supervisor finalizado.")
-            else:
-                print("Pulando Corretor Supervisor (resultado já existe do retry).")
+        def _renovar_lease() -> None:
+            sessao = SessionLocal()
+            try:
+                estender_lease(sessao, redacao_id, dono)
+                sessao.commit()
+            finally:
+                sessao.close()
 
-            resultado_final = resolver_discrepancia_com_supervisor(c1, c2, c3)
+        with medir(ETAPA_DURACAO, tempos, "banca_s", etapa="banca"):
+            # Com MAX_CORRECOES_SIMULTANEAS baixo, a espera por uma vaga no loop
+            # pode passar de LEASE_SEGUNDOS: o lease é renovado enquanto isso
+            resultado_final = executar_no_loop(
+                _executar_banca_async(
+                    texto_redacao,
+                    tema,
+                    parciais,
+                    _ao_concluir_competencia,
+                    checkpoints,
+                    tempos,
+                ),
+                renovar=_renovar_lease,
+                intervalo_renovacao=LEASE_SEGUNDOS / 3,
+            )
+        tempos["llm"]["espera_cota_s"] = round(tempos["llm"]["espera_cota_s"], 3)
+        tempos["total_s"] = round(time.perf_counter() - inicio, 3)
+        resultado_final["tempos"] = tempos
 
-        redacao.resultado_json = resultado_final
-        redacao.status = "CONCLUIDO"
-        db.commit()
+        with medir(ETAPA_DURACAO, etapa="gravacao"):
+            # Os checkpoints saem na mesma transação que grava o resultado final
+            db.query(AvaliacaoParcial).filter(AvaliacaoParcial.redacao_id == redacao_id).delete(
+                synchronize_session=False
+            )
+            if not _atualizar_redacao(db, redacao, "CONCLUIDO", resultado_final, dono):
+                return
+        ETAPA_DURACAO.labels(etapa="total").observe(time.perf_counter() - inicio)
+        REDACOES.labels("concluida").inc()
         print(f"Correção da redação ID: {redacao_id} finalizada com sucesso.")
+        print(f"Cache de avaliações: {cache_avaliacoes.estatisticas()}")
 
     except ResourceExhausted as e:
         db.rollback()
         print(f"Erro de Limite de Taxa (429) detectado: {e}")
 
-        countdown_seconds = 60
-        try:
-            match = re.search(r"Please retry in (\d+\.?\d*)", str(e))
-            if match:
-                wait_time = float(match.group(1))
-                countdown_seconds = math.ceil(wait_time) + 1
-                print(
-                    f"API sugeriu esperar {wait_time}s. Reagendando em {countdown_seconds}s."
-                )
-            else:
-                print(
-                    f"Não foi possível extrair o tempo de espera. Usando padrão de {countdown_seconds}s."
-                )
-        except Exception as re_e:
-            print(f"Erro ao extrair tempo de espera: {re_e}. Usando padrão de 60s.")
+        # Só chega aqui quando todos os endpoints do LLM estão fora de rotação;
+        # cada um já foi marcado indisponível pelo roteador (agents/roteador.py).
+        # O disjuntor pausa a fila de todos os workers pela espera sugerida (ou
+        # pelo backoff, se a cota voltou a faltar durante a retomada).
+        REAGENDAMENTOS.labels("cota").inc()
+        restante = obter_disjuntor().abrir(extrair_espera_sugerida(e))
+        countdown_seconds = _espera_com_jitter(restante)
+        print(
+            f"Disjuntor aberto por mais {restante:.0f}s. Reagendando em {countdown_seconds}s."
+        )
+        estender_lease(db, redacao_id, dono, countdown_seconds + LEASE_SEGUNDOS)
+        db.commit()
 
         raise self.retry(
             exc=e,
             countdown=countdown_seconds,
-            max_retries=5,
+            max_retries=MAX_TENTATIVAS_COTA,
             args=[],
             kwargs={
                 "redacao_id": redacao_id,
-                "correcao_1_json": json.dumps(c1) if c1 else None,
-                "correcao_2_json": json.dumps(c2) if c2 else None,
-                "correcao_supervisor_json": json.dumps(c3) if c3 else None,
+                "correcao_1_json": json.dumps(parciais["c1"]) if parciais["c1"] else None,
+                "correcao_2_json": json.dumps(parciais["c2"]) if parciais["c2"] else None,
+                "correcao_supervisor_json": (
+                    json.dumps(parciais["c3"]) if parciais["c3"] else None
+                ),
             },
         )
 
     except Exception as e:
         db.rollback()
         if redacao:
-            redacao.status = "ERRO"
-            redacao.resultado_json = {"erro": str(e)}
-            db.commit()
+            _atualizar_redacao(db, redacao, "ERRO", {"erro": str(e)}, dono)
+        REDACOES.labels("erro").inc()
         print(f"Erro GERAL ao corrigir redação ID {redacao_id}: {e}")
     finally:
         db.close()
+
+
+def _avaliacoes_para_feedback(redacao: Redacao) -> List[Dict[str, Any]]:
+    """Notas finais com as justificativas de cada corretor (sem as análises completas)."""
+    justificativas: Dict[int, List[str]] = {}
+    for correcao in descomprimir_detalhes(redacao.detalhes_comprimidos):
+        for avaliacao in correcao.get("competencias", []):
+            justificativas.setdefault(avaliacao["competencia"], []).append(avaliacao.get("justificativa"))
+    return [
+        {
+            "competencia": c["competencia"],
+            "nota": c["nota"],
+            "justificativas": justificativas.get(c["competencia"]) or [c.get("justificativa")],
+        }
+        for c in (redacao.resultado_json or {}).get("competencias", [])
+    ]
+
+
+def _comentario_da_chamada_unica(redacao: Redacao) -> Optional[str]:
+    """
+    Comentário geral que um corretor em MODO_CHAMADA_UNICA já devolveu junto
+    com as notas (guardado nos detalhes), se a chamada dele não falhou.
+    """
+    for correcao in descomprimir_detalhes(redacao.detalhes_comprimidos):
+        # Correções gravadas antes de as falhas subirem para a tarefa podem
+        # trazer competências zeradas com "erro" e um comentário genérico
+        if correcao.get("comentarios_gerais") and not any(
+            avaliacao.get("erro") for avaliacao in correcao.get("competencias", [])
+        ):
+            return correcao["comentarios_gerais"]
+    return None
+
+
+@celery_app.task(name="gerar_feedback", bind=True)
+def gerar_feedback(self, redacao_id: int):
+    """
+    Gera e grava o comentário geral de uma redação concluída (e das submissões
+    acopladas a ela). Disparada pela API na primeira vez que o cliente pede o
+    feedback, fora do caminho crítico da correção. Se um corretor avaliou em
+    chamada única, reaproveita o comentário que veio nessa chamada, sem uma
+    nova chamada ao LLM.
+    """
+    db: Session = SessionLocal()
+    try:
+        redacao = (
+            db.query(Redacao)
+            .options(undefer(Redacao.detalhes_comprimidos))
+            .filter(Redacao.id == redacao_id)
+            .first()
+        )
+        if not redacao or redacao.comentario_geral or redacao.status != "CONCLUIDO":
+            return
+
+        triagem = (redacao.resultado_json or {}).get("triagem")
+        if triagem:
+            # Redação anulada na triagem: não há avaliações para o LLM comentar
+            comentario = (
+                f"Sua redação recebeu nota zero na triagem automática ({triagem['motivo']}), "
+                "antes da avaliação das competências. Revise os critérios de anulação do ENEM "
+                "e envie uma nova versão."
+            )
+        else:
+            comentario = _comentario_da_chamada_unica(redacao) or executar_no_loop(
+                gerar_feedback_geral(_avaliacoes_para_feedback(redacao))
+            )
+
+        db.query(Redacao).filter(
+            or_(Redacao.id == redacao_id, Redacao.redacao_principal_id == redacao_id)
+        ).update({Redacao.comentario_geral: comentario}, synchronize_session=False)
+        db.commit()
+        publicar_evento(redacao_id, "feedback")
+        print(f"Comentário geral da redação ID: {redacao_id} gerado.")
+
+    except ResourceExhausted as e:
+        db.rollback()
+        REAGENDAMENTOS.labels("cota").inc()
+        restante = obter_disjuntor().abrir(extrair_espera_sugerida(e))
+        raise self.retry(
+            exc=e, countdown=_espera_com_jitter(restante), max_retries=MAX_TENTATIVAS_COTA
+        )
+
+    except Exception as e:
+        db.rollback()
+        # Libera um novo pedido pela API
+        db.query(Redacao).filter(Redacao.id == redacao_id).update(
+            {Redacao.feedback_solicitado_em: None}, synchronize_session=False
+        )
+        db.commit()
+        print(f"Erro ao gerar o comentário geral da redação ID {redacao_id}: {e}")
+    finally:
+        db.close()
+
+
+@celery_app.task(name="varrer_redacoes")
+def varrer_redacoes_travadas():
+    """
+    Tarefa periódica (beat): recupera as redações com lease expirado e as
+    PENDENTE órfãs (ver varredura.py). As interativas são redespachadas, uma
+    mensagem por redação, em lotes; as de lote voltam para o despacho justo.
+    """
+    # Com o disjuntor aberto, PENDENTE paradas são esperadas: a fila está pausada
+    incluir_pendentes = obter_disjuntor().segundos_restantes() <= 0
+    db: Session = SessionLocal()
+    try:
+        for motivo, ids, devolvidas in varrer_redacoes(db, incluir_pendentes):
+            if ids:
+                group(correct_essay.s(redacao_id) for redacao_id in ids).apply_async()
+            REAGENDAMENTOS.labels(motivo).inc(len(ids) + devolvidas)
+            print(
+                f"Varredura: {len(ids)} redações redespachadas e {devolvidas} "
+                f"devolvidas ao despacho dos lotes ({motivo})."
+            )
+    finally:
+        db.close()
+
+
+@celery_app.task(name="despachar_lotes")
+def despachar_lotes():
+    """
+    Tarefa periódica (beat, e disparada pela API a cada lote recebido):
+    completa a fila de lote até DESPACHO_FILA_ALVO mensagens, revezando entre
+    as origens (ver despacho.py). A fatia selecionada é publicada como um
+    único group do Celery, com um só producer (uma conexão ao broker), como
+    o endpoint de lote fazia antes do despacho justo. Só um despacho roda por
+    vez (trava_despacho); os demais disparos saem sem fazer nada.
+    """
+    with trava_despacho() as adquirida:
+        if not adquirida:
+            print("Despacho de lote já em andamento em outro worker; pulando esta rodada.")
+            return
+        vagas = DESPACHO_FILA_ALVO - profundidade_fila(celery_app, FILA_LOTE)
+        if vagas <= 0:
+            return
+        db: Session = SessionLocal()
+        try:
+            despachadas = selecionar_para_despacho(db, vagas)
+        finally:
+            db.close()
+
+        ids = [redacao_id for ids_origem in despachadas.values() for redacao_id in ids_origem]
+        if ids:
+            with celery_app.producer_or_acquire() as producer:
+                group(correct_essay.s(redacao_id).set(queue=FILA_LOTE) for redacao_id in ids).apply_async(
+                    producer=producer
+                )
+        for origem, ids_origem in despachadas.items():
+            LOTE_DESPACHADAS.labels(origem).inc(len(ids_origem))
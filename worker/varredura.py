@@ -0,0 +1,151 @@
+"""
+Leases das redações em correção e varredura das que ficaram para trás.
+
+Cada tarefa reivindica a redação com SELECT ... FOR UPDATE SKIP LOCKED e grava
+um lease (dono + expiração) que é renovado a cada competência concluída. Se o
+worker morre no meio da correção, o lease expira; se a mensagem se perde no
+broker depois do commit da API, a redação fica PENDENTE sem que ninguém a
+reivindique. A varredura periódica (tarefa varrer_redacoes, agendada pelo beat
+a cada VARREDURA_INTERVALO segundos, ver celery_app.py) encontra os dois casos
+pelo índice parcial ix_redacoes_varredura e os devolve à fila em lotes.
+"""
+import os
+from datetime import timedelta
+from typing import Iterator, List, Optional, Tuple
+
+from sqlalchemy import case, or_, select, update
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+
+from shared.models import PRIORIDADE_LOTE, Redacao, STATUS_EM_ANDAMENTO
+
+# Duração do lease; renovado a cada competência avaliada
+LEASE_SEGUNDOS = int(os.getenv("LEASE_SEGUNDOS", "600"))
+# Redações devolvidas à fila por UPDATE
+VARREDURA_LOTE = int(os.getenv("VARREDURA_LOTE", "1000"))
+# Tempo sem alteração a partir do qual uma redação PENDENTE é considerada
+# órfã. Deve ser maior que a espera normal na fila durante cargas em lote:
+# uma redação redespachada por engano só gera uma mensagem duplicada, que a
+# reivindicação descarta, mas ocupa a fila.
+PENDENTE_ORFA_SEGUNDOS = int(os.getenv("PENDENTE_ORFA_SEGUNDOS", "3600"))
+
+
+def _daqui_a(segundos: float):
+    return func.now() + timedelta(seconds=segundos)
+
+
+def reivindicar_redacao(db: Session, redacao_id: int, dono: str) -> Optional[Redacao]:
+    """
+    Marca a redação como PROCESSANDO sob o lease de `dono` e confirma.
+
+    Só reivindica redações em andamento sem lease, com lease expirado ou que já
+    são de `dono` (retry da mesma tarefa). Linhas travadas por outra
+    reivindicação são puladas (SKIP LOCKED) em vez de esperadas. Retorna None se
+    a redação não puder ser reivindicada.
+    """
+    redacao = (
+        db.query(Redacao)
+        .filter(
+            Redacao.id == redacao_id,
+            Redacao.status.in_(STATUS_EM_ANDAMENTO),
+            or_(
+                Redacao.lease_dono.is_(None),
+                Redacao.lease_dono == dono,
+                Redacao.lease_expira_em < func.now(),
+            ),
+        )
+        .with_for_update(skip_locked=True)
+        .first()
+    )
+    if redacao is None:
+        db.rollback()
+        return None
+
+    redacao.status = "PROCESSANDO"
+    redacao.lease_dono = dono
+    redacao.lease_expira_em = _daqui_a(LEASE_SEGUNDOS)
+    db.commit()
+    return redacao
+
+
+def estender_lease(db: Session, redacao_id: int, dono: str, segundos: float = LEASE_SEGUNDOS) -> None:
+    """Renova o lease de `dono` (sem confirmar a transação). Não faz nada se o lease mudou de dono."""
+    db.execute(
+        update(Redacao)
+        .where(Redacao.id == redacao_id, Redacao.lease_dono == dono)
+        .values(lease_expira_em=_daqui_a(segundos))
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _liberar(db: Session, *filtros, **valores) -> List[Tuple[int, str]]:
+    """
+    Atualiza até VARREDURA_LOTE redações principais que atendem aos filtros e
+    devolve (id, prioridade) de cada uma.
+    """
+    selecionadas = (
+        select(Redacao.id)
+        .where(Redacao.redacao_principal_id.is_(None), *filtros)
+        .limit(VARREDURA_LOTE)
+        .with_for_update(skip_locked=True)
+    )
+    linhas = db.execute(
+        update(Redacao)
+        .where(Redacao.id.in_(selecionadas))
+        .values(**valores)
+        .returning(Redacao.id, Redacao.prioridade)
+        .execution_options(synchronize_session=False)
+    ).all()
+    db.commit()
+    return linhas
+
+
+def varrer_redacoes(db: Session, incluir_pendentes: bool = True) -> Iterator[Tuple[str, List[int], int]]:
+    """
+    Recupera, em lotes já confirmados, as redações que precisam de uma nova
+    mensagem, como (motivo, ids a redespachar, devolvidas ao despacho):
+
+    - "lease_expirado": PROCESSANDO com lease vencido (worker morreu); voltam a
+      PENDENTE sem lease, para qualquer tarefa poder reivindicá-las;
+    - "pendente_orfa": PENDENTE já despachada e sem alteração há
+      PENDENTE_ORFA_SEGUNDOS (mensagem perdida); o atualizado_em é renovado,
+      então cada redação é redespachada no máximo uma vez por período.
+
+    As interativas são redespachadas pelo chamador; as de lote voltam a
+    esperar o despacho justo (despachado_em NULL, ver despacho.py).
+    """
+    despachado_em = case((Redacao.prioridade == PRIORIDADE_LOTE, None), else_=func.now())
+    consultas = [
+        (
+            "lease_expirado",
+            (Redacao.status == "PROCESSANDO", Redacao.lease_expira_em < func.now()),
+            {
+                "status": "PENDENTE",
+                "lease_dono": None,
+                "lease_expira_em": None,
+                "despachado_em": despachado_em,
+            },
+        )
+    ]
+    if incluir_pendentes:
+        consultas.append(
+            (
+                "pendente_orfa",
+                (
+                    Redacao.status == "PENDENTE",
+                    Redacao.despachado_em.isnot(None),
+                    Redacao.atualizado_em < _daqui_a(-PENDENTE_ORFA_SEGUNDOS),
+                    or_(Redacao.lease_expira_em.is_(None), Redacao.lease_expira_em < func.now()),
+                ),
+                {"atualizado_em": func.now(), "despachado_em": despachado_em},
+            )
+        )
+
+    for motivo, filtros, valores in consultas:
+        while True:
+            linhas = _liberar(db, *filtros, **valores)
+            if linhas:
+                ids = [id_ for id_, prioridade in linhas if prioridade != PRIORIDADE_LOTE]
+                yield motivo, ids, len(linhas) - len(ids)
+            if len(linhas) < VARREDURA_LOTE:
+                break